@@ -1,12 +1,34 @@
 import numpy as np
 import logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
-from parameters import *
-from functions import *
+from parameters import ALPHA_INITIAL, BETA_INITIAL, GAMMA_INITIAL, ETA, LAMBDA_, KAPPA_MIN, KAPPA_MAX
+from functions import (
+    calculate_tax_rate, compute_competence, compute_responsibility, compute_self_esteem,
+    compute_inspiration, compute_willpower, compute_ambition, compute_population_reward
+)
+from population import Population, TokenView, AGENT_VARIABLES, LEARNING_VARIABLES
+
+def _population_column(name):
+    def fget(self):
+        return getattr(self.population, name)[self.index]
+    def fset(self, value):
+        getattr(self.population, name)[self.index] = value
+    return property(fget, fset)
+
 class Agent:
-    def __init__(self, agent_id, initial_tokens, delta_tokens):
+    """
+    Lightweight view of one row of a Population. A standalone agent (no
+    population given) owns a single-row population of its own.
+    """
+    def __init__(self, agent_id, initial_tokens, delta_tokens, population=None):
         self.agent_id = agent_id
+        if population is None:
+            population = Population(1)
+            self.index = 0
+        else:
+            self.index = agent_id
+        self.population = population
+        self._tokens = TokenView(population, self.index)
         self.tokens = initial_tokens
         self.delta_tokens = delta_tokens
         self.ASPREV = None
@@ -22,30 +44,43 @@ class Agent:
         self.P_PREV = 0
         self.eta = ETA
         self.lambda_ = LAMBDA_
-        self.DELTA_AS = 0
         self.tau = 0
 
         # Learning from Best Performers
         self.kappa_min = KAPPA_MIN
         self.kappa_max = KAPPA_MAX
 
-        # For data collection
-        self.history = {
-            'tokens': [],
-            'SF': [],
-            'AF': [],
-            'SI': [],
-            'AI': [],
-            'SS': [],
-            'AS': [],
-            'R': [],
-            'S': [],
-            'IN': [],
-            'V': [],
-            'A': [],
-            'C': [],
-            'AL': []    
-        }
+    @classmethod
+    def view(cls, population, index, delta_tokens):
+        """
+        Agent view of an already initialised population row; unlike the
+        constructor it leaves the row's state untouched.
+        """
+        agent = cls.__new__(cls)
+        agent.agent_id = index
+        agent.index = index
+        agent.population = population
+        agent._tokens = TokenView(population, index)
+        agent.delta_tokens = delta_tokens
+        agent.ASPREV = None
+        agent.eta = ETA
+        agent.lambda_ = LAMBDA_
+        agent.kappa_min = KAPPA_MIN
+        agent.kappa_max = KAPPA_MAX
+        return agent
+
+    @property
+    def history(self):
+        return self.population.history.agent(self.index)
+
+    @property
+    def tokens(self):
+        return self._tokens
+
+    @tokens.setter
+    def tokens(self, values):
+        for token_type, amount in values.items():
+            self._tokens[token_type] = amount
 
     def initialize_variables(self):
         self.SF = 0
@@ -78,13 +113,17 @@ class Agent:
         return self.tax_paid
 
     def update_variables(self, G, agents):
+        self.update_psychology()
+        self.C = compute_competence(G, self.agent_id, agents)
+        return self.R, self.S, self.V, self.A, self.IN, self.C, self.AL
+
+    def update_psychology(self):
         self.R = compute_responsibility(self.AF, self.SF)
         self.S = compute_self_esteem(self.SS, self.AS)
         self.IN = compute_inspiration(self.AI, self.SI)
         self.V = compute_willpower(self.S, self.IN)
         self.A = compute_ambition(self.IN, self.R)
-        self.C = compute_competence(G, self.agent_id, agents)
-        return self.R, self.S, self.V, self.A, self.IN, self.C, self.AL
+        return self.R, self.S, self.V, self.A, self.IN
 
     def adjust_learning_rate(self):
         self.kappa = self.kappa_min + (self.kappa_max - self.kappa_min)
@@ -92,46 +131,23 @@ class Agent:
         return self.kappa
 
     def compute_reward(self, simulation):
-        self.r = self.alpha * sum(self.delta_tokens.values()) + self.beta * self.community_contribution + self.gamma * self.DELTA_AS
-        self.P = (1 - self.lambda_) * self.r + self.lambda_ * self.P_PREV
-        self.delta = self.r + self.lambda_ * self.P - self.P_PREV
-
-        # Gradient Calculations
-        grad_alpha = sum(self.delta_tokens.values())
-        grad_beta = self.community_contribution
-        grad_gamma = self.DELTA_AS
-
-        # Update Weights
-        self.alpha += self.eta * self.delta * grad_alpha
-        self.beta += self.eta * self.delta * grad_beta
-        self.gamma += self.eta * self.delta * grad_gamma
-
-        # Normalize Weights
-        total_weight = self.alpha + self.beta + self.gamma
-        if total_weight != 0:
-            self.alpha /= total_weight
-            self.beta /= total_weight
-            self.gamma /= total_weight
-        else:
-            self.alpha = self.beta = self.gamma = 1/3
+        row = slice(self.index, self.index + 1)
+        population = self.population
+        r, P, delta = compute_population_reward(
+            population.weights[row], population.P_PREV[row], sum(self.delta_tokens.values()),
+            population.community_contribution[row], population.DELTA_AS[row], self.eta, self.lambda_
+        )
+        self.r, self.P, self.delta = r[0], P[0], delta[0]
         self.P_PREV = self.P
 
     def collect_data(self):
-        self.history['tokens'].append(self.tokens.copy())
-        self.history['SF'].append(self.SF)
-        self.history['AF'].append(self.AF)
-        self.history['SS'].append(self.SS)
-        self.history['AS'].append(self.AS)
-        self.history['SI'].append(self.SI)
-        self.history['AI'].append(self.AI)
-        self.history['R'].append(self.R)
-        self.history['S'].append(self.S)
-        self.history['IN'].append(self.IN)
-        self.history['V'].append(self.V)
-        self.history['A'].append(self.A)
-        self.history['C'].append(self.C)
-        self.history['AL'].append(self.AL)
-        print(f"Agent {self.agent_id} collected data at time {len(self.history['tokens'])}")
+        """
+        Record the current state of this agent's population in its history.
+        """
+        self.population.history.record()
 
     def __str__(self):
-        return f"Agent {self.agent_id}: Tokens={self.tokens}, AI={self.AI:.2f}, AS={self.AS:.2f}, C={self.C:.2f}"
\ No newline at end of file
+        return f"Agent {self.agent_id}: Tokens={self.tokens}, AI={self.AI:.2f}, AS={self.AS:.2f}, C={self.C:.2f}"
+
+for _name in AGENT_VARIABLES + LEARNING_VARIABLES:
+    setattr(Agent, _name, _population_column(_name))
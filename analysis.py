@@ -1,13 +1,47 @@
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from functions import gini_coefficient
+from inequality import inequality_statistics, INEQUALITY_STATISTICS, INEQUALITY_LABELS
+from history import open_history
 from parameters import NUM_TIMESTEPS, EXPORT_PLOTS_DIR
 import os
 
 def analyze_results(simulation):
-    agents = simulation.get_agents()
-    wealth_data = np.array([sum(agent.history['tokens'][-1].values()) for agent in agents])
+    analyze_history(simulation.history, simulation.get_time_series(), simulation.get_inequality_history())
+
+def history_inequality(history):
+    """
+    Inequality statistics of every recorded step of a History, for
+    histories whose simulation's aggregate history is not available. The
+    token columns are read one chunk at a time.
+    """
+    rows = []
+    for token_blocks in zip(*(history.blocks(token_type) for token_type in history.token_types)):
+        wealth = sum(token_blocks)
+        rows.extend(inequality_statistics(wealth_at_t) for wealth_at_t in wealth)
+    return {name: [row[name] for row in rows] for name in INEQUALITY_STATISTICS}
+
+def history_means(history, name):
+    """
+    Mean over the agents of a recorded variable at every recorded step,
+    read one chunk at a time.
+    """
+    means = [block.mean(axis=1) for block in history.blocks(name)]
+    return np.concatenate(means) if means else np.empty(0)
+
+def analyze_history(history, aggregate_time_series=None, inequality=None):
+    """
+    Plot the results from a History, either a live one or one opened from
+    disk with open_history(directory); memory-mapped columns are reduced
+    one chunk at a time, so they are never loaded whole. inequality
+    ({name: per-step values}, recorded at aggregate_time_series) is
+    recomputed from the history if not given.
+    """
+    # Imported here so that history_inequality doesn't need the plotting libraries
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    time_series = history.get_time_steps()
+    wealth_data = np.asarray(sum(history.last_row(token_type) for token_type in history.token_types))
+    if inequality is None:
+        aggregate_time_series, inequality = time_series, history_inequality(history)
 
     plt.figure(figsize=(10, 6))
     sns.histplot(wealth_data, kde=True, bins=20)
@@ -19,9 +53,9 @@ def analyze_results(simulation):
     plt.savefig(plot_path)
     plt.show()
 
-    average_competence = simulation.avg_competence_history
+    average_competence = history_means(history, 'C')
     plt.figure(figsize=(10, 6))
-    plt.plot(simulation.time_series, average_competence, label='Average Competence')
+    plt.plot(time_series, average_competence, label='Average Competence')
     plt.title('Average Competence Over Time')
     plt.xlabel('Time Step')
     plt.ylabel('Average Competence')
@@ -31,9 +65,9 @@ def analyze_results(simulation):
     plt.savefig(plot_path)
     plt.show()
 
-    average_influence = np.mean([agent.history['I'] for agent in agents], axis=0)
+    average_influence = history_means(history, 'AI')
     plt.figure(figsize=(10, 6))
-    plt.plot(simulation.time_series, average_influence, label='Average Influence', color='orange')
+    plt.plot(time_series, average_influence, label='Average Influence', color='orange')
     plt.title('Average Influence Over Time')
     plt.xlabel('Time Step')
     plt.ylabel('Average Influence')
@@ -43,20 +77,52 @@ def analyze_results(simulation):
     plt.savefig(plot_path)
     plt.show()
 
-    gini_over_time = []
-    for t in range(len(simulation.time_series)):
-        wealth_at_t = [sum(agent.history['tokens'][t].values()) for agent in agents]
-        gini = gini_coefficient(wealth_at_t)
-        gini_over_time.append(gini)
-
     plt.figure(figsize=(10, 6))
-    plt.plot(simulation.time_series, gini_over_time, label='Gini Coefficient', color='green')
-    plt.title('Gini Coefficient Over Time')
+    plt.plot(aggregate_time_series, inequality['gini'], label=INEQUALITY_LABELS['gini'], color='green')
+    plt.plot(aggregate_time_series, inequality['theil'], label=INEQUALITY_LABELS['theil'], color='purple')
+    plt.title('Inequality Over Time')
     plt.xlabel('Time Step')
-    plt.ylabel('Gini Coefficient')
+    plt.ylabel('Index')
     plt.legend()
     plt.tight_layout()
     plot_path = os.path.join(EXPORT_PLOTS_DIR, "gini_coefficient_over_time.png")
     plt.savefig(plot_path)
     plt.show()
 
+    plt.figure(figsize=(10, 6))
+    for name in ['top1_share', 'top10_share', 'bottom40_share']:
+        plt.plot(aggregate_time_series, inequality[name], label=INEQUALITY_LABELS[name])
+    plt.title('Wealth Shares Over Time')
+    plt.xlabel('Time Step')
+    plt.ylabel('Share of Total Wealth')
+    plt.legend()
+    plt.tight_layout()
+    plot_path = os.path.join(EXPORT_PLOTS_DIR, "wealth_shares_over_time.png")
+    plt.savefig(plot_path)
+    plt.show()
+
+    plt.figure(figsize=(10, 6))
+    plt.fill_between(aggregate_time_series, inequality['p10'], inequality['p90'], alpha=0.2, label='P10-P90')
+    plt.fill_between(aggregate_time_series, inequality['p25'], inequality['p75'], alpha=0.4, label='P25-P75')
+    plt.plot(aggregate_time_series, inequality['p50'], label='Median')
+    plt.title('Wealth Percentiles Over Time')
+    plt.xlabel('Time Step')
+    plt.ylabel('Total Tokens')
+    plt.legend()
+    plt.tight_layout()
+    plot_path = os.path.join(EXPORT_PLOTS_DIR, "wealth_percentiles_over_time.png")
+    plt.savefig(plot_path)
+    plt.show()
+
+def analyze_history_dir(directory):
+    """
+    Plot a history written to disk by a run with history_dir, using the
+    aggregate series stored with it.
+    """
+    history = open_history(directory)
+    aggregates = history.aggregates()
+    if aggregates is None:
+        # Directories written before the aggregates were stored with the history
+        analyze_history(history)
+    else:
+        analyze_history(history, aggregates['time_step'], aggregates)
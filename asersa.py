@@ -0,0 +1,197 @@
+"""
+Headless command line entry point for ASERSA.
+
+    python -m asersa run --agents 1000 --steps 200 --policy progressive --seed 42
+    python -m asersa run --steps 1000 --checkpoint-every 100 --checkpoint-file run.sim
+    python -m asersa run --steps 500 --set K6=0.02 --set TAU_MAX=0.3
+    python -m asersa run --steps 2000 --resume run.sim
+    python -m asersa sweep --grid policy=flat,ubi,progressive --grid TAU_MAX=0.2,0.4 --replicates 3
+
+Steps a Simulation as fast as the CPU allows without importing Qt or
+matplotlib, so runs and sweeps work on servers without a display.
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from parameters import (
+    NUM_AGENTS, NUM_TIMESTEPS, FLAT_TAX_RATE, NETWORK_PROBABILITY, NETWORK_MODEL, EXPORT_FORMAT,
+    CHECKPOINT_INTERVAL, CHECKPOINT_FILE, STEP_BACKEND
+)
+from config import ModelConfig, MODEL_PARAMETERS
+from network import NETWORK_MODELS
+from simulation import Simulation
+from metrics import JSONLSink, StdoutSink
+from kernels import STEP_BACKENDS, resolve_backend
+from policy import POLICIES
+
+def run_simulation(num_agents=NUM_AGENTS, num_steps=NUM_TIMESTEPS, policy='flat', seed=None, flat_tax_rate=FLAT_TAX_RATE,
+                   network_probability=NETWORK_PROBABILITY, network_model=NETWORK_MODEL, network_file=None,
+                   history_dir=None, checkpoint_interval=CHECKPOINT_INTERVAL, checkpoint_file=CHECKPOINT_FILE,
+                   metrics_sinks=(), profile=False, profile_allocations=False, backend=STEP_BACKEND, config=None):
+    """
+    Build a Simulation, step it num_steps times and return it together with
+    the wall-clock time spent stepping. Per-step metrics are also published
+    to metrics_sinks; with profile, simulation.profiler holds per-phase
+    timings (and allocations, with profile_allocations). config is the
+    ModelConfig (default: the values in parameters).
+    """
+    simulation = Simulation(num_agents=num_agents, seed=seed, network_probability=network_probability,
+                            network_model=network_model, network_file=network_file,
+                            history_dir=history_dir, checkpoint_interval=checkpoint_interval,
+                            checkpoint_file=checkpoint_file, config=config)
+    simulation.current_policy = policy
+    simulation.FLAT_TAX_RATE = flat_tax_rate
+    simulation.step_backend = resolve_backend(backend)
+    for sink in metrics_sinks:
+        simulation.metrics.add_sink(sink)
+    if profile or profile_allocations:
+        simulation.enable_profiling(profile_allocations)
+    return simulation, step_simulation(simulation, num_steps)
+
+def step_simulation(simulation, num_steps):
+    """
+    Step a simulation until time step num_steps and return the wall-clock
+    time spent stepping.
+    """
+    remaining = max(num_steps - simulation.time_step, 0)
+    simulation.get_adjacency()
+    stride = simulation.history.stride
+    simulation.history.reserve(len(simulation.history) + (remaining + stride - 1) // stride)
+    simulation.start()
+    start = time.perf_counter()
+    for _ in range(remaining):
+        simulation.update()
+    elapsed = time.perf_counter() - start
+    simulation.history.flush()
+    simulation.metrics.close()
+    return elapsed
+
+def run_command(args):
+    sinks = []
+    if args.metrics_file:
+        sinks.append(JSONLSink(args.metrics_file))
+    if args.progress:
+        sinks.append(StdoutSink(args.progress))
+    model_parameters = {name: _parse_value(value) for name, value in _parse_assignments(args.set).items()}
+    if args.resume:
+        simulation = Simulation.load_checkpoint(args.resume)
+        simulation.config.update(model_parameters)
+        simulation.checkpoint_interval = args.checkpoint_every
+        simulation.checkpoint_file = args.checkpoint_file
+        for sink in sinks:
+            simulation.metrics.add_sink(sink)
+        simulation.step_backend = resolve_backend(args.backend)
+        if args.profile or args.profile_allocations:
+            simulation.enable_profiling(args.profile_allocations)
+        first_step = simulation.time_step
+        print(f"Resumed from {args.resume} at time step {first_step}")
+        elapsed = step_simulation(simulation, args.steps)
+    else:
+        first_step = 0
+        simulation, elapsed = run_simulation(args.agents, args.steps, args.policy, args.seed, args.flat_tax_rate,
+                                             args.network_probability, args.network, args.network_file, args.history_dir,
+                                             args.checkpoint_every, args.checkpoint_file, sinks,
+                                             args.profile, args.profile_allocations, args.backend,
+                                             ModelConfig(**model_parameters))
+    steps = simulation.time_step - first_step
+    steps_per_second = steps / elapsed if elapsed > 0 else float('inf')
+    print(f"Agents: {simulation.num_agents}  Steps: {simulation.time_step}  Policy: {simulation.current_policy}  Seed: {simulation.random.entropy}")
+    print(f"Elapsed: {elapsed:.3f} s  ({steps_per_second:.2f} steps/s, {simulation.step_backend} backend)")
+    print(f"Average Wealth: {simulation.get_average_wealth():.4f}")
+    print(f"Gini Coefficient: {simulation.get_gini_coefficient():.4f}")
+    print(f"Average Competence: {simulation.get_average_competence():.4f}")
+    if simulation.profiler.enabled:
+        print(simulation.profiler.report())
+        if args.profile_output:
+            simulation.profiler.dump_collapsed(args.profile_output)
+            print(f"Collapsed stacks written to {args.profile_output}")
+        simulation.disable_profiling()
+    if args.export:
+        simulation.export_data(args.export_format)
+    return 0
+
+def _parse_value(text):
+    try:
+        return int(text)
+    except ValueError:
+        try:
+            return float(text)
+        except ValueError:
+            return text
+
+def _parse_assignments(assignments):
+    parsed = {}
+    for assignment in assignments:
+        name, _, values = assignment.partition('=')
+        parsed[name] = values
+    return parsed
+
+def sweep_command(args):
+    from sweep import parameter_grid, latin_hypercube, replicate_seeds, run_sweep
+    points = [{}]
+    if args.grid:
+        grid = {name: [_parse_value(v) for v in values.split(',')] for name, values in _parse_assignments(args.grid).items()}
+        points = parameter_grid(grid)
+    if args.lhs:
+        bounds = {name: tuple(float(v) for v in values.split(':')) for name, values in _parse_assignments(args.lhs).items()}
+        samples = latin_hypercube(bounds, args.samples, args.seed)
+        points = [dict(point, **sample) for point in points for sample in samples]
+    seeds = replicate_seeds(args.seed, args.replicates)
+    results = run_sweep(points, seeds, args.output, args.agents, args.steps, args.workers)
+    final = results.sort_values('time_step').groupby('task_id').tail(1)
+    print(f"{results['task_id'].nunique()} tasks, {len(results)} rows in {args.output}")
+    print(final.drop(columns=['task_id', 'elapsed']).to_string(index=False))
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='asersa', description="ASERSA headless simulation runner")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help="Run a single simulation without the GUI")
+    run_parser.add_argument('--agents', type=int, default=NUM_AGENTS, help="Number of agents")
+    run_parser.add_argument('--steps', type=int, default=NUM_TIMESTEPS, help="Number of time steps")
+    run_parser.add_argument('--policy', choices=list(POLICIES), default='flat', help="Tax policy")
+    run_parser.add_argument('--seed', type=int, default=None, help="Random seed (default: fresh entropy, printed so the run can be repeated)")
+    run_parser.add_argument('--flat-tax-rate', type=float, default=FLAT_TAX_RATE, help="Flat tax rate (0-1)")
+    run_parser.add_argument('--network', choices=NETWORK_MODELS, default=NETWORK_MODEL, help="Network model")
+    run_parser.add_argument('--network-probability', type=float, default=NETWORK_PROBABILITY, help="Edge probability (Erdős-Rényi)")
+    run_parser.add_argument('--network-file', default=None, help="Load the topology from this file, or save it there after generating")
+    run_parser.add_argument('--history-dir', default=None, help="Stream agent history to memory-mapped files in this directory")
+    run_parser.add_argument('--set', action='append', default=[], metavar='NAME=VALUE', help=f"Model parameter override (repeatable); any of {', '.join(MODEL_PARAMETERS)}")
+    run_parser.add_argument('--backend', choices=STEP_BACKENDS, default=STEP_BACKEND, help="Per-agent step implementation (numba falls back to numpy if not installed)")
+    run_parser.add_argument('--checkpoint-every', type=int, default=CHECKPOINT_INTERVAL, metavar='K', help="Save a checkpoint every K steps (0: never)")
+    run_parser.add_argument('--checkpoint-file', default=CHECKPOINT_FILE, help="Checkpoint path; may contain {time_step}")
+    run_parser.add_argument('--resume', default=None, metavar='CHECKPOINT', help="Resume from this checkpoint (its model settings are used) and run until time step --steps")
+    run_parser.add_argument('--metrics-file', default=None, help="Append per-step metrics to this JSON Lines file")
+    run_parser.add_argument('--progress', type=int, default=0, metavar='K', help="Print a metrics summary every K steps")
+    run_parser.add_argument('--profile', action='store_true', help="Report the time spent in each phase of a step")
+    run_parser.add_argument('--profile-allocations', action='store_true', help="Also trace memory allocations per phase (slower)")
+    run_parser.add_argument('--profile-output', default=None, metavar='FILE', help="Write the profile as collapsed stacks for flame graph tools")
+    run_parser.add_argument('--export', action='store_true', help="Export data to EXPORT_DIR when done")
+    run_parser.add_argument('--export-format', choices=['parquet', 'csv'], default=EXPORT_FORMAT, help="Per-agent export format")
+    run_parser.add_argument('--log-level', default='WARNING', help="Logging level (default: WARNING)")
+    run_parser.set_defaults(func=run_command)
+
+    sweep_parser = subparsers.add_parser('sweep', help="Run a parallel parameter sweep")
+    sweep_parser.add_argument('--grid', action='append', default=[], metavar='NAME=V1,V2,...', help="Grid values for a parameter (repeatable)")
+    sweep_parser.add_argument('--lhs', action='append', default=[], metavar='NAME=LOW:HIGH', help="Latin-hypercube range for a parameter (repeatable)")
+    sweep_parser.add_argument('--samples', type=int, default=10, help="Number of Latin-hypercube samples")
+    sweep_parser.add_argument('--replicates', type=int, default=1, help="Replicate seeds per parameter point")
+    sweep_parser.add_argument('--seed', type=int, default=0, help="Base seed the replicate seeds are derived from")
+    sweep_parser.add_argument('--agents', type=int, default=NUM_AGENTS, help="Number of agents")
+    sweep_parser.add_argument('--steps', type=int, default=NUM_TIMESTEPS, help="Number of time steps")
+    sweep_parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    sweep_parser.add_argument('--output', default=os.path.join("simulation_data", "sweep"), help="Output directory; completed tasks are skipped on re-run")
+    sweep_parser.add_argument('--log-level', default='WARNING', help="Logging level (default: WARNING)")
+    sweep_parser.set_defaults(func=sweep_command)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=getattr(logging, args.log_level.upper()))
+    return args.func(args)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,302 @@
+"""
+Benchmark suite for ASERSA.
+
+    python benchmark.py                                  # full suite
+    python benchmark.py --quick                          # small sizes only
+    python benchmark.py --agents 1000 10000 --policies flat ubi --steps 20
+    python benchmark.py --compare simulation_data/benchmarks/<old>.json
+
+Step benchmarks measure Simulation.update throughput (steps per second)
+and peak resident memory for every combination of agent count, mean
+network degree and tax policy; each case runs in a fresh process so peak
+memory is not inherited from earlier cases. Micro-benchmarks time the
+hot kernels (compute_DFIA, gini_coefficient, inequality_statistics,
+compute_population_competence) and export_data. Import benchmarks time
+the cold start of the headless modules in fresh interpreters and check
+that they load none of the GUI, plotting or other optional libraries;
+importing simulation should take under IMPORT_TARGET_SECONDS, which
+leaves room for NumPy and scipy.sparse and little else. Results are
+written as JSON together with the commit and machine they were measured
+on, and --compare prints the change against an earlier result file.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+BENCHMARK_DIR = os.path.join("simulation_data", "benchmarks")
+AGENT_COUNTS = [100, 1000, 10000, 100000]
+MEAN_DEGREES = [5, 20]
+MICRO_AGENT_COUNTS = [1000, 10000, 100000, 1000000]
+QUICK_AGENT_COUNTS = [100, 1000]
+# Headless modules timed by the import benchmarks, and the libraries they must not load
+IMPORT_MODULES = ['simulation', 'asersa', 'ensemble']
+IMPORT_FORBIDDEN = ['PyQt5', 'matplotlib', 'seaborn', 'pandas', 'networkx', 'numba']
+IMPORT_TARGET_SECONDS = 0.5
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def _probability(num_agents, mean_degree):
+    return min(1.0, mean_degree / max(num_agents - 1, 1))
+
+def _timed(func, repeat):
+    """
+    Best and median wall time of `repeat` calls of func.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {'best_seconds': min(times), 'median_seconds': float(np.median(times)), 'repeat': repeat}
+
+def step_case(num_agents, mean_degree, policy, steps, warmup, seed):
+    """
+    Run in a fresh worker process: build a simulation, step it `warmup`
+    times untimed and `steps` times timed.
+    """
+    logging.disable(logging.WARNING)
+    from simulation import Simulation
+    baseline_rss = _peak_rss_mb()
+    start = time.perf_counter()
+    simulation = Simulation(num_agents=num_agents, seed=seed, network_probability=_probability(num_agents, mean_degree))
+    simulation.current_policy = policy
+    simulation.get_adjacency()
+    simulation.history.reserve(warmup + steps)
+    setup_seconds = time.perf_counter() - start
+    simulation.start()
+    for _ in range(warmup):
+        simulation.update()
+    start = time.perf_counter()
+    for _ in range(steps):
+        simulation.update()
+    elapsed = time.perf_counter() - start
+    peak_rss = _peak_rss_mb()
+    return {
+        'benchmark': 'step',
+        'num_agents': num_agents,
+        'mean_degree': mean_degree,
+        'num_edges': int(simulation.adjacency.nnz // 2),
+        'policy': policy,
+        'steps': steps,
+        'setup_seconds': setup_seconds,
+        'seconds_per_step': elapsed / steps,
+        'steps_per_second': steps / elapsed if elapsed > 0 else float('inf'),
+        'peak_rss_mb': peak_rss,
+        'baseline_rss_mb': baseline_rss,
+    }
+
+def _isolated(func, *args):
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(1, maxtasksperchild=1) as pool:
+        return pool.apply(func, args)
+
+def run_step_benchmarks(agent_counts, mean_degrees, policies, steps, warmup, seed=0):
+    results = []
+    for num_agents in agent_counts:
+        for mean_degree in mean_degrees:
+            for policy in policies:
+                result = _isolated(step_case, num_agents, mean_degree, policy, steps, warmup, seed)
+                print(f"step  N={num_agents:<8} degree={mean_degree:<4} {policy:<16}"
+                      f"{result['steps_per_second']:>10.2f} steps/s  {result['peak_rss_mb'] or 0:>8.1f} MiB")
+                results.append(result)
+    return results
+
+def run_micro_benchmarks(agent_counts, mean_degree=MEAN_DEGREES[0], repeat=5, seed=0):
+    logging.disable(logging.WARNING)
+    from population import Population
+    from functions import compute_DFIA, gini_coefficient, compute_population_competence
+    from inequality import inequality_statistics
+    from network import generate_network, degree_vector
+    from simulation import Simulation
+
+    results = []
+    rng = np.random.default_rng(seed)
+    for num_agents in agent_counts:
+        population = Population(num_agents)
+        population.tokens[:] = rng.uniform(1, 100, population.tokens.shape)
+        wealth = population.wealth()
+        adjacency = generate_network('erdos_renyi', num_agents, seed, probability=_probability(num_agents, mean_degree))
+        degree = degree_vector(adjacency)
+        population.C[:] = rng.uniform(0, 10, num_agents)
+        cases = {
+            'compute_DFIA': lambda: compute_DFIA(population),
+            'gini_coefficient': lambda: gini_coefficient(wealth),
+            'inequality_statistics': lambda: inequality_statistics(wealth),
+            'compute_population_competence': lambda: compute_population_competence(adjacency, degree, population.C),
+        }
+        for name, func in cases.items():
+            result = dict(_timed(func, repeat), benchmark=name, num_agents=num_agents)
+            print(f"{name:<30} N={num_agents:<8}{result['best_seconds'] * 1e3:>10.3f} ms")
+            results.append(result)
+
+    # export_data writes the whole history, so it is timed on a short run of the smaller sizes
+    for num_agents in [n for n in agent_counts if n <= 10000]:
+        simulation = Simulation(num_agents=num_agents, seed=seed, network_probability=_probability(num_agents, mean_degree))
+        simulation.start()
+        for _ in range(10):
+            simulation.update()
+        for export_format in ['parquet', 'csv']:
+            if export_format == 'csv' and num_agents > 1000:
+                continue
+            with tempfile.TemporaryDirectory() as export_dir:
+                try:
+                    timing = _timed(lambda: simulation.export_data(export_format, export_dir),
+                                    max(1, repeat // 2) if export_format == 'parquet' else 1)
+                except ImportError as e:
+                    print(f"export_data ({export_format}) skipped: {e}")
+                    continue
+            result = dict(timing, benchmark=f'export_data_{export_format}', num_agents=num_agents, steps=10)
+            print(f"{result['benchmark']:<30} N={num_agents:<8}{result['best_seconds'] * 1e3:>10.3f} ms")
+            results.append(result)
+    return results
+
+_IMPORT_PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps([seconds, [name for name in {forbidden!r} if name in sys.modules]]))
+'''
+
+def run_import_benchmarks(modules=IMPORT_MODULES, repeat=5):
+    """
+    Cold-start import time of every module, each import in a fresh
+    interpreter, and the IMPORT_FORBIDDEN libraries it loaded.
+    """
+    results = []
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    for module in modules:
+        times = []
+        for _ in range(repeat):
+            probe = _IMPORT_PROBE.format(module=module, forbidden=IMPORT_FORBIDDEN)
+            output = subprocess.run([sys.executable, '-c', probe], capture_output=True, text=True, cwd=cwd, check=True).stdout
+            seconds, loaded = json.loads(output.splitlines()[-1])
+            times.append(seconds)
+        result = {'benchmark': f'import_{module}', 'best_seconds': min(times),
+                  'median_seconds': float(np.median(times)), 'repeat': repeat, 'forbidden_modules': loaded}
+        note = f"  loads {', '.join(loaded)}" if loaded else ''
+        print(f"{result['benchmark']:<30}{'':<10}{result['best_seconds'] * 1e3:>10.3f} ms{note}")
+        results.append(result)
+    return results
+
+def import_violations(results):
+    """
+    Import results over IMPORT_TARGET_SECONDS (simulation only) or loading
+    a forbidden library.
+    """
+    return [result['benchmark'] for result in results if result['benchmark'].startswith('import_') and (
+        result['forbidden_modules'] or
+        (result['benchmark'] == 'import_simulation' and result['best_seconds'] > IMPORT_TARGET_SECONDS))]
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def machine_info():
+    return {
+        'commit': _git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+    }
+
+def _case_key(result):
+    return tuple((name, result[name]) for name in ('benchmark', 'num_agents', 'mean_degree', 'policy') if name in result)
+
+def _case_seconds(result):
+    return result['seconds_per_step'] if result['benchmark'] == 'step' else result['best_seconds']
+
+def compare_results(baseline, current, threshold=0.1):
+    """
+    Print the relative change in time of every case present in both result
+    dicts; returns the cases that got slower by more than threshold.
+    """
+    previous = {_case_key(r): r for r in baseline['results']}
+    regressions = []
+    print(f"Comparing {current['machine'].get('commit')} against {baseline['machine'].get('commit')}")
+    for result in current['results']:
+        key = _case_key(result)
+        if key not in previous:
+            continue
+        before, after = _case_seconds(previous[key]), _case_seconds(result)
+        change = after / before - 1 if before > 0 else 0.0
+        flag = '  SLOWER' if change > threshold else ('  faster' if change < -threshold else '')
+        print(f"{' '.join(str(value) for _, value in key):<50}{before * 1e3:>12.3f} ms{after * 1e3:>12.3f} ms{change:>+9.1%}{flag}")
+        if change > threshold:
+            regressions.append(key)
+    return regressions
+
+def main(argv=None):
+    from policy import POLICIES
+    parser = argparse.ArgumentParser(description="ASERSA benchmark suite")
+    parser.add_argument('--agents', type=int, nargs='+', default=None, help="Agent counts for the step benchmarks")
+    parser.add_argument('--degrees', type=float, nargs='+', default=MEAN_DEGREES, help="Mean network degrees")
+    parser.add_argument('--policies', nargs='+', choices=list(POLICIES), default=list(POLICIES), help="Tax policies")
+    parser.add_argument('--steps', type=int, default=10, help="Timed steps per case")
+    parser.add_argument('--warmup', type=int, default=2, help="Untimed steps per case")
+    parser.add_argument('--micro-agents', type=int, nargs='+', default=None, help="Population sizes for the micro-benchmarks")
+    parser.add_argument('--repeat', type=int, default=5, help="Repetitions per micro-benchmark")
+    parser.add_argument('--quick', action='store_true', help="Only small sizes")
+    parser.add_argument('--no-step', action='store_true', help="Skip the step benchmarks")
+    parser.add_argument('--no-micro', action='store_true', help="Skip the micro-benchmarks")
+    parser.add_argument('--no-import', action='store_true', help="Skip the import benchmarks")
+    parser.add_argument('--output', default=None, help="Result file (default: simulation_data/benchmarks/<commit>.json)")
+    parser.add_argument('--compare', default=None, metavar='BASELINE', help="Compare against an earlier result file")
+    parser.add_argument('--threshold', type=float, default=0.1, help="Relative slowdown reported as a regression")
+    args = parser.parse_args(argv)
+
+    agent_counts = args.agents or (QUICK_AGENT_COUNTS if args.quick else AGENT_COUNTS)
+    micro_agent_counts = args.micro_agents or (QUICK_AGENT_COUNTS if args.quick else MICRO_AGENT_COUNTS)
+    results = []
+    if not args.no_step:
+        results += run_step_benchmarks(agent_counts, args.degrees, args.policies, args.steps, args.warmup)
+    if not args.no_micro:
+        results += run_micro_benchmarks(micro_agent_counts, repeat=args.repeat)
+    if not args.no_import:
+        results += run_import_benchmarks(repeat=args.repeat)
+
+    report = {'machine': machine_info(), 'results': results}
+    output = args.output or os.path.join(BENCHMARK_DIR, f"{report['machine']['commit'] or 'benchmark'}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    violations = import_violations(results)
+    if violations:
+        print(f"Import target missed: {', '.join(violations)} (target {IMPORT_TARGET_SECONDS * 1e3:.0f} ms for simulation, "
+              f"none of {', '.join(IMPORT_FORBIDDEN)})")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare_results(baseline, report, args.threshold):
+            return 1
+    return 1 if violations else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""
+Versioned binary checkpoint files.
+
+A checkpoint is an 8-byte magic, a little-endian uint32 format version and
+uint32 header length, a UTF-8 JSON header, then raw array buffers, each
+aligned to CHECKPOINT_ALIGNMENT bytes. The header holds the scalar state
+together with the dtype, shape and offset of every array, so a checkpoint
+is restored by memory-mapping the file and wrapping the buffers in place:
+nothing is parsed or copied up front, and pages are read on first access.
+"""
+import json
+import mmap
+import os
+import struct
+import numpy as np
+
+CHECKPOINT_MAGIC = b'ASERSACK'
+CHECKPOINT_VERSION = 1
+CHECKPOINT_ALIGNMENT = 64
+_PREFIX = struct.Struct('<8sII')
+
+def _align(offset):
+    return -(-offset // CHECKPOINT_ALIGNMENT) * CHECKPOINT_ALIGNMENT
+
+def is_checkpoint(filename):
+    with open(filename, 'rb') as f:
+        return f.read(len(CHECKPOINT_MAGIC)) == CHECKPOINT_MAGIC
+
+def write_checkpoint(filename, header, arrays):
+    """
+    Write header (a JSON-serialisable dict) and arrays ({name: ndarray}) as
+    a checkpoint. The file is written next to `filename` and renamed over
+    it, so an existing checkpoint is never left half-written.
+    """
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    specs = {}
+    offset = 0
+    for name, array in arrays.items():
+        offset = _align(offset)
+        specs[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset += array.nbytes
+    encoded = json.dumps(dict(header, version=CHECKPOINT_VERSION, arrays=specs)).encode('utf-8')
+    data_start = _align(_PREFIX.size + len(encoded))
+
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(filename + '.tmp', 'wb') as f:
+        f.write(_PREFIX.pack(CHECKPOINT_MAGIC, CHECKPOINT_VERSION, len(encoded)))
+        f.write(encoded)
+        for name, array in arrays.items():
+            f.seek(data_start + specs[name]['offset'])
+            f.write(array.data)
+        f.truncate(data_start + offset)
+    os.replace(filename + '.tmp', filename)
+
+def read_checkpoint(filename):
+    """
+    Header and {name: ndarray} of a checkpoint. The arrays are copy-on-write
+    views of a private memory map of the file: they can be modified freely
+    without touching the file, and only the pages written to are copied.
+    """
+    with open(filename, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    magic, version, header_length = _PREFIX.unpack_from(buffer, 0)
+    if magic != CHECKPOINT_MAGIC:
+        raise ValueError(f"{filename} is not an ASERSA checkpoint")
+    if version > CHECKPOINT_VERSION:
+        raise ValueError(f"{filename} has checkpoint format version {version}; this version reads up to {CHECKPOINT_VERSION}")
+    header = json.loads(buffer[_PREFIX.size:_PREFIX.size + header_length].decode('utf-8'))
+    data_start = _align(_PREFIX.size + header_length)
+    arrays = {}
+    for name, spec in header.pop('arrays').items():
+        shape = tuple(spec['shape'])
+        arrays[name] = np.frombuffer(buffer, dtype=spec['dtype'], count=int(np.prod(shape)),
+                                     offset=data_start + spec['offset']).reshape(shape)
+    return header, arrays
@@ -0,0 +1,45 @@
+"""
+Runtime model configuration.
+
+The model tunables (the ones the GUI sliders and parameter sweeps change)
+live in a ModelConfig owned by each Simulation instead of in the
+parameters module, so several simulations in one process, or successive
+tasks in one sweep worker, never see each other's settings. A new
+ModelConfig takes its defaults from parameters; the kernels that use a
+tunable receive it as an argument from the simulation's config, and the
+policy stages read it from there (TAU_MAX in the status tax, THETA in
+the relative_deprivation policy).
+"""
+import parameters
+
+MODEL_PARAMETERS = ['TAU_MAX', 'THETA', 'K6', 'K7', 'COPT']
+
+class ModelConfig:
+    """
+    Values of the MODEL_PARAMETERS for one simulation, e.g.
+    ModelConfig(K6=0.02). Attributes can be changed while it runs.
+    """
+    def __init__(self, **values):
+        for name in MODEL_PARAMETERS:
+            setattr(self, name, getattr(parameters, name))
+        self.update(values)
+
+    def update(self, values):
+        unknown = [name for name in values if name not in MODEL_PARAMETERS]
+        if unknown:
+            raise ValueError(f"Unknown model parameters {unknown}; expected any of {MODEL_PARAMETERS}")
+        for name, value in values.items():
+            setattr(self, name, value)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in MODEL_PARAMETERS}
+
+    def copy(self):
+        return ModelConfig(**self.to_dict())
+
+    def __eq__(self, other):
+        return isinstance(other, ModelConfig) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        values = ', '.join(f'{name}={value!r}' for name, value in self.to_dict().items())
+        return f'ModelConfig({values})'
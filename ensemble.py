@@ -0,0 +1,93 @@
+"""
+Ensembles of independent replicate simulations stepped in one process.
+
+An Ensemble keeps its replicates in a PopulationBatch and wraps every
+replicate in an ordinary Simulation seeded from its own child of one root
+SeedSequence. Each step runs the tax policy, network, DFIA and competence
+phases replicate by replicate, then the psychology, action level and
+reward phases once for the whole (B, N) batch, and finally each
+replicate's history and metrics. Replicate b follows exactly the
+trajectory of a standalone Simulation(seed=ensemble.seeds[b]). All
+replicates share one ModelConfig, since the batched phases use a single
+set of model parameters.
+"""
+import logging
+import time
+import numpy as np
+from parameters import (
+    NUM_AGENTS, FLAT_TAX_RATE, NETWORK_PROBABILITY, NETWORK_MODEL, HISTORY_STRIDE, DELTA_W_CONSTANT
+)
+from population import PopulationBatch
+from history import History
+from simulation import Simulation
+from config import ModelConfig
+from functions import compute_population_psychology, compute_population_action_level, update_population_rewards
+logger = logging.getLogger(__name__)
+
+class Ensemble:
+    def __init__(self, num_replicates, num_agents=NUM_AGENTS, seed=None, policy='flat', flat_tax_rate=FLAT_TAX_RATE,
+                 network_probability=NETWORK_PROBABILITY, network_model=NETWORK_MODEL,
+                 history_variables=None, history_stride=HISTORY_STRIDE, config=None):
+        self.config = config if config is not None else ModelConfig()
+        self.seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.seeds = self.seed_sequence.spawn(num_replicates)
+        self.batch = PopulationBatch(num_replicates, num_agents)
+        self.simulations = []
+        for population, replicate_seed in zip(self.batch.populations, self.seeds):
+            population.history = History(population, history_variables, history_stride)
+            simulation = Simulation(num_agents=num_agents, seed=replicate_seed, network_probability=network_probability,
+                                    network_model=network_model, population=population, config=self.config)
+            simulation.draw_initial_tokens(population)
+            simulation.current_policy = policy
+            simulation.FLAT_TAX_RATE = flat_tax_rate
+            self.simulations.append(simulation)
+        self.time_step = 0
+
+    def __len__(self):
+        return len(self.simulations)
+
+    def __getitem__(self, replicate):
+        return self.simulations[replicate]
+
+    def start(self):
+        for simulation in self.simulations:
+            simulation.start()
+
+    def update(self):
+        """
+        Advance every replicate by one step.
+        """
+        starts = []
+        for simulation in self.simulations:
+            starts.append(time.perf_counter())
+            adjacency, degree = simulation.begin_step()
+            simulation.update_environment(adjacency, degree)
+        batch = self.batch
+        compute_population_psychology(batch, self.config.K6)
+        batch.AL[:] = compute_population_action_level(batch.C, batch.V, batch.A)
+        update_population_rewards(batch, sum(DELTA_W_CONSTANT.values()))
+        for simulation, start in zip(self.simulations, starts):
+            population = simulation.population
+            simulation.R, simulation.S, simulation.V, simulation.A, simulation.IN = (
+                population.R, population.S, population.V, population.A, population.IN)
+            simulation.C, simulation.AL = population.C, population.AL
+            simulation.finish_step(start)
+        self.time_step += 1
+
+    def run(self, num_steps):
+        self.start()
+        for _ in range(num_steps):
+            self.update()
+        return self
+
+    def gini_histories(self):
+        """
+        (B, T) array of every replicate's Gini trajectory.
+        """
+        return np.array([simulation.gini_history for simulation in self.simulations])
+
+    def wealth_histories(self):
+        return np.array([simulation.wealth_history for simulation in self.simulations])
+
+    def avg_competence_histories(self):
+        return np.array([simulation.avg_competence_history for simulation in self.simulations])
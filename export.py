@@ -0,0 +1,52 @@
+import os
+import logging
+import numpy as np
+from parameters import EXPORT_BATCH_ROWS, EXPORT_COMPRESSION
+logger = logging.getLogger(__name__)
+
+def _column_name(history, name):
+    return f'Tokens {name}' if name in history.token_types else name
+
+def export_agents_parquet(history, agent_ids, path, batch_rows=EXPORT_BATCH_ROWS, compression=EXPORT_COMPRESSION):
+    """
+    Write the per-agent history to one compressed Parquet file in long
+    format (Time Step, Agent ID, variables...). Rows are streamed in row
+    groups of about batch_rows rows, so only one batch is held in memory.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Parquet export requires pyarrow; install it or use the 'csv' export format.") from e
+
+    agent_ids = np.asarray(agent_ids, dtype=np.int64)
+    num_agents = len(agent_ids)
+    time_steps = np.asarray(history.get_time_steps(), dtype=np.int64)
+    steps_per_batch = max(1, batch_rows // max(num_agents, 1))
+    fields = [pa.field('Time Step', pa.int64()), pa.field('Agent ID', pa.int64())]
+    fields += [pa.field(_column_name(history, name), pa.float64()) for name in history.variables]
+    schema = pa.schema(fields)
+
+    with pq.ParquetWriter(path, schema, compression=compression) as writer:
+        for start in range(0, len(time_steps), steps_per_batch):
+            stop = min(start + steps_per_batch, len(time_steps))
+            arrays = [
+                pa.array(np.repeat(time_steps[start:stop], num_agents)),
+                pa.array(np.tile(agent_ids, stop - start)),
+            ]
+            for name in history.variables:
+                arrays.append(pa.array(np.ascontiguousarray(history.rows(name, start, stop)).ravel()))
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+def export_agents_csv(history, agent_ids, export_dir):
+    """
+    Legacy export: one agent_{id}_data.csv file per agent.
+    """
+    import pandas as pd
+    time_steps = history.get_time_steps()
+    columns = {name: history.column(name) for name in history.variables}
+    for index, agent_id in enumerate(agent_ids):
+        agent_data = pd.DataFrame({'Time Step': time_steps})
+        for name, values in columns.items():
+            agent_data[_column_name(history, name)] = values[:, index]
+        agent_data.to_csv(os.path.join(export_dir, f'agent_{agent_id}_data.csv'), index=False)
@@ -1,92 +1,165 @@
 import numpy as np
-from parameters import *
+from parameters import (
+    ROPT, SOPT, IOPT, VOPT, ASOPT, COPT, PSI, ETA, LAMBDA_, K6, K7,
+    TAU_MAX, THETA, OMEGA_W, OMEGA_AS, OMEGA_E, E
+)
 import logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
-import gui
-import networkx as nx
-import math
 
-def compute_DFIA(agents):
+def compute_DFIA(population, total_force=None):
+    """
+    Dynamic Force Index Algorithm for the whole population in O(N).
+
+    The society total force (XnF) is computed once, or taken from
+    total_force when the caller maintains it incrementally, and every
+    per-agent quantity is derived from it as an array expression.
+    """
     z = 100 # Zone consisting of 100% - (This is alfa null(an infinite scaleable theoretical space which always can be interpretted as 100% no matter the number of X's or the size of the force("F": value of variables)))
-    Xn = len(agents)  # Total number(n) of agents(X)
+    Xn = len(population)  # Total number(n) of agents(X)
     Xz = z / Xn  # Theoretical volume per agent
-    for agent in agents:
-        agent.XF_t = sum(agent.tokens.values()) # Relative force(F) of agent(X) - (number of tokens the specific agent currently holds)
-        agent.XnF_t = sum(sum(a.tokens.values()) for a in agents)  # Total relative force of all agents summed together
-        agent.XrnF_t = agent.XnF_t - agent.XF_t # # Total force of all agents summed together(XnF), exclusive the force of the specific agent(XF) currently under consideration
-        agent.Sigma_Xi_t = (agent.XnF_t * (Xn - 1)) / (agent.XrnF_t * Xn)
-        agent.Xz_t = Xz * agent.Sigma_Xi_t # Xz_t represents relative volume (Agent Status)
-        agent.Xzo_t = agent.Xz_t - Xz # Xzo_t represents relative Influence
-        """
-        Changing names of DFIA variables
-        """
-        agent.SF = agent.XrnF_t # Relative society force(SF)
-        agent.AF = agent.XF_t # Relative Agent force(AF)
-        agent.SS = z - agent.Xz_t # Relative society status(SS)
-        agent.AS = agent.Xz_t # Relative agent status(AS)
-        agent.SI = agent.Sigma_Xi_t # Relative society influence(SI)
-        agent.AI = agent.Xzo_t # # Relative influence(I)
-    
-    return agent.AS, agent.SS, agent.SI, agent.AI
+    XF_t = population.wealth() # Relative force(F) of agent(X) - (number of tokens the specific agent currently holds)
+    XnF_t = XF_t.sum() if total_force is None else total_force  # Total relative force of all agents summed together
+    XrnF_t = XnF_t - XF_t # # Total force of all agents summed together(XnF), exclusive the force of the specific agent(XF) currently under consideration
+    Sigma_Xi_t = (XnF_t * (Xn - 1)) / (XrnF_t * Xn)
+    Xz_t = Xz * Sigma_Xi_t # Xz_t represents relative volume (Agent Status)
+    Xzo_t = Xz_t - Xz # Xzo_t represents relative Influence
+    """
+    Changing names of DFIA variables
+    """
+    population.SF[:] = XrnF_t # Relative society force(SF)
+    population.AF[:] = XF_t # Relative Agent force(AF)
+    population.SS[:] = z - Xz_t # Relative society status(SS)
+    population.AS[:] = Xz_t # Relative agent status(AS)
+    population.SI[:] = Sigma_Xi_t # Relative society influence(SI)
+    population.AI[:] = Xzo_t # # Relative influence(I)
+
+    return population.AS, population.SS, population.SI, population.AI
+
+# Psychological variables of the whole population. Every kernel takes
+# arrays (or scalars) and applies the zero guards elementwise; the scalar
+# compute_* functions below are thin wrappers for a single agent.
+
+def compute_population_responsibility(AF, SF):
+    AF = np.asarray(AF, dtype=np.float64)
+    SF = np.asarray(SF, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        force_ratio = AF / SF
+        R = force_ratio / (1 + force_ratio) * ROPT
+    return np.where((AF == 0) | (SF == 0), 0.0, R)
+
+def compute_population_self_esteem(SS, AS):
+    SS = np.asarray(SS, dtype=np.float64)
+    AS = np.asarray(AS, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        status_ratio = AS / (SS + AS)
+        S = (status_ratio ** 2) * SOPT
+    return np.where(AS == 0, 0.0, S)
+
+def compute_population_inspiration(AI, SI):
+    AI = np.asarray(AI, dtype=np.float64)
+    SI = np.asarray(SI, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = AI / SI * IOPT
+        IN = np.sqrt(result)
+    return np.where((result >= 0) & (SI != 0), IN, 0.0)
+
+def compute_population_willpower(S, IN):
+    S = np.asarray(S, dtype=np.float64)
+    IN = np.asarray(IN, dtype=np.float64)
+    if VOPT is None:
+        return np.zeros(np.broadcast(S, IN).shape)
+    V = VOPT * (1 - np.exp(-(S * IN)))
+    return np.where((S == 0) | (IN == 0), 0.0, V)
+
+def compute_population_ambition(IN, R, k6=K6):
+    IN = np.asarray(IN, dtype=np.float64)
+    R = np.asarray(R, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        A = k6 * (1 - np.exp(-(IN / R)))
+    return np.where((IN == 0) | (R == 0), 0.0, A)
+
+def compute_population_action_level(C, V, A):
+    motivation = np.asarray(C, dtype=np.float64) * V * A
+    with np.errstate(invalid='ignore'):
+        AL = PSI * (1 - np.exp(-(motivation ** (1/3))))
+    # Also zero for a negative product, whose real cube root is undefined here
+    return np.where(motivation > 0, AL, 0.0)
+
+def compute_population_psychology(population, k6=K6):
+    """
+    Update R, S, IN, V and A of every agent from the DFIA columns; k6 is
+    the ambition proportion.
+    """
+    population.R[:] = compute_population_responsibility(population.AF, population.SF)
+    population.S[:] = compute_population_self_esteem(population.SS, population.AS)
+    population.IN[:] = compute_population_inspiration(population.AI, population.SI)
+    population.V[:] = compute_population_willpower(population.S, population.IN)
+    population.A[:] = compute_population_ambition(population.IN, population.R, k6)
+    return population.R, population.S, population.V, population.A, population.IN
+
+def compute_population_reward(weights, P_PREV, income, community_contribution, DELTA_AS, eta=ETA, lambda_=LAMBDA_):
+    """
+    TD-style reward and weight learning for many agents at once. weights
+    holds the (alpha, beta, gamma) rows of every agent, shape (..., N, 3),
+    with any leading batch dimensions; the other arguments broadcast
+    against weights[..., 0]. The weights are updated in place and
+    renormalised to sum to one (1/3 each where their sum is zero);
+    returns the reward r, prediction P and TD error delta.
+    """
+    gradients = np.stack(np.broadcast_arrays(income, community_contribution, DELTA_AS), axis=-1)
+    r = weights[..., 0] * gradients[..., 0] + weights[..., 1] * gradients[..., 1] + weights[..., 2] * gradients[..., 2]
+    P = (1 - lambda_) * r + lambda_ * P_PREV
+    delta = r + lambda_ * P - P_PREV
+    weights += (eta * delta)[..., None] * gradients
+    total_weight = weights[..., 0] + weights[..., 1] + weights[..., 2]
+    nonzero = total_weight != 0
+    weights /= np.where(nonzero, total_weight, 1.0)[..., None]
+    weights[~nonzero] = 1 / 3
+    return r, P, delta
+
+def update_population_rewards(population, income):
+    """
+    Reward and weight update of every agent of a Population (or of every
+    replicate of a PopulationBatch); income is the per-step token income.
+    """
+    r, P, delta = compute_population_reward(population.weights, population.P_PREV, income,
+                                            population.community_contribution, population.DELTA_AS)
+    population.r[:] = r
+    population.P[:] = P
+    population.delta[:] = delta
+    population.P_PREV[:] = P
+    return r, P, delta
 
 def compute_responsibility(AF, SF):
-    if AF == 0 or SF == 0:
-        return 0
-    force_ratio = AF / SF
-    normalized_ratio = force_ratio / (1 + force_ratio)
-    R = normalized_ratio * ROPT
-    return R
+    return float(compute_population_responsibility(AF, SF))
 
 def compute_self_esteem(SS, AS):
-    if AS == 0:
-        return 0
-    status_ratio = AS / (SS + AS)
-    S = (status_ratio ** 2) * SOPT
-    return S
+    return float(compute_population_self_esteem(SS, AS))
 
 def compute_inspiration(AI, SI):
-    influence_ratio = AI / SI
-    result = influence_ratio * IOPT
-    if result >= 0:
-        IN = math.sqrt(result)
-    else:
-        IN = 0
-    return IN
+    return float(compute_population_inspiration(AI, SI))
 
 def compute_willpower(S, IN):
-    if VOPT is None or S == 0 or IN == 0:
-        return 0 
-    motivation = S * IN
-    V = VOPT * (1 - math.exp(-motivation))
-    return V
-
-def compute_ambition(IN, R):
-    K6 = gui.K6
-    if IN == 0 or R == 0:
-        return 0
-    ratio = IN / R if R != 0 else 0
-    A = K6 * (1 - math.exp(-ratio))
-    return A
+    return float(compute_population_willpower(S, IN))
+
+def compute_ambition(IN, R, k6=K6):
+    return float(compute_population_ambition(IN, R, k6))
 
 def compute_action_level(C, V, A):
-    if C == 0 or V == 0 or A == 0:
-        return 0
-    motivation = (C * V * A) ** (1/3)
-    AL = PSI * (1 - math.exp(-motivation))
-    return AL
+    return float(compute_population_action_level(C, V, A))
+
+def calculate_tax_rate(AS, tokens, tau_max=TAU_MAX):
+    return calculate_tax_rates(AS, sum(tokens.values()), tau_max)
 
-def calculate_tax_rate(AS, tokens):
-    wealth_component = OMEGA_W * (sum(tokens.values()))
+def calculate_tax_rates(AS, wealth, tau_max=TAU_MAX):
+    wealth_component = OMEGA_W * wealth
     status_component = OMEGA_AS * AS / ASOPT if ASOPT != 0 else 0
     economic_component = OMEGA_E * E
-    tau = TAU_MAX * (wealth_component + status_component + economic_component)
-    tau = min(tau, TAU_MAX)
+    tau = tau_max * (wealth_component + status_component + economic_component)
+    tau = np.minimum(tau, tau_max)
     return tau
 
-def compute_competence(G, agent_id, agents):
-    K7 = gui.K7
-    COPT = gui.COPT 
+def compute_competence(G, agent_id, agents, k7=K7, copt=COPT):
     neighbors = list(G.neighbors(agent_id))
     if not neighbors:
         return agents[agent_id].C if hasattr(agents[agent_id], 'C') else 0
@@ -98,24 +171,49 @@ def compute_competence(G, agent_id, agents):
         normalized_avg = avg_neighbor_competence / (avg_neighbor_competence + 1)
     else:
         normalized_avg = 0
-    C = K7 * COPT * (1 - normalized_avg)
-    C = max(0, min(C, COPT))
-    logging.info(f"Agent {agent_id}: Avg neighbor competence: {avg_neighbor_competence}, Normalized: {normalized_avg}, Calculated C: {C}")
+    C = k7 * copt * (1 - normalized_avg)
+    C = max(0, min(C, copt))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Agent %s: Avg neighbor competence: %s, Normalized: %s, Calculated C: %s",
+                     agent_id, avg_neighbor_competence, normalized_avg, C)
     return C
 
-def redistribute_taxes(agents, total_tax_collected):
-    W_avg = np.mean([sum(agent.tokens.values()) for agent in agents])
-    RD_indices = []
-    for agent in agents:
-        RD = (W_avg - sum(agent.tokens.values())) / W_avg if W_avg != 0 else 0
-        RD_indices.append(RD)
-    RD_indices_theta = [RD ** THETA if RD > 0 else 0 for RD in RD_indices]
-    total_RD = sum(RD_indices_theta)
+def compute_population_competence(adjacency, degree, C, k7=K7, copt=COPT):
+    """
+    Competence update for every agent at once from the mean competence of
+    its network neighbours, computed as one sparse mat-vec over the CSR
+    adjacency. Agents without neighbours keep their current competence.
+    """
+    has_neighbors = degree > 0
+    avg_neighbor_competence = np.divide(adjacency @ C, degree, out=np.zeros_like(C), where=has_neighbors)
+    positive = avg_neighbor_competence > 0
+    normalized_avg = np.divide(avg_neighbor_competence, avg_neighbor_competence + 1, out=np.zeros_like(C), where=positive)
+    new_C = np.clip(k7 * copt * (1 - normalized_avg), 0, copt)
+    return np.where(has_neighbors, new_C, C)
+
+def redistribute_taxes(population, total_tax_collected, theta=THETA):
+    W = population.wealth()
+    W_avg = np.mean(W)
+    if W_avg != 0:
+        RD_indices = (W_avg - W) / W_avg
+    else:
+        RD_indices = np.zeros_like(W)
+    RD_indices_theta = np.where(RD_indices > 0, np.maximum(RD_indices, 0) ** theta, 0)
+    total_RD = sequential_sum(RD_indices_theta)
     if total_RD == 0:
         return
-    for i, agent in enumerate(agents):
-        share = (RD_indices_theta[i] / total_RD) * sum(total_tax_collected.values()) if total_RD != 0 else 0
-        agent.tokens['type 1'] += share
+    share = (RD_indices_theta / total_RD) * sum(total_tax_collected.values())
+    population.token_column('type 1')[:] += share
+    population.adjust_total_force(share.sum())
+
+def sequential_sum(values, start=0):
+    """
+    Left-to-right float sum (start + v0 + v1 + ...), matching a Python
+    accumulation loop bit for bit, unlike the pairwise np.sum.
+    """
+    if len(values) == 0:
+        return start
+    return np.cumsum(np.concatenate(([start], values)))[-1]
 
 def gini_coefficient(values):
     sorted_values = np.sort(values)
@@ -1,23 +1,137 @@
 import os
 from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
-    QLabel, QSlider, QTableWidget, QTableWidgetItem, QTextEdit,
+    QLabel, QSlider, QTableView, QHeaderView, QSpinBox, QTextEdit,
     QFileDialog, QDialog, QScrollArea, QComboBox
 )
-from PyQt5.QtCore import QTimer, Qt
+from PyQt5.QtCore import QTimer, Qt, QAbstractTableModel, QModelIndex
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
+from mpl_toolkits.mplot3d.art3d import Line3DCollection
+import numpy as np
+import scipy.sparse as sp
 from simulation import Simulation
-import networkx as nx
+from worker import SimulationWorker
+from live_plot import LiveChart, decimate
+from policy import POLICIES
+import parameters
 import ctypes
 import logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# GUI Parameter Sliders (Initial Values)
-K6 = 0.01
-K7 = 0.1
-COPT = 100
+AGENT_TABLE_COLUMNS = ["ID", "Type 1 Tokens", "Type 2 Tokens", "AI", "AS", "C", "Wealth"]
+WEALTH_COLUMN = AGENT_TABLE_COLUMNS.index("Wealth")
+
+class AgentTableModel(QAbstractTableModel):
+    """
+    Agent table over the per-agent arrays of the latest SimulationSnapshot.
+    Cells are formatted only when the view asks for them, i.e. for the
+    visible rows. Sorting and the top-K filter reorder an index array
+    into the snapshot instead of the data.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.agent_ids = np.empty(0, dtype=np.int64)
+        self.values = []
+        self.order = None  # Row -> agent index; None shows the agents in id order
+        self.sort_column = -1
+        self.sort_order = Qt.AscendingOrder
+        self.top_k = 0
+
+    @staticmethod
+    def snapshot_columns(snapshot):
+        zeros = np.zeros(len(snapshot.agent_ids))
+        tokens = snapshot.tokens
+        return [snapshot.agent_ids, tokens.get('type 1', zeros), tokens.get('type 2', zeros),
+                snapshot.columns['AI'], snapshot.columns['AS'], snapshot.columns['C'], sum(tokens.values())]
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.order) if self.order is not None else len(self.agent_ids)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(AGENT_TABLE_COLUMNS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        agent = self.agent_index(index.row())
+        if index.column() == 0:
+            return str(self.agent_ids[agent])
+        return f"{self.values[index.column()][agent]:.2f}"
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return AGENT_TABLE_COLUMNS[section]
+        return str(section + 1)
+
+    def agent_index(self, row):
+        return self.order[row] if self.order is not None else row
+
+    def agent_id(self, row):
+        return int(self.agent_ids[self.agent_index(row)])
+
+    def _ordering(self, values):
+        """
+        Row order for the current sort column and top-K filter: the K
+        largest values of the sort column (wealth if unsorted) by partial
+        selection, then sorted.
+        """
+        if self.sort_column < 0 and not self.top_k:
+            return None
+        key = values[self.sort_column if self.sort_column >= 0 else WEALTH_COLUMN]
+        descending = self.sort_order == Qt.DescendingOrder or self.sort_column < 0
+        if self.top_k and self.top_k < len(key):
+            rows = np.argpartition(key, len(key) - self.top_k)[len(key) - self.top_k:]
+            rows = rows[np.argsort(key[rows], kind='stable')]
+        else:
+            rows = np.argsort(key, kind='stable')
+        return rows[::-1] if descending else rows
+
+    def set_snapshot(self, snapshot, first_row=0, last_row=-1):
+        """
+        Show snapshot; only rows first_row..last_row (the visible ones, -1
+        for the last row) are reported as changed unless the number of
+        rows changed.
+        """
+        values = self.snapshot_columns(snapshot)
+        order = self._ordering(values)
+        rows = len(order) if order is not None else len(snapshot.agent_ids)
+        if rows != self.rowCount():
+            self.beginResetModel()
+            self.agent_ids, self.values, self.order = snapshot.agent_ids, values, order
+            self.endResetModel()
+            return
+        self.agent_ids, self.values, self.order = snapshot.agent_ids, values, order
+        if rows:
+            last_row = rows - 1 if last_row < 0 else min(last_row, rows - 1)
+            self.dataChanged.emit(self.index(max(first_row, 0), 0), self.index(last_row, len(AGENT_TABLE_COLUMNS) - 1))
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.layoutAboutToBeChanged.emit()
+        self.sort_column = column
+        self.sort_order = order
+        if self.values:
+            self.order = self._ordering(self.values)
+        self.layoutChanged.emit()
+
+    def set_top_k(self, k):
+        self.beginResetModel()
+        self.top_k = k
+        if self.values:
+            self.order = self._ordering(self.values)
+        self.endResetModel()
+
+# Per-agent values the network nodes can be coloured by
+NODE_COLOR_VARIABLES = {
+    'Color by Wealth': lambda snapshot: sum(snapshot.tokens.values()),
+    'Color by Agent Status (AS)': lambda snapshot: snapshot.columns['AS'],
+    'Color by Competence (C)': lambda snapshot: snapshot.columns['C'],
+}
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -31,9 +145,16 @@ class MainWindow(QMainWindow):
         window_height = int(screen_height * 0.9)
         self.resize(window_width, window_height)
         self.initUI()
+        # The simulation steps in a background thread; the GUI redraws the
+        # latest published snapshot every GUI_FRAME_INTERVAL ms
+        self.worker = SimulationWorker(self.simulation)
+        self.worker.failed.connect(self.simulation_failed)
+        self.worker.start()
         self.timer = QTimer()
-        self.timer.timeout.connect(self.update_simulation)
+        self.timer.timeout.connect(self.render_latest)
+        self.timer.start(parameters.GUI_FRAME_INTERVAL)
         self.is_paused = True
+        self.snapshot = None
         self.agent_details_windows = []
         self.zoom_factor = 1.0
         logger.info("GUI initialized.")
@@ -57,7 +178,7 @@ class MainWindow(QMainWindow):
         self.k6_slider = QSlider(Qt.Horizontal)
         self.k6_slider.setMinimum(1)
         self.k6_slider.setMaximum(1000)
-        self.k6_slider.setValue(int(K6 * 1000))
+        self.k6_slider.setValue(int(self.simulation.config.K6 * 1000))
         self.k6_slider.valueChanged.connect(self.update_k6)
         slider_layout.addWidget(self.k6_slider)
 
@@ -65,7 +186,7 @@ class MainWindow(QMainWindow):
         self.k7_slider = QSlider(Qt.Horizontal)
         self.k7_slider.setMinimum(1)
         self.k7_slider.setMaximum(1000)
-        self.k7_slider.setValue(int(K7 * 1000))
+        self.k7_slider.setValue(int(self.simulation.config.K7 * 1000))
         self.k7_slider.valueChanged.connect(self.update_k7)
         slider_layout.addWidget(self.k7_slider)
 
@@ -110,7 +231,7 @@ class MainWindow(QMainWindow):
         # Tax Policy Selection
         left_layout.addWidget(QLabel("Tax Policy"))
         self.policy_combo = QComboBox()
-        self.policy_combo.addItems(['flat', 'ubi', 'progressive'])
+        self.policy_combo.addItems(list(POLICIES))
         left_layout.addWidget(self.policy_combo)
         self.apply_policy_button = QPushButton("Apply Policy")
         self.apply_policy_button.clicked.connect(self.apply_policy_from_gui)
@@ -130,26 +251,46 @@ class MainWindow(QMainWindow):
         # Middle panel: Agent Dashboard
         middle_layout = QVBoxLayout()
         middle_layout.addWidget(QLabel("Agent Status Dashboard"))
-        self.agent_table = QTableWidget()
-        self.agent_table.setColumnCount(6)
-        self.agent_table.setHorizontalHeaderLabels(["ID", "Type 1 Tokens", "Type 2 Tokens", "AI", "AS", "C"])
-        self.agent_table.itemSelectionChanged.connect(self.agent_selected)
+        self.agent_model = AgentTableModel(self)
+        self.agent_table = QTableView()
+        self.agent_table.setModel(self.agent_model)
+        # Fixed row heights let the view find the visible rows without measuring every row
+        self.agent_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.agent_table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.agent_table.setSortingEnabled(True)
+        self.agent_table.clicked.connect(self.agent_selected)
         middle_layout.addWidget(self.agent_table)
+        middle_layout.addWidget(QLabel("Show Top K Agents (by sort column, or wealth)"))
+        self.top_k_spin = QSpinBox()
+        self.top_k_spin.setRange(0, 10 ** 9)
+        self.top_k_spin.setSpecialValueText("All agents")
+        self.top_k_spin.valueChanged.connect(self.agent_model.set_top_k)
+        middle_layout.addWidget(self.top_k_spin)
 
         # Right panel: Graphs and Network
         right_layout = QVBoxLayout()
         right_layout.addWidget(QLabel("Dynamic Graphs"))
         self.figure = Figure(figsize=(5, 3))
         self.canvas = FigureCanvas(self.figure)
+        self.chart = LiveChart(self.figure, self.canvas, [
+            ('avg_wealth', "Average Wealth"), ('gini', "Gini Coefficient"), ('avg_competence', "Average Competence"),
+        ], max_points=parameters.GUI_PLOT_POINTS)
         right_layout.addWidget(self.canvas)
         
         # Network Visualization
         right_layout.addWidget(QLabel("Network Visualization"))
         self.network_figure = Figure(figsize=(5, 3))
         self.network_canvas = FigureCanvas(self.network_figure)
+        self.network_canvas.mpl_connect('scroll_event', self.zoom)
+        self.network_ax = None
+        self.network_simulation = None
         self.reset_button = QPushButton("Reset View")
         self.reset_button.clicked.connect(self.reset_view)
         right_layout.addWidget(self.reset_button)
+        self.node_color_combo = QComboBox()
+        self.node_color_combo.addItems(list(NODE_COLOR_VARIABLES))
+        self.node_color_combo.currentTextChanged.connect(self.rerender)
+        right_layout.addWidget(self.node_color_combo)
         right_layout.addWidget(self.network_canvas)
 
         # Assemble layouts
@@ -161,20 +302,22 @@ class MainWindow(QMainWindow):
 
     def apply_policy_from_gui(self):
         policy_name = self.policy_combo.currentText()
-        # Ensure total_tax_collected is a dictionary
-        if not isinstance(self.simulation.total_tax_collected, dict):
-            self.simulation.total_tax_collected = {k: 0 for k in self.simulation.agents[0].tokens.keys()}
-        self.simulation.apply_policy(policy_name)
+        with self.worker.lock:
+            # Ensure total_tax_collected is a dictionary
+            if not isinstance(self.simulation.total_tax_collected, dict):
+                self.simulation.total_tax_collected = {k: 0 for k in self.simulation.agents[0].tokens.keys()}
+            self.simulation.apply_policy(policy_name)
         self.log(f"Applied tax policy: {policy_name}")
 
     def export_data(self):
         try:
-            if not self.simulation.time_series:
-                self.log("No data available to export. Please run the simulation for some time steps before exporting.")
-                return
-            export_dir = os.path.join("simulation_data", "exported_data")
-            os.makedirs(export_dir, exist_ok=True)
-            self.simulation.export_data()
+            with self.worker.lock:
+                if not self.simulation.time_series:
+                    self.log("No data available to export. Please run the simulation for some time steps before exporting.")
+                    return
+                export_dir = os.path.join("simulation_data", "exported_data")
+                os.makedirs(export_dir, exist_ok=True)
+                self.simulation.export_data()
             self.save_plots()
             self.log("Data and plots exported successfully.")
         except Exception as e:
@@ -184,31 +327,31 @@ class MainWindow(QMainWindow):
         export_dir = os.path.join("simulation_data", "exported_plots")
         os.makedirs(export_dir, exist_ok=True)
         dynamic_plot_path = os.path.join(export_dir, "average_wealth_over_time.png")
-        self.figure.savefig(dynamic_plot_path)
+        self.chart.savefig(dynamic_plot_path)
         network_plot_path = os.path.join(export_dir, "network_visualization.png")
         self.network_figure.savefig(network_plot_path)
         self.log(f"Plots saved to {export_dir}.")
 
     def start_simulation(self):
         if self.is_paused:
-            self.simulation.start()
-            self.timer.start(1000)
+            self.worker.resume()
             self.start_button.setText("Pause")
             self.stop_button.setEnabled(True)
             self.step_button.setEnabled(False)
             self.is_paused = False
             self.log("Simulation started.")
         else:
-            self.simulation.pause()
-            self.timer.stop()
+            self.worker.pause()
             self.start_button.setText("Resume")
             self.step_button.setEnabled(True)
             self.is_paused = True
             self.log("Simulation paused.")
 
     def stop_simulation(self):
-        self.simulation.stop()
-        self.timer.stop()
+        self.worker.pause()
+        with self.worker.lock:
+            self.simulation.stop()
+        self.worker.publish()
         self.start_button.setText("Start")
         self.start_button.setEnabled(True)
         self.stop_button.setEnabled(False)
@@ -217,58 +360,72 @@ class MainWindow(QMainWindow):
         self.log("Simulation stopped.")
 
     def step_simulation(self):
-        self.simulation.step()
-        self.update_simulation()
+        self.worker.step()
+        self.render_latest()
         self.log("Simulation stepped.")
 
     def update_k6(self):
-        global K6
-        K6 = self.k6_slider.value() / 100.0
-        self.log(f"Ambition proportion adjusted to {K6}")
+        with self.worker.lock:
+            self.simulation.config.K6 = self.k6_slider.value() / 100.0
+        self.log(f"Ambition proportion adjusted to {self.simulation.config.K6}")
 
     def update_k7(self):
-        global K7
-        K7 = self.k7_slider.value() / 100.0
-        self.log(f"Competence learning rate adjusted to {K7}")
+        with self.worker.lock:
+            self.simulation.config.K7 = self.k7_slider.value() / 100.0
+        self.log(f"Competence learning rate adjusted to {self.simulation.config.K7}")
 
     def update_flat_tax_rate(self, value):
-        self.simulation.FLAT_TAX_RATE = value / 100.0  # Convert from percentage to decimal
+        with self.worker.lock:
+            self.simulation.FLAT_TAX_RATE = value / 100.0  # Convert from percentage to decimal
         self.log(f"Flat tax rate adjusted to {self.simulation.FLAT_TAX_RATE:.2%}")
 
-    def update_simulation(self):
-        self.simulation.update()
-        self.update_agent_table()
-        self.update_stats()  # Make sure this is called
-        self.update_graphs()
-        self.update_network()
-
-    def update_agent_table(self):
-        self.agents = self.simulation.get_agents()
-        self.agent_table.setRowCount(len(self.agents))
-        for i, agent in enumerate(self.agents):
-            self.agent_table.setItem(i, 0, QTableWidgetItem(str(agent.agent_id)))
-            self.agent_table.setItem(i, 1, QTableWidgetItem(f"{agent.tokens.get('type 1', 0):.2f}"))
-            self.agent_table.setItem(i, 2, QTableWidgetItem(f"{agent.tokens.get('type 2', 0):.2f}"))
-            self.agent_table.setItem(i, 3, QTableWidgetItem(f"{agent.AI:.2f}"))
-            self.agent_table.setItem(i, 4, QTableWidgetItem(f"{agent.AS:.2f}"))
-            self.agent_table.setItem(i, 5, QTableWidgetItem(f"{agent.C:.2f}" if agent.C is not None else "-"))
-
-    def agent_selected(self):
-        selected_items = self.agent_table.selectedItems()
-        if selected_items:
-            row = selected_items[0].row()
-            self.agent_id = int(self.agent_table.item(row, 0).text())
-            column = self.agent_table.currentColumn()
+    def simulation_failed(self, message):
+        self.start_button.setText("Resume")
+        self.step_button.setEnabled(True)
+        self.is_paused = True
+        self.log(f"Simulation paused after an error: {message}")
+
+    def render_latest(self):
+        """
+        Redraw from the newest snapshot; does nothing if no step finished
+        since the last frame.
+        """
+        snapshot = self.worker.latest_snapshot()
+        if snapshot is not None:
+            self.render(snapshot)
+
+    def rerender(self):
+        if self.snapshot is not None:
+            self.render(self.snapshot)
+
+    def render(self, snapshot):
+        self.snapshot = snapshot
+        self.update_agent_table(snapshot)
+        self.update_stats(snapshot)
+        self.update_graphs(snapshot)
+        self.update_network(snapshot)
+
+    def update_agent_table(self, snapshot):
+        first_row = max(self.agent_table.rowAt(0), 0)
+        last_row = self.agent_table.rowAt(self.agent_table.viewport().height() - 1)
+        self.agent_model.set_snapshot(snapshot, first_row, last_row)
+
+    def agent_selected(self, index):
+        if index.isValid():
+            self.agent_id = self.agent_model.agent_id(index.row())
+            column = index.column()
             if column == 0:
                 self.show_agent_details_window(self.agent_id)
             else:
                 self.show_specific_variable_plot(self.agent_id, column)
 
     def show_agent_details_window(self, agent_id):
-        self.agent = self.simulation.get_agent_by_id(agent_id)
+        with self.worker.lock:
+            self.agent = self.simulation.get_agent_by_id(agent_id)
+            if self.agent:
+                time_series = self.simulation.get_history_time_series().copy()
+                agent_window = AgentDetailsWindow(self.agent, time_series)
         if self.agent:
-            time_series = self.simulation.get_time_series()
-            agent_window = AgentDetailsWindow(self.agent, time_series)
             self.agent_details_windows.append(agent_window)
             agent_window.show()
         else:
@@ -276,21 +433,26 @@ class MainWindow(QMainWindow):
 
     
     def get_variable_data(self, variable_name):
+        history = self.agent.history
+        token_types = history.history.token_types
         if variable_name == "Type 1 Tokens":
-            return [tokens.get('type 1', 0) for tokens in self.agent.history['tokens']]
+            return history['type 1'] if 'type 1' in token_types else []
         elif variable_name == "Type 2 Tokens":
-            return [tokens.get('type 2', 0) for tokens in self.agent.history['tokens']]
+            return history['type 2'] if 'type 2' in token_types else []
+        elif variable_name == "Wealth":
+            return sum(history[token_type] for token_type in token_types) if token_types else []
         elif variable_name in ['AI', 'AS', 'C', 'S', 'R', 'V', 'A']:
             return self.agent.history[variable_name]
         return []
 
     def show_specific_variable_plot(self, agent_id, column):
-        self.agent = self.simulation.get_agent_by_id(agent_id)
+        with self.worker.lock:
+            self.agent = self.simulation.get_agent_by_id(agent_id)
+            if self.agent:
+                time_series = self.simulation.get_history_time_series().copy()
+                variable_name = AGENT_TABLE_COLUMNS[column]
+                variable_data = np.array(self.get_variable_data(variable_name))
         if self.agent:
-            time_series = self.simulation.get_time_series()
-            variable_name = self.agent_table.horizontalHeaderItem(column).text()
-            variable_data = self.get_variable_data(variable_name)
-            
             # Ensure time series and variable data have the same length
             min_length = min(len(time_series), len(variable_data))
             time_series = time_series[:min_length]
@@ -302,87 +464,100 @@ class MainWindow(QMainWindow):
         else:
             self.log(f"No agent found with ID: {agent_id}")
 
-    def update_stats(self):
-        self.avg_wealth = self.simulation.get_average_wealth()
-        self.gini = self.simulation.get_gini_coefficient()
-        self.avg_competence = self.simulation.get_average_competence()
+    def update_stats(self, snapshot):
+        self.avg_wealth = snapshot.stats['avg_wealth']
+        self.gini = snapshot.stats['gini']
+        self.avg_competence = snapshot.stats['avg_competence']
         self.stats_label.setText(
             f"Average Wealth: {self.avg_wealth:.2f}\n"
             f"Gini Coefficient: {self.gini:.2f}\n"
             f"Average Competence: {self.avg_competence:.2f}"
         )
 
-    def update_graphs(self):
-        self.figure.clear()
-        ax = self.figure.add_subplot(111)
-        time = self.simulation.get_time_series()
-        wealth = self.simulation.get_wealth_time_series()
-        ax.plot(time, wealth, label='Average Wealth')
-        ax.set_title("Average Wealth Over Time")
-        ax.set_xlabel("Time Step")
-        ax.set_ylabel("Wealth")
-        ax.legend()
-        self.canvas.draw()
-
-    def update_network(self):
+    def update_graphs(self, snapshot):
+        self.chart.update(snapshot.series_start, snapshot.series)
+
+    def update_network(self, snapshot):
+        """
+        Recolour and resize the agents by the selected variable; the
+        network itself is only drawn again for a different simulation.
+        """
+        if self.network_simulation is not self.simulation:
+            self.draw_network()
+        values = NODE_COLOR_VARIABLES[self.node_color_combo.currentText()](snapshot)
+        if len(values) != len(self.node_scatter.get_offsets()):
+            return
+        low, high = values.min(), values.max()
+        scaled = (values - low) / (high - low) if high > low else np.zeros_like(values)
+        self.node_scatter.set_array(values)
+        self.node_scatter.set_clim(low, high)
+        self.node_scatter.set_sizes(10 + 40 * scaled)
+        self.network_canvas.draw_idle()
+
+    def draw_network(self):
+        """
+        Draw the network from the simulation's cached layout: all edges as
+        one Line3DCollection and all agents as one scatter.
+        """
+        with self.worker.lock:
+            adjacency, _ = self.simulation.get_adjacency()
+            layout = self.simulation.get_layout()
+            self.network_simulation = self.simulation
         self.network_figure.clear()
         ax = self.network_figure.add_subplot(111, projection='3d')
-        G = self.simulation.get_network()
-        pos = nx.spring_layout(G, dim=3)
-        # Center the network
-        x_coords = [p[0] for p in pos.values()]
-        y_coords = [p[1] for p in pos.values()]
-        z_coords = [p[2] for p in pos.values()]
-        center_x = sum(x_coords) / len(x_coords)
-        center_y = sum(y_coords) / len(y_coords)
-        center_z = sum(z_coords) / len(z_coords)
-        # Draw edges manually in 3D
-        for u, v in G.edges():
-            x = [pos[u][0] - center_x, pos[v][0] - center_x]
-            y = [pos[u][1] - center_y, pos[v][1] - center_y]
-            z = [pos[u][2] - center_z, pos[v][2] - center_z]
-            ax.plot(x, y, z, color='gray', alpha=0.5)
-        # Add nodes in 3D
-        for node in G.nodes():
-            x, y, z = pos[node]
-            ax.scatter(x - center_x, y - center_y, z - center_z, s=20)
+        edges = sp.triu(adjacency, k=1).tocoo()
+        segments = np.stack([layout[edges.row], layout[edges.col]], axis=1)
+        ax.add_collection3d(Line3DCollection(segments, colors='gray', alpha=0.5))
+        self.node_scatter = ax.scatter(layout[:, 0], layout[:, 1], layout[:, 2], s=20, c=np.zeros(len(layout)), cmap='viridis')
         # Set axis limits based on zoom factor
         ax.set_xlim(-self.zoom_factor, self.zoom_factor)
         ax.set_ylim(-self.zoom_factor, self.zoom_factor)
         ax.set_zlim(-self.zoom_factor, self.zoom_factor)
         ax.set_axis_off()
-        self.network_canvas.mpl_connect('scroll_event', self.zoom)
-        self.network_canvas.draw()
+        self.network_ax = ax
 
     def zoom(self, event):
+        if self.network_ax is None:
+            return
         factor = 2.0 if event.button == 'up' else 0.9
         self.zoom_factor *= factor
-        ax = self.network_figure.axes[0]
+        ax = self.network_ax
         ax.set_xlim(-self.zoom_factor, self.zoom_factor)
         ax.set_ylim(-self.zoom_factor, self.zoom_factor)
         ax.set_zlim(-self.zoom_factor, self.zoom_factor)
-        self.network_canvas.draw()
+        self.network_canvas.draw_idle()
 
     def reset_view(self):
         self.zoom_factor = 1.0
-        ax = self.network_figure.axes[0]
+        if self.network_ax is None:
+            return
+        ax = self.network_ax
         ax.set_xlim(-1, 1)
         ax.set_ylim(-1, 1)
         ax.set_zlim(-1, 1)
-        self.network_canvas.draw()
+        self.network_canvas.draw_idle()
 
     def save_simulation(self):
         filename, _ = QFileDialog.getSaveFileName(self, "Save Simulation", "", "Simulation Files (*.sim)")
         if filename:
-            self.simulation.save_simulation(filename)
+            with self.worker.lock:
+                self.simulation.save_simulation(filename)
             self.log(f"Simulation saved to {filename}.")
 
     def load_simulation(self):
         filename, _ = QFileDialog.getOpenFileName(self, "Load Simulation", "", "Simulation Files (*.sim)")
         if filename:
             self.simulation = Simulation.load_simulation(filename)
+            if not self.is_paused:
+                self.simulation.start()
+            self.worker.set_simulation(self.simulation)
             self.log(f"Simulation loaded from {filename}.")
-            self.update_simulation()
+            self.render_latest()
+
+    def closeEvent(self, event):
+        self.timer.stop()
+        self.worker.shutdown()
+        super().closeEvent(event)
 
     def log(self, message):
         self.log_text.append(message)
@@ -418,7 +593,7 @@ class AgentDetailsWindow(QDialog):
         
         if self.time_series is not None and self.variable_data is not None:
             if len(self.time_series) == len(self.variable_data):
-                ax.plot(self.time_series, self.variable_data)
+                ax.plot(*decimate(self.time_series, self.variable_data, parameters.GUI_PLOT_POINTS))
                 ax.set_title(f"Agent {self.agent_id} - {self.variable_name} Over Time")
                 ax.set_xlabel("Time Step")
                 ax.set_ylabel(self.variable_name)
@@ -441,27 +616,22 @@ class AgentDetailsWindow(QDialog):
         self.figure.clear()
         ax = self.figure.add_subplot(111)
         history = self.agent.history
-        time = self.time_series
-        type1 = [tokens.get('type 1', 0) for tokens in history['tokens']]
-        type2 = [tokens.get('type 2', 0) for tokens in history['tokens']]
-        
-        # Log lengths for debugging
-        logger.info(f"Time length: {len(time)}, Type1 length: {len(type1)}, Type2 length: {len(type2)}")
-        
-        # Ensure time and data arrays have the same length
-        min_length = min(len(time), len(type1), len(type2), len(history['AI']), len(history['AS']), len(history['C']))
-        time = time[:min_length]
-        type1 = type1[:min_length]
-        type2 = type2[:min_length]
-        ai = history['AI'][:min_length]
-        as_ = history['AS'][:min_length]
-        c = history['C'][:min_length]
-
-        ax.plot(time, type1, label='Type 1 Tokens')
-        ax.plot(time, type2, label='Type 2 Tokens')
-        ax.plot(time, ai, label='AI (Agent influence)')
-        ax.plot(time, as_, label='AS (Agent Status)')
-        ax.plot(time, c, label='C (Competence Level)')
+        time = np.asarray(self.time_series)
+        variables = [
+            ('type 1', 'Type 1 Tokens'),
+            ('type 2', 'Type 2 Tokens'),
+            ('AI', 'AI (Agent influence)'),
+            ('AS', 'AS (Agent Status)'),
+            ('C', 'C (Competence Level)'),
+        ]
+        for name, label in variables:
+            if name not in history.history.variables:
+                continue
+            values = np.asarray(history[name])
+            # Ensure time and data arrays have the same length
+            length = min(len(time), len(values))
+            # Long histories are reduced to GUI_PLOT_POINTS representative points
+            ax.plot(*decimate(time[:length], values[:length], parameters.GUI_PLOT_POINTS), label=label)
         ax.set_title(f"Agent {self.agent_id} Variables Over Time")
         ax.set_xlabel("Time Step")
         ax.set_ylabel("Value")
@@ -471,6 +641,7 @@ class AgentDetailsWindow(QDialog):
 if __name__ == "__main__":
     import sys
     from PyQt5.QtWidgets import QApplication
+    logging.basicConfig(level=logging.INFO)
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
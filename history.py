@@ -0,0 +1,438 @@
+import os
+import json
+import numpy as np
+from numpy.lib.format import open_memmap
+from parameters import HISTORY_VARIABLES, HISTORY_STRIDE, HISTORY_CHUNK_SIZE, HISTORY_MEMMAP_CHUNK_SIZE
+
+class History:
+    """
+    Columnar per-agent history of a Population.
+
+    Each recorded variable (every token type and DFIA/psychology variable by
+    default) is a preallocated (T, N) float64 array that grows in chunks;
+    one row is written per recorded time step. Only every `stride`-th call
+    to record() is stored.
+    """
+    def __init__(self, population, variables=None, stride=HISTORY_STRIDE, chunk_size=HISTORY_CHUNK_SIZE):
+        self.population = population
+        self.variables = list(variables if variables is not None else HISTORY_VARIABLES)
+        unknown = [name for name in self.variables
+                   if name not in population.token_index and not hasattr(population, name)]
+        if unknown:
+            raise ValueError(f"Unknown history variables: {unknown}")
+        self.token_types = [name for name in self.variables if name in population.token_index]
+        self.stride = stride
+        self.chunk_size = chunk_size
+        self.length = 0
+        self.calls = 0
+        self.capacity = 0
+        self.time_steps = np.empty(0, dtype=np.int64)
+        self.data = {name: np.empty((0, len(population)), dtype=np.float64) for name in self.variables}
+
+    def __len__(self):
+        return self.length
+
+    def reserve(self, num_rows):
+        """
+        Grow the buffers to hold at least num_rows recorded steps.
+        """
+        if num_rows <= self.capacity:
+            return
+        self.time_steps = np.resize(self.time_steps, num_rows)
+        for name, values in self.data.items():
+            grown = np.empty((num_rows, values.shape[1]), dtype=values.dtype)
+            grown[:self.length] = values[:self.length]
+            self.data[name] = grown
+        self.capacity = num_rows
+
+    def record(self, time_step=None):
+        """
+        Append the population's current state as one row, honouring the
+        recording stride.
+        """
+        self.calls += 1
+        if (self.calls - 1) % self.stride:
+            return False
+        if self.length == self.capacity:
+            self._grow()
+        self._write_row(self.length, time_step if time_step is not None else self.calls)
+        self.length += 1
+        return True
+
+    def _grow(self):
+        self.reserve(self.capacity + max(self.chunk_size, self.capacity))
+
+    def _write_row(self, row, time_step):
+        self.time_steps[row] = time_step
+        for name in self.variables:
+            self.data[name][row] = self._current(name)
+
+    def _current(self, name):
+        if name in self.population.token_index:
+            return self.population.token_column(name)
+        return getattr(self.population, name)
+
+    def record_aggregates(self, values):
+        """
+        Per-step aggregates ({name: value}); kept by the simulation itself
+        for in-memory histories, persisted by MemmapHistory.
+        """
+
+    def flush(self):
+        pass
+
+    def get_time_steps(self):
+        return self.time_steps[:self.length]
+
+    def column(self, name):
+        """
+        (T, N) view of a recorded variable.
+        """
+        return self.data[name][:self.length]
+
+    def agent_series(self, name, index):
+        return self.data[name][:self.length, index]
+
+    def blocks(self, name):
+        """
+        The recorded rows of a variable as consecutive (rows, N) views,
+        for reductions that must not copy the whole column.
+        """
+        yield self.column(name)
+
+    def last_row(self, name):
+        return self.data[name][self.length - 1]
+
+    def rows(self, name, start, stop):
+        """
+        Recorded rows start:stop of a variable.
+        """
+        return self.data[name][start:min(stop, self.length)]
+
+    def agent(self, index):
+        return AgentHistory(self, index)
+
+    @classmethod
+    def from_arrays(cls, population, time_steps, data, stride=HISTORY_STRIDE, calls=None):
+        """
+        History holding already recorded rows (e.g. restored from a
+        checkpoint); the arrays are used as the buffers without copying.
+        """
+        history = cls(population, list(data), stride)
+        history.time_steps = time_steps
+        history.data = dict(data)
+        history.length = history.capacity = len(time_steps)
+        history.calls = calls if calls is not None else history.length * stride
+        return history
+
+def _chunk_rows(chunks, length, index=None):
+    """
+    First `length` rows of a variable stored as a list of chunk arrays,
+    optionally restricted to one column. Zero-copy while the rows fit in
+    the first chunk.
+    """
+    parts = []
+    remaining = length
+    for chunk in chunks:
+        if remaining <= 0:
+            break
+        rows = chunk[:remaining] if index is None else chunk[:remaining, index]
+        parts.append(rows)
+        remaining -= len(rows)
+    if len(parts) == 1:
+        return parts[0]
+    if not parts:
+        return chunks[0][:0] if chunks else np.empty(0)
+    return np.concatenate(parts)
+
+def _chunk_blocks(chunks, length):
+    """
+    The first `length` rows of a chunked variable, one view per chunk.
+    """
+    remaining = length
+    for chunk in chunks:
+        if remaining <= 0:
+            break
+        rows = chunk[:remaining]
+        remaining -= len(rows)
+        yield rows
+
+def _chunk_slice(chunks, length, start, stop):
+    """
+    Rows start:stop of the first `length` rows of a chunked variable,
+    reading only the chunks they fall in. Zero-copy when they lie within
+    one chunk.
+    """
+    stop = min(stop, length)
+    parts = []
+    offset = 0
+    for chunk in chunks:
+        if offset >= stop:
+            break
+        if offset + len(chunk) > start:
+            parts.append(chunk[max(start - offset, 0):stop - offset])
+        offset += len(chunk)
+    if len(parts) == 1:
+        return parts[0]
+    if not parts:
+        return chunks[0][:0] if chunks else np.empty(0)
+    return np.concatenate(parts)
+
+def _chunk_last_row(chunks, length):
+    for chunk in chunks:
+        if length <= len(chunk):
+            return chunk[length - 1]
+        length -= len(chunk)
+    raise IndexError("History has no recorded rows")
+
+AGGREGATES_FILE = 'aggregates.f64'
+
+def _read_aggregates(directory, names, length):
+    """
+    {name: (length,) values} of the aggregates file in directory, or None
+    if none were recorded.
+    """
+    if not names or not length:
+        return None
+    values = np.memmap(os.path.join(directory, AGGREGATES_FILE), dtype=np.float64, mode='r', shape=(length, len(names)))
+    return {name: values[:, j] for j, name in enumerate(names)}
+
+def _file_prefix(name):
+    return name.replace(' ', '_')
+
+def _chunk_path(directory, name, chunk_index):
+    return os.path.join(directory, f"{_file_prefix(name)}.{chunk_index:05d}.npy")
+
+def _open_chunks(directory, variables, chunk_count, mode='r'):
+    chunks = {name: [np.load(_chunk_path(directory, name, i), mmap_mode=mode) for i in range(chunk_count)] for name in variables}
+    time_step_chunks = [np.load(_chunk_path(directory, 'time_steps', i), mmap_mode=mode) for i in range(chunk_count)]
+    return chunks, time_step_chunks
+
+class MemmapHistory(History):
+    """
+    History backend that streams every recorded row into memory-mapped .npy
+    chunk files in `directory`, so memory stays bounded for long runs.
+
+    The number of valid rows is published in meta.json after each row is
+    written, so the history of a run that crashes is still readable with
+    open_history(directory).
+
+    The simulation's per-step aggregates (average wealth and competence and
+    the inequality statistics) are appended as float64 rows to
+    aggregates.f64, so analysis of the directory never has to recompute
+    them from the per-agent token history.
+    """
+    def __init__(self, population, directory, variables=None, stride=HISTORY_STRIDE, chunk_size=HISTORY_MEMMAP_CHUNK_SIZE):
+        super().__init__(population, variables, stride, chunk_size)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.num_agents = len(population)
+        self.chunk_lengths = []
+        self.chunks = {name: [] for name in self.variables}
+        self.time_step_chunks = []
+        self.aggregate_names = []
+        self.aggregate_length = 0
+        self._aggregate_file = None
+        self._write_meta()
+
+    def reserve(self, num_rows):
+        """
+        Add a chunk large enough to hold num_rows recorded steps in total.
+        """
+        if num_rows <= self.capacity:
+            return
+        rows = max(self.chunk_size, num_rows - self.capacity)
+        chunk_index = len(self.chunk_lengths)
+        for name in self.variables:
+            path = _chunk_path(self.directory, name, chunk_index)
+            self.chunks[name].append(open_memmap(path, mode='w+', dtype=np.float64, shape=(rows, self.num_agents)))
+        path = _chunk_path(self.directory, 'time_steps', chunk_index)
+        self.time_step_chunks.append(open_memmap(path, mode='w+', dtype=np.int64, shape=(rows,)))
+        self.chunk_lengths.append(rows)
+        self.capacity += rows
+
+    @classmethod
+    def resume(cls, population, directory, length, calls, aggregate_length=0, chunk_size=HISTORY_MEMMAP_CHUNK_SIZE):
+        """
+        Reopen the history in `directory` for appending after its first
+        `length` rows and `aggregate_length` aggregate rows; rows recorded
+        after that point (e.g. after the checkpoint being resumed) are
+        overwritten.
+        """
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        if length > meta['length']:
+            raise ValueError(f"History in {directory} has {meta['length']} rows, expected at least {length}")
+        history = cls.__new__(cls)
+        History.__init__(history, population, meta['variables'], meta['stride'], chunk_size)
+        history.directory = directory
+        history.num_agents = meta['num_agents']
+        history.chunk_lengths = list(meta['chunk_lengths'])
+        history.chunks, history.time_step_chunks = _open_chunks(directory, history.variables, len(history.chunk_lengths), 'r+')
+        history.capacity = sum(history.chunk_lengths)
+        history.length = length
+        history.calls = calls
+        history.aggregate_names = meta.get('aggregate_names', [])
+        history.aggregate_length = min(aggregate_length, meta.get('aggregate_length', 0))
+        history._aggregate_file = None
+        if history.aggregate_names:
+            os.truncate(os.path.join(directory, AGGREGATES_FILE), history.aggregate_length * len(history.aggregate_names) * 8)
+        history._write_meta()
+        return history
+
+    def _grow(self):
+        self.reserve(self.capacity + self.chunk_size)
+
+    def record(self, time_step=None):
+        recorded = super().record(time_step)
+        if recorded:
+            self._write_meta()
+        return recorded
+
+    def record_aggregates(self, values):
+        if not self.aggregate_names:
+            self.aggregate_names = list(values)
+        if self._aggregate_file is None:
+            self._aggregate_file = open(os.path.join(self.directory, AGGREGATES_FILE), 'ab')
+        row = np.array([values[name] for name in self.aggregate_names], dtype=np.float64)
+        self._aggregate_file.write(row.tobytes())
+        self._aggregate_file.flush()
+        self.aggregate_length += 1
+        self._write_meta()
+
+    def aggregates(self):
+        return _read_aggregates(self.directory, self.aggregate_names, self.aggregate_length)
+
+    def _write_row(self, row, time_step):
+        chunk_index = 0
+        while row >= self.chunk_lengths[chunk_index]:
+            row -= self.chunk_lengths[chunk_index]
+            chunk_index += 1
+        self.time_step_chunks[chunk_index][row] = time_step
+        for name in self.variables:
+            self.chunks[name][chunk_index][row] = self._current(name)
+
+    def _write_meta(self):
+        meta = {
+            'length': self.length,
+            'num_agents': self.num_agents,
+            'stride': self.stride,
+            'variables': self.variables,
+            'token_types': self.token_types,
+            'chunk_lengths': self.chunk_lengths,
+            'aggregate_names': self.aggregate_names,
+            'aggregate_length': self.aggregate_length,
+        }
+        path = os.path.join(self.directory, 'meta.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(path + '.tmp', path)
+
+    def flush(self):
+        for chunk in self.time_step_chunks:
+            chunk.flush()
+        for chunks in self.chunks.values():
+            for chunk in chunks:
+                chunk.flush()
+        self._write_meta()
+
+    def get_time_steps(self):
+        return _chunk_rows(self.time_step_chunks, self.length)
+
+    def column(self, name):
+        return _chunk_rows(self.chunks[name], self.length)
+
+    def agent_series(self, name, index):
+        return _chunk_rows(self.chunks[name], self.length, index)
+
+    def blocks(self, name):
+        return _chunk_blocks(self.chunks[name], self.length)
+
+    def last_row(self, name):
+        return _chunk_last_row(self.chunks[name], self.length)
+
+    def rows(self, name, start, stop):
+        return _chunk_slice(self.chunks[name], self.length, start, stop)
+
+class StoredHistory:
+    """
+    Read-only history opened from a MemmapHistory directory. Chunks are
+    memory-mapped, so columns are not loaded until they are accessed.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        self.length = meta['length']
+        self.num_agents = meta['num_agents']
+        self.stride = meta['stride']
+        self.variables = meta['variables']
+        self.token_types = meta['token_types']
+        self.chunks, self.time_step_chunks = _open_chunks(directory, self.variables, len(meta['chunk_lengths']))
+        # Not written by older versions
+        self.aggregate_names = meta.get('aggregate_names', [])
+        self.aggregate_length = meta.get('aggregate_length', 0)
+
+    def __len__(self):
+        return self.length
+
+    def aggregates(self):
+        """
+        {name: per-step values} of the simulation's aggregates, including
+        'time_step' and the inequality statistics, or None if the
+        directory has none.
+        """
+        return _read_aggregates(self.directory, self.aggregate_names, self.aggregate_length)
+
+    def get_time_steps(self):
+        return _chunk_rows(self.time_step_chunks, self.length)
+
+    def column(self, name):
+        return _chunk_rows(self.chunks[name], self.length)
+
+    def agent_series(self, name, index):
+        return _chunk_rows(self.chunks[name], self.length, index)
+
+    def blocks(self, name):
+        """
+        The recorded rows of a variable as one memory-mapped view per chunk.
+        """
+        return _chunk_blocks(self.chunks[name], self.length)
+
+    def last_row(self, name):
+        return _chunk_last_row(self.chunks[name], self.length)
+
+    def rows(self, name, start, stop):
+        return _chunk_slice(self.chunks[name], self.length, start, stop)
+
+    def agent(self, index):
+        return AgentHistory(self, index)
+
+def open_history(directory):
+    return StoredHistory(directory)
+
+class AgentHistory:
+    """
+    Per-agent view of a History with the same keys as the former
+    Agent.history dict: each variable maps to its time series, and
+    'tokens' to a list of {token_type: balance} dicts.
+    """
+    def __init__(self, history, index):
+        self.history = history
+        self.index = index
+
+    def __getitem__(self, name):
+        if name == 'tokens':
+            token_types = self.history.token_types
+            columns = [self.history.agent_series(t, self.index) for t in token_types]
+            return [dict(zip(token_types, row)) for row in zip(*columns)]
+        return self.history.agent_series(name, self.index)
+
+    def __contains__(self, name):
+        return name == 'tokens' or name in self.history.variables
+
+    def keys(self):
+        return ['tokens'] + [name for name in self.history.variables if name not in self.history.token_types]
+
+    def get(self, name, default=None):
+        return self[name] if name in self else default
@@ -0,0 +1,149 @@
+"""
+Optional Numba backend for the per-agent part of a step.
+
+fused_agent_step computes, for every agent in one parallel loop, the DFIA
+variables, the psychological variables, the action level and the reward
+and weight update, i.e. everything Simulation.update does after the tax
+policy and the competence update. It reads and writes the population
+columns in place and allocates no temporaries. The results match the
+NumPy implementation (compute_DFIA, compute_population_psychology,
+compute_population_action_level and update_population_rewards) to within
+floating-point rounding.
+
+Numba is optional: resolve_backend falls back to 'numpy' when it is not
+installed, and the loop below then only serves as documentation. It is
+only imported, and the loop compiled, on the first fused step, so the
+NumPy backend never pays for it.
+"""
+import importlib.util
+import logging
+import math
+from parameters import ROPT, SOPT, IOPT, VOPT, PSI, ETA, LAMBDA_, K6
+logger = logging.getLogger(__name__)
+
+NUMBA_AVAILABLE = importlib.util.find_spec('numba') is not None
+# numba.prange once the loop is compiled; plain range when it runs in Python
+prange = range
+
+STEP_BACKENDS = ['numpy', 'numba', 'auto']
+
+def resolve_backend(name):
+    """
+    'numpy' or 'numba' for a requested backend name; 'auto' picks numba
+    when it is installed, and a request for numba without it falls back
+    to numpy with a warning.
+    """
+    if name not in STEP_BACKENDS:
+        raise ValueError(f"Unknown step backend: {name}; expected one of {STEP_BACKENDS}")
+    if name == 'numpy':
+        return 'numpy'
+    if not NUMBA_AVAILABLE:
+        if name == 'numba':
+            logger.warning("Numba is not installed; using the NumPy step backend.")
+        return 'numpy'
+    return 'numba'
+
+def _agent_step_loop(tokens, total_force, C, community_contribution, DELTA_AS,
+                     SF, AF, SS, AS, SI, AI, R, S, IN, V, A, AL,
+                     alpha, beta, gamma, P, P_PREV, r, delta,
+                     income, eta, lambda_, K6, ropt, sopt, iopt, vopt, has_vopt, psi):
+    num_agents, num_types = tokens.shape
+    z = 100.0
+    Xz = z / num_agents
+    for i in prange(num_agents):
+        # DFIA
+        XF = 0.0
+        for k in range(num_types):
+            XF += tokens[i, k]
+        XrnF = total_force - XF
+        SI_i = (total_force * (num_agents - 1)) / (XrnF * num_agents)
+        AS_i = Xz * SI_i
+        SS_i = z - AS_i
+        AI_i = AS_i - Xz
+        SF[i] = XrnF
+        AF[i] = XF
+        SS[i] = SS_i
+        AS[i] = AS_i
+        SI[i] = SI_i
+        AI[i] = AI_i
+
+        # Psychological variables
+        R_i = 0.0
+        if XF != 0.0 and XrnF != 0.0:
+            force_ratio = XF / XrnF
+            R_i = force_ratio / (1 + force_ratio) * ropt
+        S_i = 0.0
+        if AS_i != 0.0:
+            status_ratio = AS_i / (SS_i + AS_i)
+            S_i = (status_ratio * status_ratio) * sopt
+        IN_i = 0.0
+        if SI_i != 0.0:
+            result = AI_i / SI_i * iopt
+            if result >= 0:
+                IN_i = math.sqrt(result)
+        V_i = 0.0
+        if has_vopt and S_i != 0.0 and IN_i != 0.0:
+            V_i = vopt * (1 - math.exp(-(S_i * IN_i)))
+        A_i = 0.0
+        if IN_i != 0.0 and R_i != 0.0:
+            A_i = K6 * (1 - math.exp(-(IN_i / R_i)))
+        motivation = C[i] * V_i * A_i
+        AL_i = 0.0
+        if motivation > 0:
+            AL_i = psi * (1 - math.exp(-(motivation ** (1 / 3))))
+        R[i] = R_i
+        S[i] = S_i
+        IN[i] = IN_i
+        V[i] = V_i
+        A[i] = A_i
+        AL[i] = AL_i
+
+        # Reward and weight update
+        cc = community_contribution[i]
+        das = DELTA_AS[i]
+        r_i = alpha[i] * income + beta[i] * cc + gamma[i] * das
+        P_i = (1 - lambda_) * r_i + lambda_ * P_PREV[i]
+        delta_i = r_i + lambda_ * P_i - P_PREV[i]
+        a = alpha[i] + eta * delta_i * income
+        b = beta[i] + eta * delta_i * cc
+        g = gamma[i] + eta * delta_i * das
+        total_weight = a + b + g
+        if total_weight != 0:
+            a /= total_weight
+            b /= total_weight
+            g /= total_weight
+        else:
+            a = b = g = 1 / 3
+        alpha[i] = a
+        beta[i] = b
+        gamma[i] = g
+        r[i] = r_i
+        P[i] = P_i
+        delta[i] = delta_i
+        P_PREV[i] = P_i
+
+_agent_step_jit = None
+
+def _compiled_agent_step():
+    global _agent_step_jit, prange
+    if _agent_step_jit is None:
+        import numba
+        prange = numba.prange
+        _agent_step_jit = numba.njit(parallel=True, cache=True)(_agent_step_loop)
+    return _agent_step_jit
+
+def fused_agent_step(population, total_force, income, k6=K6):
+    """
+    DFIA, psychology, action level and reward for every agent in one
+    compiled loop. income is the per-step token income (the sum of the
+    agents' delta_tokens), k6 the ambition proportion, and population.C
+    must already hold this step's competence.
+    """
+    p = population
+    _compiled_agent_step()(
+        p.tokens, float(total_force), p.C, p.community_contribution, p.DELTA_AS,
+        p.SF, p.AF, p.SS, p.AS, p.SI, p.AI, p.R, p.S, p.IN, p.V, p.A, p.AL,
+        p.alpha, p.beta, p.gamma, p.P, p.P_PREV, p.r, p.delta,
+        float(income), float(ETA), float(LAMBDA_), float(k6),
+        float(ROPT), float(SOPT), float(IOPT), float(VOPT or 0.0), VOPT is not None, float(PSI)
+    )
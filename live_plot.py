@@ -0,0 +1,231 @@
+"""
+Bounded-cost plotting of long time series for the GUI.
+
+A LiveChart keeps one line per series and only appends the steps that
+are new since the last frame: each series goes through a
+MinMaxDecimator, which keeps the minimum and maximum of every bin of
+consecutive points and merges neighbouring bins as the series grows, so
+a line never has more than about 4 * max_bins points. Frames are drawn by
+blitting the lines onto a cached background; the axes are only redrawn
+when the data leaves the current limits, which grow geometrically.
+
+lttb picks a fixed number of representative points of a complete series
+(Largest-Triangle-Three-Buckets) for static plots such as the agent
+history windows.
+"""
+import numpy as np
+
+def lttb(x, y, threshold):
+    """
+    Indices of `threshold` points of (x, y) selected by
+    Largest-Triangle-Three-Buckets (Steinarsson, 2013): the first and last
+    point, plus from every bucket in between the point forming the largest
+    triangle with the previous pick and the next bucket's mean.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x, next_y = x[hi:edges[i + 2]].mean(), y[hi:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        area = np.abs((x[a] - next_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y - y[a]))
+        a = lo + int(np.argmax(area))
+        indices[i + 1] = a
+    return indices
+
+def decimate(x, y, threshold):
+    """
+    (x, y) reduced to at most `threshold` points with lttb.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    indices = lttb(x, y, threshold)
+    return x[indices], y[indices]
+
+class MinMaxDecimator:
+    """
+    Streaming min-max decimation of one series. Appended points are
+    grouped into bins of bin_size consecutive points, of which only the
+    minimum and maximum are kept; when there are more than 2 * max_bins
+    bins, neighbouring bins are merged and bin_size doubles. Appending is
+    O(1) amortised per point and points() returns at most
+    4 * max_bins + 3 points, in order.
+    """
+    def __init__(self, max_bins):
+        self.max_bins = max_bins
+        self.reset()
+
+    def reset(self):
+        self.bin_size = 1
+        # One row per complete bin: x and y of its minimum, x and y of its maximum
+        self.bins = np.empty((0, 4))
+        self.pending_x = np.empty(0)
+        self.pending_y = np.empty(0)
+        self.last = None
+
+    @staticmethod
+    def _reduce(x, y):
+        """
+        Min-max rows of the bins given as the rows of x and y.
+        """
+        rows = np.arange(len(x))
+        low, high = np.argmin(y, axis=1), np.argmax(y, axis=1)
+        return np.column_stack([x[rows, low], y[rows, low], x[rows, high], y[rows, high]])
+
+    def append(self, x, y):
+        x = np.concatenate([self.pending_x, np.asarray(x, dtype=np.float64)])
+        y = np.concatenate([self.pending_y, np.asarray(y, dtype=np.float64)])
+        complete = len(x) // self.bin_size * self.bin_size
+        if complete:
+            shape = (-1, self.bin_size)
+            self.bins = np.concatenate([self.bins, self._reduce(x[:complete].reshape(shape), y[:complete].reshape(shape))])
+        self.pending_x, self.pending_y = x[complete:], y[complete:]
+        if len(x):
+            self.last = (x[-1], y[-1])
+        while len(self.bins) > 2 * self.max_bins:
+            self._merge()
+
+    def _merge(self):
+        pairs = len(self.bins) // 2 * 2
+        bins = self.bins[:pairs].reshape(-1, 2, 4)
+        x = np.concatenate([bins[:, :, 0], bins[:, :, 2]], axis=1)
+        y = np.concatenate([bins[:, :, 1], bins[:, :, 3]], axis=1)
+        self.bins = np.concatenate([self._reduce(x, y), self.bins[pairs:]])
+        self.bin_size *= 2
+        # Points still pending fit in the larger bins, so they stay pending
+
+    def points(self):
+        """
+        x and y of the decimated series.
+        """
+        bins = self.bins
+        if len(self.pending_x):
+            pending = self._reduce(self.pending_x[None, :], self.pending_y[None, :])
+            bins = np.concatenate([bins, pending])
+        first = np.where(bins[:, 0] <= bins[:, 2], 0, 2)
+        rows = np.arange(len(bins))
+        x = np.column_stack([bins[rows, first], bins[rows, 2 - first]])
+        y = np.column_stack([bins[rows, first + 1], bins[rows, 3 - first]])
+        # A bin whose minimum and maximum are the same point contributes it once
+        keep = np.ones(x.shape, dtype=bool)
+        keep[:, 1] = x[:, 0] != x[:, 1]
+        x, y = x[keep], y[keep]
+        # End the line at the newest point even if it is neither minimum nor maximum
+        if self.last is not None and (not len(x) or x[-1] != self.last[0]):
+            x, y = np.append(x, self.last[0]), np.append(y, self.last[1])
+        return x, y
+
+class LiveChart:
+    """
+    Stacked line charts of several aggregate series sharing the time axis,
+    drawn into an existing figure and canvas. panels is a list of
+    (series name, title) pairs; update() is fed the snapshot series.
+    """
+    def __init__(self, figure, canvas, panels, max_points=1000):
+        self.figure = figure
+        self.canvas = canvas
+        self.names = [name for name, _ in panels]
+        self.axes = figure.subplots(len(panels), 1, sharex=True, squeeze=False)[:, 0]
+        self.lines = {}
+        self.decimators = {}
+        for ax, (name, title) in zip(self.axes, panels):
+            # Animated lines are left out of full redraws and blitted on top
+            self.lines[name], = ax.plot([], [], animated=True)
+            ax.set_title(title, fontsize='small')
+            self.decimators[name] = MinMaxDecimator(max(max_points // 4, 1))
+        self.axes[-1].set_xlabel("Time Step")
+        figure.tight_layout()
+        self.length = 0
+        self.x_start = 0
+        self.background = None
+        canvas.mpl_connect('draw_event', self._on_draw)
+
+    def reset(self):
+        self.length = 0
+        for name in self.names:
+            self.decimators[name].reset()
+            self.lines[name].set_data([], [])
+
+    def update(self, series_start, series):
+        """
+        Append the points of series ({name: values} for the steps from
+        series_start on, including 'time_step') that are not plotted yet.
+        series_start 0 means series is complete and replaces the plot.
+        """
+        if series_start == 0 or series_start > self.length:
+            self.reset()
+            series_start = 0
+        skip = self.length - series_start
+        x = np.asarray(series['time_step'][skip:], dtype=np.float64)
+        if not len(x):
+            return
+        rescale = False
+        for ax, name in zip(self.axes, self.names):
+            y = np.asarray(series[name][skip:], dtype=np.float64)
+            decimator = self.decimators[name]
+            decimator.append(x, y)
+            self.lines[name].set_data(*decimator.points())
+            rescale |= self._grow_limits(ax, x, y)
+        self.length += len(x)
+        if rescale or self.background is None:
+            self.canvas.draw()
+        else:
+            self.blit()
+
+    def _grow_limits(self, ax, x, y):
+        """
+        Widen the limits of ax with headroom if x or y fall outside; returns
+        whether they changed (and the background must be redrawn).
+        """
+        finite = y[np.isfinite(y)]
+        changed = False
+        if self.length == 0:
+            self.x_start = x[0]
+        if self.length == 0 or x[-1] > ax.get_xlim()[1]:
+            ax.set_xlim(self.x_start, self.x_start + 2 * max(x[-1] - self.x_start, 1))
+            changed = True
+        if len(finite):
+            y_low, y_high = ax.get_ylim()
+            low, high = finite.min(), finite.max()
+            if self.length == 0 or low < y_low or high > y_high:
+                if self.length:
+                    low, high = min(low, y_low), max(high, y_high)
+                margin = 0.25 * (high - low) or 0.25 * abs(high) or 1.0
+                ax.set_ylim(low - margin, high + margin)
+                changed = True
+        return changed
+
+    def _on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self._draw_lines()
+
+    def _draw_lines(self):
+        for ax, name in zip(self.axes, self.names):
+            ax.draw_artist(self.lines[name])
+
+    def blit(self):
+        self.canvas.restore_region(self.background)
+        self._draw_lines()
+        self.canvas.blit(self.figure.bbox)
+
+    def savefig(self, filename):
+        """
+        Save the figure including the (normally blitted) lines.
+        """
+        for line in self.lines.values():
+            line.set_animated(False)
+        try:
+            self.figure.savefig(filename)
+        finally:
+            for line in self.lines.values():
+                line.set_animated(True)
+            self.canvas.draw()
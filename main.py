@@ -1,8 +1,10 @@
 import sys
+import logging
 from PyQt5.QtWidgets import QApplication
 from gui import MainWindow
 
 def main():
+    logging.basicConfig(level=logging.INFO)
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
@@ -0,0 +1,93 @@
+"""
+Structured per-step metrics.
+
+Simulation.update publishes one record (a flat dict of per-step
+aggregates) to a MetricsChannel, which hands it to every attached sink.
+Sinks only need write(record) and close(); the ones provided keep the
+latest records in memory, append them to a JSON Lines file, or print a
+one-line summary every few steps.
+"""
+import collections
+import json
+import sys
+
+class MetricsChannel:
+    def __init__(self, sinks=()):
+        self.sinks = list(sinks)
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+        return sink
+
+    def remove_sink(self, sink):
+        self.sinks.remove(sink)
+
+    def publish(self, record):
+        for sink in self.sinks:
+            sink.write(record)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+class RingBufferSink:
+    """
+    Keeps the latest `capacity` records in memory.
+    """
+    def __init__(self, capacity):
+        self.records = collections.deque(maxlen=capacity)
+
+    def write(self, record):
+        self.records.append(record)
+
+    def close(self):
+        pass
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def latest(self):
+        return self.records[-1] if self.records else None
+
+class JSONLSink:
+    """
+    Appends every record as one JSON line to `path`. Lines are flushed as
+    they are written, so the file of an interrupted run stays readable.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+
+    def write(self, record):
+        if self.file is None:
+            self.file = open(self.path, 'a')
+        self.file.write(json.dumps(record, default=float) + '\n')
+        self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+class StdoutSink:
+    """
+    Prints a one-line summary of every `every`-th record.
+    """
+    def __init__(self, every=1, stream=None):
+        self.every = every
+        self.stream = stream
+        self.count = 0
+
+    def write(self, record):
+        self.count += 1
+        if self.count % self.every:
+            return
+        print(f"Time step {record['time_step']}: average wealth {record['avg_wealth']:.4f}, "
+              f"Gini {record['gini']:.4f}, average competence {record['avg_competence']:.4f}, "
+              f"{record['step_seconds'] * 1000:.1f} ms/step", file=self.stream or sys.stdout)
+
+    def close(self):
+        pass
@@ -1,9 +1,234 @@
-import networkx as nx
-from parameters import NUM_AGENTS, NETWORK_PROBABILITY
+import os
+import json
+import logging
+import numpy as np
+import scipy.sparse as sp
+from parameters import (
+    NUM_AGENTS, NETWORK_MODEL, NETWORK_PROBABILITY, NETWORK_M, NETWORK_K,
+    NETWORK_REWIRING, NETWORK_BLOCKS, NETWORK_P_IN, NETWORK_P_OUT, NETWORK_LAYOUT_SPRING_MAX_NODES
+)
+logger = logging.getLogger(__name__)
 
-def create_agent_network():
+NETWORK_MODELS = ['erdos_renyi', 'barabasi_albert', 'watts_strogatz', 'stochastic_block']
+
+def create_agent_network(num_agents=NUM_AGENTS, probability=NETWORK_PROBABILITY, seed=None, model=NETWORK_MODEL):
+    """
+    Create a random network of agents as a networkx graph (for drawing).
+    The model itself works on the CSR adjacency from generate_network.
+    """
+    adjacency = generate_network(model, num_agents, seed, probability=probability)
+    return csr_to_network(adjacency)
+
+def generate_network(model=NETWORK_MODEL, num_agents=NUM_AGENTS, seed=None, probability=NETWORK_PROBABILITY,
+                     m=NETWORK_M, k=NETWORK_K, rewiring=NETWORK_REWIRING, blocks=NETWORK_BLOCKS,
+                     p_in=NETWORK_P_IN, p_out=NETWORK_P_OUT):
+    """
+    Generate a random agent network directly as a symmetric CSR adjacency
+    matrix, in time and memory linear in the number of agents and edges.
+    """
+    rng = np.random.default_rng(seed)
+    if model == 'erdos_renyi':
+        src, dst = erdos_renyi_edges(num_agents, probability, rng)
+    elif model == 'barabasi_albert':
+        src, dst = barabasi_albert_edges(num_agents, m, rng)
+    elif model == 'watts_strogatz':
+        src, dst = watts_strogatz_edges(num_agents, k, rewiring, rng)
+    elif model == 'stochastic_block':
+        sizes = np.full(blocks, num_agents // blocks)
+        sizes[:num_agents % blocks] += 1
+        src, dst = stochastic_block_edges(sizes, p_in, p_out, rng)
+    else:
+        raise ValueError(f"Unknown network model: {model}")
+    return edges_to_csr(num_agents, src, dst)
+
+def _geometric_skip(total, p, rng):
+    """
+    Sorted indices of the successes among `total` Bernoulli(p) trials, drawn
+    by sampling the gaps between successes (Batagelj & Brandes, 2005).
+    """
+    if total <= 0 or p <= 0:
+        return np.empty(0, dtype=np.int64)
+    if p >= 1:
+        return np.arange(total, dtype=np.int64)
+    chunks = []
+    position = -1
+    expected = total * p
+    chunk_size = min(int(expected + 5 * np.sqrt(expected) + 64), 1 << 22)
+    while position < total:
+        positions = position + np.cumsum(rng.geometric(p, chunk_size))
+        chunks.append(positions[positions < total])
+        position = positions[-1]
+    return np.concatenate(chunks)
+
+def _triangle_pairs(index):
+    """
+    Map linear indices over the strict lower triangle (row-major) to
+    (row, column) pairs with column < row.
+    """
+    row = ((1 + np.sqrt(1 + 8 * index.astype(np.float64))) // 2).astype(np.int64)
+    # Correct float rounding at the row boundaries
+    row -= (row * (row - 1) // 2) > index
+    row += ((row + 1) * row // 2) <= index
+    column = index - row * (row - 1) // 2
+    return row, column
+
+def erdos_renyi_edges(num_agents, probability, rng):
+    index = _geometric_skip(num_agents * (num_agents - 1) // 2, probability, rng)
+    return _triangle_pairs(index)
+
+def barabasi_albert_edges(num_agents, m, rng):
+    """
+    Preferential attachment: every new node attaches m edges to endpoints
+    drawn uniformly from all earlier edge endpoints. Draws are resolved for
+    all edges at once by following the chain of copied endpoints; repeated
+    targets of the same node collapse into one edge.
+    """
+    if num_agents <= m:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    num_edges = (num_agents - m) * m
+    edge = np.arange(num_edges, dtype=np.int64)
+    src = m + edge // m
+    # Node m connects to the m seed nodes; later edges pick an earlier endpoint
+    draws = np.floor(rng.random(num_edges) * 2 * (src - m) * m).astype(np.int64)
+    dst = np.where(edge < m, edge, -1)
+    position = draws
+    pending = np.flatnonzero(dst < 0)
+    while pending.size:
+        pos = position[pending]
+        drawn_edge = pos // 2
+        is_source = pos % 2 == 0
+        is_seed_target = ~is_source & (drawn_edge < m)
+        dst[pending[is_source]] = m + drawn_edge[is_source] // m
+        dst[pending[is_seed_target]] = drawn_edge[is_seed_target]
+        follow = ~is_source & ~is_seed_target
+        position[pending[follow]] = draws[drawn_edge[follow]]
+        pending = pending[follow]
+    return src, dst
+
+def watts_strogatz_edges(num_agents, k, rewiring, rng):
+    """
+    Ring lattice with k nearest neighbours whose edges are rewired to a
+    uniformly random node with probability `rewiring`.
+    """
+    half = k // 2
+    src = np.repeat(np.arange(num_agents, dtype=np.int64), half)
+    dst = (src + np.tile(np.arange(1, half + 1, dtype=np.int64), num_agents)) % num_agents
+    rewire = rng.random(src.size) < rewiring
+    # Offsets in [1, n) never map an edge onto its own source
+    dst[rewire] = (src[rewire] + rng.integers(1, num_agents, rewire.sum())) % num_agents
+    return src, dst
+
+def stochastic_block_edges(sizes, p_in, p_out, rng):
+    offsets = np.concatenate(([0], np.cumsum(sizes)))
+    sources, targets = [], []
+    for a in range(len(sizes)):
+        index = _geometric_skip(sizes[a] * (sizes[a] - 1) // 2, p_in, rng)
+        row, column = _triangle_pairs(index)
+        sources.append(row + offsets[a])
+        targets.append(column + offsets[a])
+        for b in range(a + 1, len(sizes)):
+            index = _geometric_skip(sizes[a] * sizes[b], p_out, rng)
+            sources.append(index // sizes[b] + offsets[a])
+            targets.append(index % sizes[b] + offsets[b])
+    return np.concatenate(sources), np.concatenate(targets)
+
+def edges_to_csr(num_agents, src, dst):
+    """
+    Symmetric, unweighted CSR adjacency from undirected edge arrays; self
+    loops and duplicate edges are dropped.
+    """
+    keep = src != dst
+    low = np.minimum(src[keep], dst[keep]).astype(np.int64)
+    high = np.maximum(src[keep], dst[keep]).astype(np.int64)
+    key = np.unique(low * num_agents + high)
+    low, high = key // num_agents, key % num_agents
+    rows = np.concatenate((low, high))
+    columns = np.concatenate((high, low))
+    data = np.ones(rows.size, dtype=np.float64)
+    return sp.csr_array((data, (rows, columns)), shape=(num_agents, num_agents))
+
+# networkx is only imported by the functions below, which convert to and
+# from networkx graphs for drawing; the model never needs it.
+
+def csr_to_network(adjacency):
+    import networkx as nx
+    return nx.from_scipy_sparse_array(adjacency)
+
+def network_to_csr(G, num_agents=None):
+    """
+    Convert a networkx graph into a CSR adjacency matrix (rows and columns
+    ordered by agent id) and its degree vector.
+    """
+    import networkx as nx
+    if num_agents is None:
+        num_agents = G.number_of_nodes()
+    adjacency = nx.to_scipy_sparse_array(G, nodelist=range(num_agents), weight=None, dtype=np.float64, format='csr')
+    return adjacency, degree_vector(adjacency)
+
+def network_layout(adjacency, dim=3, seed=None, spring_max_nodes=NETWORK_LAYOUT_SPRING_MAX_NODES):
+    """
+    (N, dim) node positions for drawing the network, centred on the
+    origin. The topology never changes during a run, so this is computed
+    once per simulation. Networks of more than spring_max_nodes agents use
+    the spectral layout (sparse eigenvectors of the Laplacian), since every
+    spring layout iteration is quadratic in the number of agents.
+    """
+    import networkx as nx
+    G = csr_to_network(adjacency)
+    if adjacency.shape[0] <= spring_max_nodes:
+        pos = nx.spring_layout(G, dim=dim, seed=seed)
+    else:
+        pos = nx.spectral_layout(G, dim=dim)
+    layout = np.array([pos[i] for i in range(adjacency.shape[0])], dtype=np.float64).reshape(-1, dim)
+    return layout - layout.mean(axis=0)
+
+def degree_vector(adjacency):
+    return np.diff(adjacency.indptr).astype(np.float64)
+
+def save_network(filename, adjacency, **metadata):
+    """
+    Save a generated topology (CSR structure plus generation metadata such
+    as model and seed) so repeated runs can skip regeneration.
+    """
+    with open(filename, 'wb') as f:
+        np.savez(f, num_agents=adjacency.shape[0], indptr=adjacency.indptr, indices=adjacency.indices,
+                 metadata=np.array(json.dumps(metadata, default=str)))
+
+def load_network(filename):
+    return load_network_with_metadata(filename)[0]
+
+def load_network_with_metadata(filename):
+    """
+    The saved adjacency and the metadata it was saved with.
+    """
+    with np.load(filename) as data:
+        num_agents = int(data['num_agents'])
+        indptr, indices = data['indptr'], data['indices']
+        metadata = json.loads(str(data['metadata'])) if 'metadata' in data else {}
+    adjacency = sp.csr_array((np.ones(indices.size), indices, indptr), shape=(num_agents, num_agents))
+    return adjacency, metadata
+
+def load_or_generate_network(filename, model, num_agents, seed=None, **kwargs):
     """
-    Create a random network of agents using the Erdős-Rényi model.
+    Load the topology saved in `filename` if it exists, otherwise generate
+    it and save it there. A saved topology of another size, model or
+    generation parameters raises ValueError rather than being used or
+    overwritten; one generated from another seed is used with a warning,
+    since the point of the file is to share one topology between runs.
     """
-    G = nx.erdos_renyi_graph(n=NUM_AGENTS, p=NETWORK_PROBABILITY)
-    return G
+    if filename and os.path.exists(filename):
+        adjacency, metadata = load_network_with_metadata(filename)
+        expected = json.loads(json.dumps(dict(kwargs, model=model), default=str))
+        mismatched = {name: metadata[name] for name, value in expected.items() if name in metadata and metadata[name] != value}
+        if adjacency.shape[0] != num_agents:
+            mismatched['num_agents'] = adjacency.shape[0]
+        if mismatched:
+            raise ValueError(f"Network file {filename} was saved with {mismatched}, which does not match this "
+                             f"simulation ({num_agents} agents, model {model!r}, {kwargs}); remove it or use another file")
+        if 'seed' in metadata and metadata['seed'] != json.loads(json.dumps(seed, default=str)):
+            logger.warning(f"Network file {filename} was generated from another seed; using the saved topology.")
+        return adjacency
+    adjacency = generate_network(model, num_agents, seed, **kwargs)
+    if filename:
+        save_network(filename, adjacency, model=model, seed=seed, **kwargs)
+    return adjacency
@@ -19,6 +19,7 @@ TOKEN_CONVERSION_RATES = {
     'type 1': 1.0,      # Each resource token equals 1 force unit
     'type 2': 2.0,     # Each influence token equals 2 force units
 }
+TOKEN_TYPES = list(TOKEN_CONVERSION_RATES.keys())
 MAX_TOKEN_CHANGE = 100
 MAX_TOKENS = 1000000
 # Learning and Reward Parameters
@@ -40,14 +41,56 @@ OMEGA_AS = 0.3       # Weight for agent status in tax calculation
 OMEGA_E = 0.2        # Weight for economic stability in tax calculation
 THETA = 2            # Redistribution sensitivity parameter
 E = 0.2              # Economic stability factor
+POLICY_BLOCK_SIZE = 16384  # Agents processed per block by the fused tax policy pipelines
+UBI_FLOOR = 10             # Balance per token type the 'progressive_ubi' policy tops every agent up to first
 
 DELTA_W_CONSTANT = {
     'type 1': 5,     # Constant income for resource tokens
     'type 2': 3     # Constant income for influence tokens
 }
 
+# History Recording Parameters
+HISTORY_VARIABLES = TOKEN_TYPES + ['SF', 'AF', 'SI', 'AI', 'SS', 'AS', 'R', 'S', 'IN', 'V', 'A', 'C', 'AL']
+HISTORY_STRIDE = 1          # Record agent history every HISTORY_STRIDE time steps
+HISTORY_CHUNK_SIZE = 64     # Minimum number of rows the history buffers grow by
+HISTORY_DIR = None          # Stream agent history to memory-mapped files in this directory instead of RAM
+HISTORY_MEMMAP_CHUNK_SIZE = 256  # Rows per memory-mapped history chunk file
+
+# Checkpoint Parameters
+CHECKPOINT_INTERVAL = 0     # Save a checkpoint every this many time steps (0 disables auto-checkpointing)
+CHECKPOINT_FILE = os.path.join("simulation_data", "checkpoint.sim")  # May contain {time_step} to keep every checkpoint
+
+# Metrics Parameters
+METRICS_BUFFER_SIZE = 1000  # Per-step metrics records kept in memory
+METRICS_FILE = None         # Append per-step metrics to this JSON Lines file
+METRICS_STDOUT_EVERY = 0    # Print a metrics summary every this many steps (0 disables)
+
+# DFIA Parameters
+INCREMENTAL_DFIA = False  # Track the society total force incrementally instead of re-summing every step
+
+# Step Backend
+STEP_BACKEND = 'numpy'      # 'numpy', 'numba' (fused JIT per-agent kernel, falls back to numpy) or 'auto'
+
+# GUI Parameters
+GUI_STEP_INTERVAL = 10      # Pause in ms between steps of the background simulation worker (0 runs flat out)
+GUI_FRAME_INTERVAL = 100    # Redraw interval in ms; the GUI renders the latest step and skips the ones in between
+GUI_PLOT_POINTS = 1000      # Points per line in the GUI charts; longer series are decimated
+
 # Network Parameters
+NETWORK_MODEL = 'erdos_renyi'  # 'erdos_renyi', 'barabasi_albert', 'watts_strogatz' or 'stochastic_block'
 NETWORK_PROBABILITY = 0.05  # Probability for edge creation in the network
+NETWORK_M = 2               # Edges added per new agent (Barabási–Albert)
+NETWORK_K = 4               # Nearest neighbours in the ring lattice (Watts–Strogatz)
+NETWORK_REWIRING = 0.1      # Rewiring probability (Watts–Strogatz)
+NETWORK_BLOCKS = 4          # Number of communities (stochastic block model)
+NETWORK_P_IN = 0.1          # Edge probability within a community (stochastic block model)
+NETWORK_P_OUT = 0.01        # Edge probability between communities (stochastic block model)
+NETWORK_FILE = None         # Saved topology to load, or to save to after generating
+NETWORK_LAYOUT_SPRING_MAX_NODES = 2000  # Larger networks are drawn with the spectral instead of the spring layout
+
+# Live-tunable Parameters (adjusted at runtime by the GUI sliders)
+K6 = 0.01            # Ambition proportion
+K7 = 0.1             # Learning rate for competence
 
 # Other Constants
 PHI = 0.5            # Sensitivity to inspiration
@@ -56,3 +99,9 @@ PSI = 0.01           # Proportionality constant for action level
 # File Paths
 EXPORT_DIR = os.path.join("simulation_data", "exported_data")
 EXPORT_PLOTS_DIR = os.path.join("simulation_data", "exported_plots")
+
+# Export Parameters
+EXPORT_FORMAT = 'parquet'   # 'parquet' (single long-format file) or 'csv' (legacy, one file per agent)
+EXPORT_AGENTS_FILE = 'agents_data.parquet'
+EXPORT_BATCH_ROWS = 1000000 # Rows per Parquet row group
+EXPORT_COMPRESSION = 'zstd'
@@ -1,6 +1,7 @@
-from parameters import *
+import numpy as np
+from parameters import MAX_TOKEN_CHANGE, MAX_TOKENS, POLICY_BLOCK_SIZE, UBI_FLOOR
+from functions import sequential_sum, calculate_tax_rates
 import logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 def calculate_flat_tax_rate(agent, token_type, simulation):
@@ -9,62 +10,319 @@ def calculate_flat_tax_rate(agent, token_type, simulation):
     tax_paid = min(flat_rate * tokens, MAX_TOKEN_CHANGE)
     return tax_paid
 
-def redistribute_ubi(agents, total_tax_collected):
-    num_agents = len(agents)
-    if num_agents == 0:
-        logger.warning("No agents to redistribute taxes to.")
-        return
-    
-    for token_type, total_tax in total_tax_collected.items():
-        ubi_payment = total_tax / num_agents
-        for agent in agents:
-            agent.tokens[token_type] = min(agent.tokens[token_type] + ubi_payment, MAX_TOKENS)
-    
-    logger.info(f"Taxes redistributed as UBI: {total_tax_collected}")
-
-def redistribute_progressive(agents, total_tax_collected):
-    num_agents = len(agents)
-    if num_agents == 0:
-        logger.warning("No agents to redistribute taxes to.")
-        return
-    for token_type, total_tax in total_tax_collected.items():
-        total_tokens = sum(agent.tokens.get(token_type, 0) for agent in agents)
-        if total_tokens == 0:
-            logger.warning(f"No tokens of type '{token_type}' to redistribute.")
-            continue
-        base_share = total_tax / num_agents
-        progressive_total = total_tax - base_share * num_agents
-        total_inverse_tokens = sum(1 / (agent.tokens.get(token_type, 0) + 1) for agent in agents)
-        for agent in agents:
-            tokens = agent.tokens.get(token_type, 0)
-            progressive_share = (1 / (tokens + 1)) / total_inverse_tokens * progressive_total
+def calculate_flat_taxes(tokens, flat_rate):
+    return np.minimum(flat_rate * tokens, MAX_TOKEN_CHANGE)
+
+def calculate_progressive_taxes(tokens):
+    tax_rate = np.minimum(0.3, np.maximum(0.1, 0.1 + (tokens / 100) * 0.2))
+    return np.minimum(tax_rate * tokens, MAX_TOKEN_CHANGE)
+
+# Assessment functions: (context, rows) -> (rows, K) tax matrix
+
+def assess_flat_tax(context, rows):
+    return calculate_flat_taxes(context.tokens[rows], context.simulation.FLAT_TAX_RATE)
+
+def assess_progressive_tax(context, rows):
+    return calculate_progressive_taxes(context.tokens[rows])
+
+class PolicyContext:
+    """
+    State shared by the stages of one policy run: the population arrays,
+    the per-type collected totals and reductions computed for the
+    redistribution stages.
+
+    The totals are summed in stage order. Within a single block every
+    stage adds its taxes to them as they are collected, exactly as if each
+    stage swept the population on its own. Over several blocks the stages
+    after the first keep a running total of their own instead, added in
+    stage order after the collection pass by add_stage_totals, so the
+    totals stay independent of the block size up to rounding.
+    """
+    def __init__(self, population, total_tax_collected, simulation, block_size=POLICY_BLOCK_SIZE):
+        self.population = population
+        self.tokens = population.tokens
+        self.total_tax_collected = total_tax_collected
+        self.simulation = simulation
+        self.reductions = {}
+        self.force_change = 0.0
+        self.stage_index = 0
+        self.block_size = block_size
+        self.num_blocks = -(-len(population) // block_size)
+        self.stage_totals = {}
+        # Collected taxes already paid out by earlier redistribution stages, per type
+        self.committed = np.zeros(len(population.token_types))
+
+    def blocks(self):
+        num_agents = len(self.population)
+        for start in range(0, num_agents, self.block_size):
+            yield slice(start, min(start + self.block_size, num_agents))
+
+    @property
+    def rng(self):
+        """
+        Generator for stochastic stages: the simulation's 'policy' stream.
+        """
+        return self.simulation.random['policy']
+
+    def collect(self, rows, taxes, income=None):
+        """
+        Deduct taxes from the balances in rows (crediting a per-type income
+        at the same time) and add them to the collected totals.
+        """
+        if income is None:
+            self.tokens[rows] -= taxes
+            self.force_change -= taxes.sum()
+        else:
+            change = income - taxes
+            self.tokens[rows] += change
+            self.force_change += change.sum()
+        if self.stage_index > 0 and self.num_blocks > 1:
+            totals = self.stage_totals.setdefault(self.stage_index, np.zeros(len(self.population.token_types)))
+            for k in range(len(totals)):
+                totals[k] = sequential_sum(taxes[:, k], totals[k])
+            return
+        for k, token_type in enumerate(self.population.token_types):
+            self.total_tax_collected[token_type] = sequential_sum(taxes[:, k], self.total_tax_collected[token_type])
+
+    def add_stage_totals(self):
+        for stage_index in sorted(self.stage_totals):
+            for k, token_type in enumerate(self.population.token_types):
+                self.total_tax_collected[token_type] += self.stage_totals[stage_index][k]
+        self.stage_totals = {}
+
+    def set_balances(self, rows, k, balances):
+        self.force_change += (balances - self.tokens[rows, k]).sum()
+        self.tokens[rows, k] = balances
+
+    def accumulate(self, key, k, values):
+        """
+        Left-to-right running sum of values across blocks, per token type.
+        """
+        totals = self.reductions.setdefault(key, np.zeros(len(self.population.token_types)))
+        totals[k] = sequential_sum(values, totals[k])
+
+class Tax:
+    """
+    Assess and collect: deducts assess(context, rows) from every balance.
+    """
+    phase = 'collect'
+
+    def __init__(self, assess):
+        self.assess = assess
+
+    def collect(self, context, rows):
+        context.collect(rows, self.assess(context, rows))
+
+class StatusTax:
+    """
+    Status-based tax of Agent.update_state, levied together with the
+    constant per-step income.
+    """
+    phase = 'collect'
+
+    def __init__(self, delta_tokens):
+        self.delta_tokens = delta_tokens
+
+    def collect(self, context, rows):
+        population = context.population
+        tokens = context.tokens[rows]
+        tau = calculate_tax_rates(population.AS[rows], tokens.sum(axis=1), context.simulation.config.TAU_MAX)
+        population.tau[rows] = tau
+        taxes = tokens * tau[:, None]
+        population.community_contribution[rows] = taxes.sum(axis=1)
+        income = np.array([self.delta_tokens.get(token_type, 0) for token_type in population.token_types])
+        context.collect(rows, taxes, income)
+
+class Floor:
+    """
+    UBI floor: raise every balance below min_tokens up to it out of the
+    collected taxes, scaled down pro rata when they don't cover the whole
+    shortfall. Later redistribution stages share what is left.
+    """
+    phase = 'redistribute'
+
+    def __init__(self, min_tokens=UBI_FLOOR):
+        self.min_tokens = min_tokens
+
+    def prepare(self, context, rows):
+        for k in range(len(context.population.token_types)):
+            context.accumulate('floor_shortfall', k, np.maximum(self.min_tokens - context.tokens[rows, k], 0))
+
+    def redistribute(self, context, rows):
+        shortfall = context.reductions['floor_shortfall']
+        if 'floor_paid' not in context.reductions:
+            available = np.array([context.total_tax_collected[token_type] for token_type in context.population.token_types])
+            context.reductions['floor_paid'] = np.clip(available - context.committed, 0, shortfall)
+            context.committed += context.reductions['floor_paid']
+        for k in range(len(context.population.token_types)):
+            if shortfall[k] == 0:
+                continue
+            tokens = context.tokens[rows, k]
+            scale = context.reductions['floor_paid'][k] / shortfall[k]
+            context.set_balances(rows, k, tokens + np.maximum(self.min_tokens - tokens, 0) * scale)
+
+class UBI:
+    """
+    Redistribute the collected taxes that earlier stages left over in
+    equal shares.
+    """
+    phase = 'redistribute'
+
+    def prepare(self, context, rows):
+        pass
+
+    def redistribute(self, context, rows):
+        num_agents = len(context.population)
+        for k, token_type in enumerate(context.population.token_types):
+            ubi_payment = (context.total_tax_collected[token_type] - context.committed[k]) / num_agents
+            context.set_balances(rows, k, context.tokens[rows, k] + ubi_payment)
+
+class Progressive:
+    """
+    Redistribute the collected taxes as a base share plus a share
+    inversely proportional to each agent's balance, capped at
+    MAX_TOKEN_CHANGE per agent.
+    """
+    phase = 'redistribute'
+
+    def prepare(self, context, rows):
+        for k in range(len(context.population.token_types)):
+            tokens = context.tokens[rows, k]
+            context.accumulate('progressive_tokens', k, tokens)
+            context.accumulate('progressive_inverse', k, 1 / (tokens + 1))
+
+    def redistribute(self, context, rows):
+        num_agents = len(context.population)
+        for k, token_type in enumerate(context.population.token_types):
+            if context.reductions['progressive_tokens'][k] == 0:
+                continue
+            total_tax = context.total_tax_collected[token_type]
+            tokens = context.tokens[rows, k]
+            base_share = total_tax / num_agents
+            progressive_total = total_tax - base_share * num_agents
+            progressive_share = (1 / (tokens + 1)) / context.reductions['progressive_inverse'][k] * progressive_total
             total_share = base_share + progressive_share
-            share = min(max(total_share, 0), MAX_TOKEN_CHANGE)
-            agent.tokens[token_type] = min(agent.tokens[token_type] + share, MAX_TOKENS)
-    logger.info("Taxes redistributed progressively.")
-
-def apply_tax_policy(policy_name, agents, total_tax_collected, simulation):
-    if policy_name == 'flat':
-        for agent in agents:
-            for token_type in agent.tokens.keys():
-                tax = calculate_flat_tax_rate(agent, token_type, simulation)
-                agent.tokens[token_type] -= tax
-                total_tax_collected[token_type] += tax
-        logger.info("Flat tax policy applied.")
-    elif policy_name == 'ubi':
-        for agent in agents:
-            for token_type in agent.tokens.keys():
-                tax = calculate_flat_tax_rate(agent, token_type, simulation)
-                agent.tokens[token_type] -= tax
-                total_tax_collected[token_type] += tax
-        redistribute_ubi(agents, total_tax_collected)
-    elif policy_name == 'progressive':
-        for agent in agents:
-            for token_type, tokens in agent.tokens.items():
-                tax_rate = min(0.3, max(0.1, 0.1 + (tokens / 100) * 0.2))
-                tax = min(tax_rate * tokens, MAX_TOKEN_CHANGE)
-                agent.tokens[token_type] -= tax
-                total_tax_collected[token_type] += tax
-        redistribute_progressive(agents, total_tax_collected)
-    else:
-        logger.error(f"Unknown tax policy: {policy_name}")
\ No newline at end of file
+            share = np.minimum(np.maximum(total_share, 0), MAX_TOKEN_CHANGE)
+            context.set_balances(rows, k, tokens + share)
+
+class RelativeDeprivation:
+    """
+    Pay the collected taxes of every type left over by earlier stages into
+    the first token type, in proportion to RD ** THETA, where RD is how far
+    an agent's wealth falls short of the mean relative to the mean
+    (functions.redistribute_taxes). THETA is read from the simulation's
+    ModelConfig. The deprivation total needs the mean first, so it costs
+    one more pass over the population. It reads the balances again when
+    paying out, so it must be the first redistribution stage.
+    """
+    phase = 'redistribute'
+    config_parameters = ('THETA',)
+
+    def prepare(self, context, rows):
+        context.accumulate('deprivation_wealth', 0, context.tokens[rows].sum(axis=1))
+
+    def _weights(self, context, rows):
+        wealth_avg = context.reductions['deprivation_wealth'][0] / len(context.population)
+        if wealth_avg == 0:
+            return np.zeros(rows.stop - rows.start)
+        deprivation = (wealth_avg - context.tokens[rows].sum(axis=1)) / wealth_avg
+        return np.where(deprivation > 0, np.maximum(deprivation, 0) ** context.simulation.config.THETA, 0)
+
+    def redistribute(self, context, rows):
+        if 'deprivation_total' not in context.reductions:
+            total = 0.0
+            for block in context.blocks():
+                total = sequential_sum(self._weights(context, block), total)
+            context.reductions['deprivation_total'] = total
+        total = context.reductions['deprivation_total']
+        if total == 0:
+            return
+        available = sum(context.total_tax_collected[token_type] - context.committed[k]
+                        for k, token_type in enumerate(context.population.token_types))
+        context.set_balances(rows, 0, context.tokens[rows, 0] + self._weights(context, rows) / total * available)
+
+class Clip:
+    """
+    Cap every balance at max_tokens.
+    """
+    phase = 'redistribute'
+
+    def __init__(self, max_tokens=MAX_TOKENS):
+        self.max_tokens = max_tokens
+
+    def prepare(self, context, rows):
+        pass
+
+    def redistribute(self, context, rows):
+        for k in range(len(context.population.token_types)):
+            context.set_balances(rows, k, np.minimum(context.tokens[rows, k], self.max_tokens))
+
+class PolicyPipeline:
+    """
+    A tax policy compiled from stages. All collect stages, and the
+    reductions the redistribute stages need, run together in one pass over
+    the population in blocks of POLICY_BLOCK_SIZE agents; all redistribute
+    stages then run together in a second pass. A composite policy therefore
+    costs at most two population sweeps however many stages it has.
+    Reductions are taken over the balances after collection.
+    """
+    def __init__(self, name, stages, block_size=POLICY_BLOCK_SIZE):
+        self.name = name
+        self.stages = tuple(stages)
+        self.block_size = block_size
+        self.collect_stages = [stage for stage in self.stages if stage.phase == 'collect']
+        self.redistribute_stages = [stage for stage in self.stages if stage.phase == 'redistribute']
+
+    def with_stages(self, *stages):
+        return PolicyPipeline(self.name, stages + self.stages, self.block_size)
+
+    @property
+    def config_parameters(self):
+        """
+        ModelConfig parameters read by the stages of this policy.
+        """
+        return {name for stage in self.stages for name in getattr(stage, 'config_parameters', ())}
+
+    def run(self, population, total_tax_collected, simulation):
+        if len(population) == 0:
+            logger.warning("No agents to apply the tax policy to.")
+            return
+        context = PolicyContext(population, total_tax_collected, simulation, self.block_size)
+        for rows in context.blocks():
+            for stage_index, stage in enumerate(self.collect_stages):
+                context.stage_index = stage_index
+                stage.collect(context, rows)
+            for stage in self.redistribute_stages:
+                stage.prepare(context, rows)
+        context.add_stage_totals()
+        if self.redistribute_stages:
+            for rows in context.blocks():
+                for stage in self.redistribute_stages:
+                    stage.redistribute(context, rows)
+        population.adjust_total_force(context.force_change)
+        logger.debug("Tax policy '%s' applied: %s", self.name, total_tax_collected)
+
+POLICIES = {}
+
+def register_policy(name, *stages):
+    """
+    Register a tax policy as a pipeline of stages, e.g.
+    register_policy('progressive_ubi', Tax(assess_progressive_tax), Floor(), UBI(), Clip()).
+    """
+    POLICIES[name] = PolicyPipeline(name, stages)
+    return POLICIES[name]
+
+def get_policy(policy_name):
+    if policy_name not in POLICIES:
+        logger.error(f"Unknown tax policy: {policy_name}")
+        return PolicyPipeline(policy_name, ())
+    return POLICIES[policy_name]
+
+register_policy('flat', Tax(assess_flat_tax))
+register_policy('ubi', Tax(assess_flat_tax), UBI(), Clip())
+register_policy('progressive', Tax(assess_progressive_tax), Progressive(), Clip())
+register_policy('progressive_ubi', Tax(assess_progressive_tax), Floor(), UBI(), Clip())
+register_policy('relative_deprivation', Tax(assess_flat_tax), RelativeDeprivation(), Clip())
+
+def apply_tax_policy(policy_name, population, total_tax_collected, simulation):
+    get_policy(policy_name).run(population, total_tax_collected, simulation)
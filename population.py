@@ -0,0 +1,171 @@
+import numpy as np
+from parameters import TOKEN_TYPES, ALPHA_INITIAL, BETA_INITIAL, GAMMA_INITIAL
+from history import History
+
+# Per-agent DFIA and psychology variables, one float64 column each
+AGENT_VARIABLES = ['SF', 'AF', 'SS', 'AS', 'SI', 'AI', 'R', 'S', 'IN', 'V', 'A', 'C', 'AL']
+# Per-agent reward and learning state, one float64 column each
+LEARNING_VARIABLES = ['alpha', 'beta', 'gamma', 'P', 'r', 'delta', 'P_PREV', 'tau', 'DELTA_AS', 'community_contribution']
+# Reward weights, stored together as the columns of one (N, 3) matrix
+WEIGHT_VARIABLES = ['alpha', 'beta', 'gamma']
+# Variables stored as separate vectors
+COLUMN_VARIABLES = AGENT_VARIABLES + [name for name in LEARNING_VARIABLES if name not in WEIGHT_VARIABLES]
+INITIAL_WEIGHTS = (ALPHA_INITIAL, BETA_INITIAL, GAMMA_INITIAL)
+
+class Population:
+    """
+    Struct-of-arrays store for the whole agent population.
+
+    Token balances live in an (N, K) float64 matrix whose columns (one per
+    token type) are contiguous, and the reward weights alpha, beta and
+    gamma are the contiguous columns of an (N, 3) matrix `weights`; every
+    other DFIA, psychology and learning variable is its own float64 vector
+    of length N. Agent objects are views into a row.
+
+    storage, if given, is a (tokens, columns, weights) triple of existing
+    arrays to use instead of allocating new ones (see PopulationBatch).
+    """
+    def __init__(self, num_agents, token_types=None, storage=None):
+        self.num_agents = num_agents
+        self.token_types = list(token_types if token_types is not None else TOKEN_TYPES)
+        self.token_index = {token_type: k for k, token_type in enumerate(self.token_types)}
+        if storage is None:
+            weights = np.empty((num_agents, len(WEIGHT_VARIABLES)), order='F')
+            weights[:] = INITIAL_WEIGHTS
+            storage = (
+                np.zeros((num_agents, len(self.token_types)), order='F'),
+                {name: np.zeros(num_agents) for name in COLUMN_VARIABLES},
+                weights,
+            )
+        self.bind(*storage)
+        self._total_force = None
+        self.history = History(self)
+
+    def bind(self, tokens, columns, weights):
+        """
+        Use the given arrays as the population's storage: tokens (N, K),
+        columns {name: (N,)} for every COLUMN_VARIABLES name, weights (N, 3).
+        """
+        self.tokens = tokens
+        for name in COLUMN_VARIABLES:
+            setattr(self, name, columns[name])
+        self.weights = weights
+        for j, name in enumerate(WEIGHT_VARIABLES):
+            setattr(self, name, weights[:, j])
+
+    def get_total_force(self):
+        """
+        Society total force (sum of all balances). Cached between calls and
+        kept current by adjust_total_force, so DFIA can skip the O(N) sum.
+        """
+        if self._total_force is None:
+            self._total_force = self.tokens.sum()
+        return self._total_force
+
+    def adjust_total_force(self, amount):
+        if self._total_force is not None:
+            self._total_force += amount
+
+    def invalidate_total_force(self):
+        """
+        Must be called after writing to the token matrix directly without
+        reporting the net change through adjust_total_force.
+        """
+        self._total_force = None
+
+    def __len__(self):
+        return self.num_agents
+
+    def token_column(self, token_type):
+        return self.tokens[:, self.token_index[token_type]]
+
+    def wealth(self):
+        return self.tokens.sum(axis=1)
+
+    def total_tokens(self):
+        return {token_type: self.tokens[:, k].sum() for k, token_type in enumerate(self.token_types)}
+
+class TokenView:
+    """
+    Dict-like view of one agent's row in the population token matrix.
+    """
+    __slots__ = ('population', 'index')
+
+    def __init__(self, population, index):
+        self.population = population
+        self.index = index
+
+    def __getitem__(self, token_type):
+        return self.population.tokens[self.index, self.population.token_index[token_type]]
+
+    def __setitem__(self, token_type, value):
+        k = self.population.token_index[token_type]
+        self.population.adjust_total_force(value - self.population.tokens[self.index, k])
+        self.population.tokens[self.index, k] = value
+
+    def __contains__(self, token_type):
+        return token_type in self.population.token_index
+
+    def __iter__(self):
+        return iter(self.population.token_types)
+
+    def __len__(self):
+        return len(self.population.token_types)
+
+    def get(self, token_type, default=None):
+        if token_type in self.population.token_index:
+            return self[token_type]
+        return default
+
+    def keys(self):
+        return list(self.population.token_types)
+
+    def values(self):
+        return [self[token_type] for token_type in self.population.token_types]
+
+    def items(self):
+        return [(token_type, self[token_type]) for token_type in self.population.token_types]
+
+    def copy(self):
+        return dict(self.items())
+
+    def __eq__(self, other):
+        return dict(self.items()) == dict(other)
+
+    def __repr__(self):
+        return repr(self.copy())
+
+class PopulationBatch:
+    """
+    num_replicates independent populations of num_agents agents stacked
+    along a leading batch dimension: every column variable is a (B, N)
+    array, the token matrix is (B, N, K) and the weights are (B, N, 3).
+    populations[b] is an ordinary Population viewing replicate b, so each
+    replicate can be stepped on its own while elementwise kernels (such as
+    compute_population_psychology or update_population_rewards) process
+    the whole batch in one call.
+    """
+    def __init__(self, num_replicates, num_agents, token_types=None):
+        self.num_replicates = num_replicates
+        self.num_agents = num_agents
+        self.token_types = list(token_types if token_types is not None else TOKEN_TYPES)
+        # Stored replicate-major with agents last, so every replicate's
+        # columns are contiguous, as in a standalone Population
+        tokens = np.zeros((num_replicates, len(self.token_types), num_agents))
+        weights = np.empty((num_replicates, len(WEIGHT_VARIABLES), num_agents))
+        weights[:] = np.array(INITIAL_WEIGHTS)[:, None]
+        self.tokens = tokens.transpose(0, 2, 1)
+        for name in COLUMN_VARIABLES:
+            setattr(self, name, np.zeros((num_replicates, num_agents)))
+        self.weights = weights.transpose(0, 2, 1)
+        for j, name in enumerate(WEIGHT_VARIABLES):
+            setattr(self, name, weights[:, j])
+        self.populations = [
+            Population(num_agents, self.token_types, storage=(
+                self.tokens[b], {name: getattr(self, name)[b] for name in COLUMN_VARIABLES}, self.weights[b]
+            ))
+            for b in range(num_replicates)
+        ]
+
+    def __len__(self):
+        return self.num_replicates
@@ -0,0 +1,137 @@
+"""
+Per-phase profiling of Simulation.update.
+
+Each step is split into named phases (policy, dfia, competence, ...). While
+profiling is off the simulation uses NULL_PROFILER, whose phase() is a
+shared no-op context manager, so the instrumentation costs a couple of
+attribute lookups per phase. A StepProfiler records the wall time of every
+phase of every step and, with allocations=True, the peak traced memory
+(tracemalloc) and the net number of allocated blocks of each phase.
+"""
+import sys
+import time
+import tracemalloc
+
+# Python < 3.9 cannot reset the traced peak; net traced memory is recorded instead
+_RESET_PEAK = hasattr(tracemalloc, 'reset_peak')
+
+class _NullPhase:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+class NullProfiler:
+    enabled = False
+    _phase = _NullPhase()
+
+    def begin_step(self, time_step):
+        pass
+
+    def phase(self, name):
+        return self._phase
+
+NULL_PROFILER = NullProfiler()
+
+class _Phase:
+    __slots__ = ('profiler', 'name', 'start', 'memory', 'blocks')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        if self.profiler.allocations:
+            if _RESET_PEAK:
+                tracemalloc.reset_peak()
+            self.memory = tracemalloc.get_traced_memory()[0]
+            self.blocks = sys.getallocatedblocks()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        profiler = self.profiler
+        profiler.seconds.setdefault(self.name, []).append(elapsed)
+        if profiler.allocations:
+            current, peak = tracemalloc.get_traced_memory()
+            profiler.alloc_bytes.setdefault(self.name, []).append((peak if _RESET_PEAK else current) - self.memory)
+            profiler.alloc_blocks.setdefault(self.name, []).append(sys.getallocatedblocks() - self.blocks)
+        return False
+
+class StepProfiler:
+    """
+    Records per-phase wall time (and optionally allocations) for every
+    profiled step. seconds, alloc_bytes and alloc_blocks map each phase
+    name to one value per step in which the phase ran.
+    """
+    enabled = True
+
+    def __init__(self, allocations=False):
+        self.allocations = allocations
+        self.time_steps = []
+        self.seconds = {}
+        self.alloc_bytes = {}
+        self.alloc_blocks = {}
+        self._started_tracemalloc = False
+        if allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+    def close(self):
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def begin_step(self, time_step):
+        self.time_steps.append(time_step)
+
+    def phase(self, name):
+        return _Phase(self, name)
+
+    def summary(self):
+        """
+        {phase: statistics} over all profiled steps, in phase order.
+        """
+        total = sum(sum(values) for values in self.seconds.values())
+        summary = {}
+        for name, values in self.seconds.items():
+            stats = {
+                'steps': len(values),
+                'total_seconds': sum(values),
+                'mean_seconds': sum(values) / len(values),
+                'max_seconds': max(values),
+                'share': sum(values) / total if total > 0 else 0.0,
+            }
+            if name in self.alloc_bytes:
+                stats['mean_alloc_bytes'] = sum(self.alloc_bytes[name]) / len(values)
+                stats['mean_alloc_blocks'] = sum(self.alloc_blocks[name]) / len(values)
+            summary[name] = stats
+        return summary
+
+    def report(self):
+        """
+        The summary as a text table.
+        """
+        lines = [f"{'Phase':<12}{'Mean ms':>10}{'Max ms':>10}{'Total s':>10}{'Share':>8}"
+                 + (f"{'Peak KiB':>12}{'Blocks':>10}" if self.allocations else '')]
+        for name, stats in self.summary().items():
+            line = (f"{name:<12}{stats['mean_seconds'] * 1e3:>10.3f}{stats['max_seconds'] * 1e3:>10.3f}"
+                    f"{stats['total_seconds']:>10.3f}{stats['share']:>8.1%}")
+            if 'mean_alloc_bytes' in stats:
+                line += f"{stats['mean_alloc_bytes'] / 1024:>12.1f}{stats['mean_alloc_blocks']:>10.1f}"
+            lines.append(line)
+        return '\n'.join(lines)
+
+    def dump_collapsed(self, filename, metric='seconds'):
+        """
+        Write the totals in the collapsed-stack format read by flamegraph.pl,
+        speedscope and similar tools: one 'update;<phase> <value>' line per
+        phase, in microseconds (metric='seconds') or bytes ('alloc_bytes').
+        """
+        values = self.seconds if metric == 'seconds' else self.alloc_bytes
+        scale = 1e6 if metric == 'seconds' else 1
+        with open(filename, 'w') as f:
+            for name, samples in values.items():
+                f.write(f"update;{name} {max(int(round(sum(samples) * scale)), 0)}\n")
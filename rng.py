@@ -0,0 +1,52 @@
+import numpy as np
+
+# One independent stream per stochastic subsystem. New streams must be
+# appended, so that existing streams keep their spawn keys (and values).
+RNG_STREAMS = ['wealth', 'network', 'policy']
+
+class RandomStreams:
+    """
+    Per-simulation random number generators: a root SeedSequence spawns one
+    child per subsystem, and every child seeds its own PCG64 Generator.
+    Streams are independent of each other and of every other simulation,
+    and nothing draws from NumPy's global RNG.
+    """
+    def __init__(self, seed=None, names=RNG_STREAMS):
+        if isinstance(seed, np.random.SeedSequence):
+            # A fresh copy, so the streams do not depend on what was spawned from seed before
+            self.seed_sequence = np.random.SeedSequence(seed.entropy, spawn_key=seed.spawn_key, pool_size=seed.pool_size)
+        else:
+            self.seed_sequence = np.random.SeedSequence(seed)
+        self.names = list(names)
+        self.sequences = dict(zip(self.names, self.seed_sequence.spawn(len(self.names))))
+        self.generators = {name: np.random.Generator(np.random.PCG64(sequence)) for name, sequence in self.sequences.items()}
+
+    @property
+    def entropy(self):
+        """
+        Root entropy; passing it as the seed reproduces the run, including
+        runs started without a seed.
+        """
+        return self.seed_sequence.entropy
+
+    def __getitem__(self, name):
+        return self.generators[name]
+
+    def sequence(self, name):
+        return self.sequences[name]
+
+    def get_state(self):
+        return {
+            'entropy': self.seed_sequence.entropy,
+            'spawn_key': list(self.seed_sequence.spawn_key),
+            'names': self.names,
+            'generators': {name: generator.bit_generator.state for name, generator in self.generators.items()},
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        seed_sequence = np.random.SeedSequence(state['entropy'], spawn_key=tuple(state['spawn_key']))
+        streams = cls(seed_sequence, state['names'])
+        for name, generator_state in state['generators'].items():
+            streams.generators[name].bit_generator.state = generator_state
+        return streams
@@ -1,47 +1,113 @@
 import os
+import time
 import logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
-import pandas as pd
 import numpy as np
+import scipy.sparse as sp
 import pickle
-from agent import *
-from network import create_agent_network
-from parameters import *
-from functions import *
-from policy import apply_tax_policy
+from parameters import (
+    NUM_AGENTS, ASINI, W_MIN, W_MAX, MAX_TOKEN_CHANGE, DELTA_W_CONSTANT, HISTORY_STRIDE, HISTORY_DIR,
+    CHECKPOINT_INTERVAL, CHECKPOINT_FILE, METRICS_BUFFER_SIZE, METRICS_FILE, METRICS_STDOUT_EVERY,
+    INCREMENTAL_DFIA, STEP_BACKEND, NETWORK_MODEL, NETWORK_PROBABILITY, NETWORK_FILE,
+    EXPORT_DIR, EXPORT_FORMAT, EXPORT_AGENTS_FILE
+)
+from config import ModelConfig
+from agent import Agent
+from population import Population, COLUMN_VARIABLES, WEIGHT_VARIABLES
+from history import History, MemmapHistory
+from checkpoint import write_checkpoint, read_checkpoint, is_checkpoint
+from rng import RandomStreams
+from inequality import inequality_statistics, INEQUALITY_STATISTICS, INEQUALITY_LABELS
+from metrics import MetricsChannel, RingBufferSink, JSONLSink, StdoutSink
+from profiler import NULL_PROFILER, StepProfiler
+from kernels import resolve_backend, fused_agent_step
+from export import export_agents_parquet, export_agents_csv
+from network import load_or_generate_network, csr_to_network, network_to_csr, degree_vector, network_layout
+from functions import (
+    compute_DFIA, compute_population_competence, compute_population_psychology,
+    compute_population_action_level, update_population_rewards
+)
+from policy import apply_tax_policy, get_policy, StatusTax
 
 class Simulation:
-    def __init__(self, agent_id):
+    def __init__(self, agent_id=0, num_agents=NUM_AGENTS, seed=None, network_probability=NETWORK_PROBABILITY,
+                 network_model=NETWORK_MODEL, network_seed=None, network_file=NETWORK_FILE,
+                 history_variables=None, history_stride=HISTORY_STRIDE, history_dir=HISTORY_DIR,
+                 checkpoint_interval=CHECKPOINT_INTERVAL, checkpoint_file=CHECKPOINT_FILE, population=None, config=None):
         self.agents = []
+        # Model tunables of this simulation; saved with every checkpoint
+        self.config = config if config is not None else ModelConfig()
         self.agent_id = agent_id
+        self.num_agents = num_agents
+        # Per-subsystem generators; seed may be an int, a SeedSequence or None (fresh entropy)
+        self.random = RandomStreams(seed)
+        self.network_probability = network_probability
+        self.network_model = network_model
+        self.network_seed = network_seed
+        self.network_file = network_file
+        self.history_variables = history_variables
+        self.history_stride = history_stride
+        self.history_dir = history_dir
+        self.checkpoint_interval = checkpoint_interval
+        self.checkpoint_file = checkpoint_file
         self.time_step = 0
         self.running = False
         self.agent_histories = {}
         self.network = None
-        self.initialize_simulation()
+        self.adjacency = None
+        self.degree = None
+        self.layout = None
+        self.initialize_simulation(population)
         self.wealth_history = []
         self.time_series = []
         self.gini_history = []
+        # Other inequality statistics per step, {name: [value, ...]}
+        self.inequality_history = {name: [] for name in INEQUALITY_STATISTICS if name != 'gini'}
         self.avg_competence_history = []
         self.current_policy = 'flat'
         self.FLAT_TAX_RATE = 0.2
         self.total_tax_collected = 0
         self.ASPREV = 0
+        self.incremental_dfia = INCREMENTAL_DFIA
+        self.step_backend = resolve_backend(STEP_BACKEND)
+        self.status_tax = StatusTax(DELTA_W_CONSTANT)
+        # Per-step aggregates; the latest METRICS_BUFFER_SIZE records are kept in memory
+        self.metrics_buffer = RingBufferSink(METRICS_BUFFER_SIZE)
+        self.metrics = MetricsChannel([self.metrics_buffer])
+        if METRICS_FILE:
+            self.metrics.add_sink(JSONLSink(METRICS_FILE))
+        if METRICS_STDOUT_EVERY:
+            self.metrics.add_sink(StdoutSink(METRICS_STDOUT_EVERY))
+        self.profiler = NULL_PROFILER
     
-    def initialize_simulation(self):
+    def initialize_simulation(self, population=None):
+        """
+        Set up a freshly drawn population, or wrap the given one (e.g.
+        restored from a checkpoint) as it is.
+        """
+        if population is None:
+            population = Population(self.num_agents)
+            self.draw_initial_tokens(population)
+            if self.history_dir:
+                population.history = MemmapHistory(population, self.history_dir, self.history_variables, self.history_stride)
+            else:
+                population.history = History(population, self.history_variables, self.history_stride)
+        self.population = population
+        self.history = population.history
+        self.agents = [Agent.view(population, i, DELTA_W_CONSTANT) for i in range(self.num_agents)]
+
+    def draw_initial_tokens(self, population):
+        """
+        Fill the token matrix of population with initial balances drawn
+        from the 'wealth' stream.
+        """
         initial_tokens = {
-            'type 1': np.random.uniform(W_MIN, W_MAX, NUM_AGENTS),
-            'type 2': np.random.uniform(W_MIN, W_MAX, NUM_AGENTS),
+            'type 1': self.random['wealth'].uniform(W_MIN, W_MAX, self.num_agents),
+            'type 2': self.random['wealth'].uniform(W_MIN, W_MAX, self.num_agents),
         }
-        for i in range(NUM_AGENTS):
-            self.tokens = {k: initial_tokens[k][i] for k in initial_tokens}
-            agent = Agent(
-                agent_id=i,
-                initial_tokens=self.tokens,
-                delta_tokens=DELTA_W_CONSTANT
-            )
-            self.agents.append(agent)
+        for token_type, amounts in initial_tokens.items():
+            population.token_column(token_type)[:] = amounts
+        population.invalidate_total_force()
 
     def start(self):
         self.running = True
@@ -58,88 +124,209 @@ class Simulation:
         self.wealth_history.clear()
         self.time_series.clear()
         self.gini_history.clear()
+        for values in self.inequality_history.values():
+            values.clear()
         self.avg_competence_history.clear()
         logging.info("Simulation stopped and reset.")
 
     def step(self):
+        """
+        Advance a paused simulation by one step.
+        """
         if not self.running:
-            self.update()
+            self.running = True
+            try:
+                self.update()
+            finally:
+                self.running = False
 
     def update(self):
         if self.running:
-            self.time_step += 1
-            self.total_tax_collected = {k: 0 for k in self.agents[0].tokens.keys()}
-            
-            for agent in self.agents:
-                self.delta_tokens = {
-                    'type 1': min(DELTA_W_CONSTANT['type 1'], MAX_TOKEN_CHANGE),
-                    'type 2': min(DELTA_W_CONSTANT['type 2'], MAX_TOKEN_CHANGE)
-                }
-            
-                tax_paid = agent.update_state()
-                for k, v in tax_paid.items():
-                    self.total_tax_collected[k] += v
-                self.community_contribution = sum(tax_paid.values())
-
-            logger.info(f"Total tax collected before redistribution: {self.total_tax_collected}")
-            apply_tax_policy(self.current_policy, self.agents, self.total_tax_collected, self)
-            logger.info(f"Total tax collected after redistribution: {self.total_tax_collected}")
-
-            G = self.get_network()
-            # Update variables, rewards and weights
-            for agent in self.agents:
-                self.AS, self.SS, self.SI, self.AI = compute_DFIA(self.agents)
-                self.R, self.S, self.V, self.A, self.IN, self.C, self.AL = agent.update_variables(G, self.agents)
-                self.C = compute_competence(G, agent.agent_id, self.agents)
-                self.AL = compute_action_level(self.C, self.V, self.A)
-        
-                if self.ASPREV is None:
-                    self.ASPREV = ASINI
-                else:
-                    self.DELTA_AS = self.AS - self.ASPREV
-                agent.compute_reward(self)
-                agent.collect_data()
-
-            avg_wealth = np.mean([sum(agent.tokens.values()) for agent in self.agents])
+            start = time.perf_counter()
+            adjacency, degree = self.begin_step()
+            if self.step_backend == 'numba':
+                self._update_agents_fused(self.profiler, adjacency, degree)
+            else:
+                self.update_environment(adjacency, degree)
+                self.update_learning()
+            self.finish_step(start)
+
+    def begin_step(self):
+        """
+        First part of update(): advance the clock and apply the status tax
+        and the tax policy. Returns the network adjacency and degrees.
+        """
+        profiler = self.profiler
+        self.time_step += 1
+        profiler.begin_step(self.time_step)
+        self.delta_tokens = {
+            'type 1': min(DELTA_W_CONSTANT['type 1'], MAX_TOKEN_CHANGE),
+            'type 2': min(DELTA_W_CONSTANT['type 2'], MAX_TOKEN_CHANGE)
+        }
+        with profiler.phase('policy'):
+            self.total_tax_collected = {k: 0 for k in self.population.token_types}
+            # Status-based tax and income are fused into the policy pipeline's collection pass
+            get_policy(self.current_policy).with_stages(self.status_tax).run(self.population, self.total_tax_collected, self)
+        with profiler.phase('network'):
+            return self.get_adjacency()
+
+    def update_environment(self, adjacency, degree):
+        """
+        DFIA and competence phases.
+        """
+        profiler = self.profiler
+        population = self.population
+        with profiler.phase('dfia'):
+            if not self.incremental_dfia:
+                population.invalidate_total_force()
+            self.AS, self.SS, self.SI, self.AI = compute_DFIA(population, population.get_total_force())
+        with profiler.phase('competence'):
+            population.C[:] = compute_population_competence(adjacency, degree, population.C, self.config.K7, self.config.COPT)
+        if self.ASPREV is None:
+            self.ASPREV = ASINI
+        else:
+            self.DELTA_AS = self.AS - self.ASPREV
+
+    def update_learning(self):
+        """
+        Psychology, action level and reward phases: elementwise over the
+        population, so an Ensemble runs them for all replicates at once.
+        """
+        profiler = self.profiler
+        population = self.population
+        # Update variables, rewards and weights
+        with profiler.phase('psychology'):
+            self.R, self.S, self.V, self.A, self.IN = compute_population_psychology(population, self.config.K6)
+            self.C = population.C
+            population.AL[:] = compute_population_action_level(population.C, population.V, population.A)
+            self.AL = population.AL
+        with profiler.phase('reward'):
+            update_population_rewards(population, sum(DELTA_W_CONSTANT.values()))
+
+    def finish_step(self, start):
+        """
+        Last part of update(): record history and aggregates, publish the
+        step's metrics and write a checkpoint when one is due.
+        """
+        profiler = self.profiler
+        with profiler.phase('history'):
+            self.history.record(self.time_step)
+
+        with profiler.phase('metrics'):
+            wealths = self.population.wealth()
+            avg_wealth = np.mean(wealths)
             self.wealth_history.append(avg_wealth)
-            logging.info(f"Average Wealth: {avg_wealth}")
             self.time_series.append(self.time_step)
-            logging.info(f"Time Step {self.time_step}:")
-            avg_competence = np.mean([agent.C if agent.C is not None else 0 for agent in self.agents])
+            avg_competence = np.mean(self.population.C)
             self.avg_competence_history.append(avg_competence)
-            logging.info(f"Average Competence: {avg_competence}")
-            wealths = [sum(agent.tokens.values()) for agent in self.agents]
-            logging.info(f"Agents' Wealth: {[sum(agent.tokens.values()) for agent in self.agents]}")
-            gini = gini_coefficient(wealths)
+            inequality = inequality_statistics(wealths)
+            gini = inequality['gini']
             self.gini_history.append(gini)
-            logging.info(f"Gini Coefficient: {gini}")
+            for name, values in self.inequality_history.items():
+                values.append(inequality[name])
+            # Persisted next to an on-disk history, so its analysis needn't replay the tokens
+            self.history.record_aggregates({'time_step': self.time_step, 'avg_wealth': avg_wealth,
+                                            'avg_competence': avg_competence, **inequality})
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Time step %d: agents' wealth %s", self.time_step, wealths.tolist())
+
+            record = {
+                'time_step': self.time_step,
+                'avg_wealth': float(avg_wealth),
+                'gini': gini,
+                'avg_competence': float(avg_competence),
+                'policy': self.current_policy,
+                'step_seconds': time.perf_counter() - start,
+            }
+            record.update(inequality)
+            for token_type, amount in self.total_tax_collected.items():
+                record[f'tax_collected {token_type}'] = float(amount)
+            self.metrics.publish(record)
+
+        if self.checkpoint_interval and self.time_step % self.checkpoint_interval == 0:
+            with profiler.phase('checkpoint'):
+                self.save_checkpoint(self.checkpoint_file.format(time_step=self.time_step))
+
+    def _update_agents_fused(self, profiler, adjacency, degree):
+        """
+        The same phases with the competence update in NumPy and everything
+        else in one compiled per-agent loop (kernels.fused_agent_step).
+        """
+        population = self.population
+        with profiler.phase('competence'):
+            population.C[:] = compute_population_competence(adjacency, degree, population.C, self.config.K7, self.config.COPT)
+        with profiler.phase('agent_step'):
+            if not self.incremental_dfia:
+                population.invalidate_total_force()
+            fused_agent_step(population, population.get_total_force(), sum(DELTA_W_CONSTANT.values()), self.config.K6)
+        self.AS, self.SS, self.SI, self.AI = population.AS, population.SS, population.SI, population.AI
+        self.R, self.S, self.V, self.A, self.IN = population.R, population.S, population.V, population.A, population.IN
+        self.C, self.AL = population.C, population.AL
+        if self.ASPREV is None:
+            self.ASPREV = ASINI
+        else:
+            self.DELTA_AS = self.AS - self.ASPREV
+
+    def enable_profiling(self, allocations=False):
+        """
+        Start recording per-phase wall time (and, with allocations, traced
+        memory and allocated blocks) of every step; returns the StepProfiler.
+        """
+        self.disable_profiling()
+        self.profiler = StepProfiler(allocations)
+        return self.profiler
+
+    def disable_profiling(self):
+        if self.profiler.enabled:
+            self.profiler.close()
+        self.profiler = NULL_PROFILER
 
     def apply_policy(self, policy_name):
         self.current_policy = policy_name
         # Ensure total_tax_collected is a dictionary
         if not isinstance(self.total_tax_collected, dict):
-            self.total_tax_collected = {k: 0 for k in self.agents[0].tokens.keys()}
-        apply_tax_policy(self.current_policy, self.agents, self.total_tax_collected, self)
+            self.total_tax_collected = {k: 0 for k in self.population.token_types}
+        apply_tax_policy(self.current_policy, self.population, self.total_tax_collected, self)
         logging.info(f"Policy set to: {self.current_policy}")
     
     def get_agents(self):
         return self.agents
 
     def get_agent_by_id(self, agent_id):
+        if 0 <= agent_id < len(self.agents) and self.agents[agent_id].agent_id == agent_id:
+            return self.agents[agent_id]
         for agent in self.agents:
             if agent.agent_id == agent_id:
                 return agent
         return None
 
+    def get_metrics(self):
+        """
+        Latest per-step metrics records, oldest first.
+        """
+        return list(self.metrics_buffer)
+
     def get_time_series(self):
         return self.time_series
 
+    def get_history_time_series(self):
+        """
+        Time steps at which per-agent history was recorded.
+        """
+        return self.history.get_time_steps()
+
     def get_wealth_time_series(self):
         return self.wealth_history
 
     def get_gini_coefficient(self):
         return self.gini_history[-1] if self.gini_history else 0
 
+    def get_inequality_history(self):
+        """
+        {name: per-step values} of every statistic in INEQUALITY_STATISTICS.
+        """
+        return dict(self.inequality_history, gini=self.gini_history)
+
     def get_average_wealth(self):
         return self.wealth_history[-1] if self.wealth_history else 0
 
@@ -147,12 +334,49 @@ class Simulation:
         return self.avg_competence_history[-1] if self.avg_competence_history else 0
 
     def get_network(self):
+        """
+        networkx view of the agent network, used only for drawing.
+        """
         if self.network is None:
-            self.network = create_agent_network()
+            self.network = csr_to_network(self.get_adjacency()[0])
         return self.network
 
-    def export_data(self):
-        export_dir = EXPORT_DIR
+    def get_adjacency(self):
+        """
+        CSR adjacency matrix and degree vector of the agent network. The
+        topology is generated directly in CSR form (or loaded from
+        network_file) once; a graph assigned to self.network is used as is.
+        """
+        if self.adjacency is None:
+            if self.network is not None:
+                self.adjacency, self.degree = network_to_csr(self.network, self.num_agents)
+            else:
+                self.adjacency = load_or_generate_network(
+                    self.network_file, self.network_model, self.num_agents, self.get_network_seed(),
+                    probability=self.network_probability
+                )
+                self.degree = degree_vector(self.adjacency)
+        return self.adjacency, self.degree
+
+    def get_layout(self):
+        """
+        (N, 3) node positions for drawing the network, computed once and
+        saved with checkpoints.
+        """
+        if self.layout is None:
+            seed = int(self.random.sequence('network').generate_state(1)[0]) if self.network_seed is None else self.network_seed
+            self.layout = network_layout(self.get_adjacency()[0], dim=3, seed=seed)
+        return self.layout
+
+    def get_network_seed(self):
+        """
+        Seed of the network topology: network_seed if one was given,
+        otherwise the simulation's 'network' stream.
+        """
+        return self.network_seed if self.network_seed is not None else self.random.sequence('network')
+
+    def export_data(self, export_format=EXPORT_FORMAT, export_dir=EXPORT_DIR):
+        import pandas as pd
         os.makedirs(export_dir, exist_ok=True)
         
         # Export aggregate data
@@ -160,38 +384,153 @@ class Simulation:
             'Time Step': self.time_series,
             'Average Wealth': self.wealth_history,
             'Gini Coefficient': self.gini_history,
-            'Average Competence': self.avg_competence_history
+            'Average Competence': self.avg_competence_history,
+            **{INEQUALITY_LABELS[name]: values for name, values in self.inequality_history.items()}
         })
         
         aggregate_data.to_csv(os.path.join(export_dir, 'aggregate_data.csv'), index=False)
         
         # Export individual agent data
-        for agent in self.agents:
-            agent_data = pd.DataFrame({
-                'Time Step': self.time_series,
-                'Tokens type 1': [tokens.get('type 1', 0) for tokens in agent.history['tokens']],
-                'Tokens type 2': [tokens.get('type 2', 0) for tokens in agent.history['tokens']],
-                'SF': agent.history['SF'],
-                'AF': agent.history['AF'],
-                'SI': agent.history['SI'],
-                'AI': agent.history['AI'],
-                'SS': agent.history['SS'],
-                'AS': agent.history['AS'],
-                'R': agent.history['R'],
-                'S': agent.history['S'],
-                'IN': agent.history['IN'],
-                'V': agent.history['V'],
-                'A': agent.history['A'],
-                'C': agent.history['C'],
-                'AL': agent.history['AL'],
-            })
-            
-            agent_data.to_csv(os.path.join(export_dir, f'agent_{agent.agent_id}_data.csv'), index=False)
+        agent_ids = [agent.agent_id for agent in self.agents]
+        if export_format == 'parquet':
+            export_agents_parquet(self.history, agent_ids, os.path.join(export_dir, EXPORT_AGENTS_FILE))
+        elif export_format == 'csv':
+            export_agents_csv(self.history, agent_ids, export_dir)
+        else:
+            raise ValueError(f"Unknown export format: {export_format}")
         
         logging.info(f"Data exported to {export_dir}.")
 
-    @staticmethod
-    def load_simulation(filename):
+    def save_checkpoint(self, filename, include_history=True):
+        """
+        Save the full simulation state as a binary checkpoint (see
+        checkpoint.py): population arrays, network CSR, random streams, policy,
+        model parameters, aggregate series and, if include_history, the
+        in-memory agent history. A memory-mapped history stays in its
+        directory and is only referenced.
+        """
+        adjacency, _ = self.get_adjacency()
+        population = self.population
+        header = {
+            'time_step': self.time_step,
+            'num_agents': self.num_agents,
+            'token_types': population.token_types,
+            'current_policy': self.current_policy,
+            'FLAT_TAX_RATE': self.FLAT_TAX_RATE,
+            'incremental_dfia': self.incremental_dfia,
+            'total_force': None if population._total_force is None else float(population._total_force),
+            'network': {
+                'model': self.network_model,
+                'probability': self.network_probability,
+                'seed': self.network_seed,
+                'file': self.network_file,
+            },
+            'parameters': self.config.to_dict(),
+            'random': self.random.get_state(),
+            'history': None,
+        }
+        arrays = {
+            # Stored transposed so the Fortran-ordered matrix is one contiguous buffer
+            'tokens': population.tokens.T,
+            'network/indptr': adjacency.indptr,
+            'network/indices': adjacency.indices,
+            'aggregate/time_series': np.asarray(self.time_series, dtype=np.int64),
+            'aggregate/wealth': np.asarray(self.wealth_history, dtype=np.float64),
+            'aggregate/gini': np.asarray(self.gini_history, dtype=np.float64),
+            'aggregate/avg_competence': np.asarray(self.avg_competence_history, dtype=np.float64),
+        }
+        for name, values in self.inequality_history.items():
+            arrays[f'aggregate/{name}'] = np.asarray(values, dtype=np.float64)
+        if self.layout is not None:
+            arrays['network/layout'] = self.layout
+        for name in COLUMN_VARIABLES:
+            arrays[f'population/{name}'] = getattr(population, name)
+        # Transposed for the same reason as the tokens
+        arrays['population/weights'] = population.weights.T
+
+        history = self.history
+        if isinstance(history, MemmapHistory):
+            history.flush()
+            header['history'] = {'directory': history.directory, 'length': history.length, 'calls': history.calls}
+        elif include_history:
+            header['history'] = {'variables': history.variables, 'stride': history.stride, 'calls': history.calls}
+            arrays['history/time_steps'] = history.get_time_steps()
+            for name in history.variables:
+                arrays[f'history/{name}'] = history.column(name)
+
+        write_checkpoint(filename, header, arrays)
+        logger.info(f"Checkpoint at time step {self.time_step} saved to {filename}.")
+
+    def save_simulation(self, filename):
+        self.save_checkpoint(filename)
+
+    @classmethod
+    def load_checkpoint(cls, filename):
+        """
+        Restore a simulation saved with save_checkpoint. Arrays are
+        copy-on-write views of the memory-mapped file, so restoring costs
+        little more than building the agent views; stepping the restored
+        simulation continues exactly as the original run would have.
+        """
+        header, arrays = read_checkpoint(filename)
+        num_agents = header['num_agents']
+        population = Population(num_agents, header['token_types'])
+        if 'population/weights' in arrays:
+            weights = arrays['population/weights'].T
+        else:
+            # Checkpoints written before the weights were one matrix
+            weights = np.stack([arrays[f'population/{name}'] for name in WEIGHT_VARIABLES], axis=1)
+        population.bind(arrays['tokens'].T, {name: arrays[f'population/{name}'] for name in COLUMN_VARIABLES}, weights)
+        population._total_force = header['total_force']
+
+        history_state = header['history']
+        history_dir = None
+        if history_state is None:
+            population.history = History(population)
+        elif 'directory' in history_state:
+            history_dir = history_state['directory']
+            population.history = MemmapHistory.resume(population, history_dir, history_state['length'], history_state['calls'],
+                                                      len(arrays['aggregate/time_series']))
+        else:
+            data = {name: arrays[f'history/{name}'] for name in history_state['variables']}
+            population.history = History.from_arrays(population, arrays['history/time_steps'], data,
+                                                      history_state['stride'], history_state['calls'])
+
+        network = header['network']
+        simulation = cls(num_agents=num_agents, network_probability=network['probability'],
+                         network_model=network['model'], network_seed=network['seed'], network_file=network['file'],
+                         history_variables=population.history.variables, history_stride=population.history.stride,
+                         history_dir=history_dir, population=population, config=ModelConfig(**header['parameters']))
+        simulation.adjacency = sp.csr_array(
+            (np.ones(arrays['network/indices'].size), arrays['network/indices'], arrays['network/indptr']),
+            shape=(num_agents, num_agents)
+        )
+        simulation.degree = degree_vector(simulation.adjacency)
+        simulation.layout = arrays.get('network/layout')
+        simulation.time_step = header['time_step']
+        simulation.current_policy = header['current_policy']
+        simulation.FLAT_TAX_RATE = header['FLAT_TAX_RATE']
+        simulation.incremental_dfia = header['incremental_dfia']
+        simulation.time_series = arrays['aggregate/time_series'].tolist()
+        simulation.wealth_history = arrays['aggregate/wealth'].tolist()
+        simulation.gini_history = arrays['aggregate/gini'].tolist()
+        simulation.avg_competence_history = arrays['aggregate/avg_competence'].tolist()
+        for name in simulation.inequality_history:
+            # Not recorded by older checkpoints
+            values = arrays.get(f'aggregate/{name}', np.full(len(simulation.time_series), np.nan))
+            simulation.inequality_history[name] = values.tolist()
+        simulation.random = RandomStreams.from_state(header['random'])
+        logger.info(f"Checkpoint at time step {simulation.time_step} loaded from {filename}.")
+        return simulation
+
+    @classmethod
+    def load_simulation(cls, filename):
+        """
+        Load a checkpoint, or a simulation pickled by earlier versions.
+        """
+        if is_checkpoint(filename):
+            return cls.load_checkpoint(filename)
+        logger.warning(f"{filename} is not a checkpoint; loading it as a legacy pickle.")
         with open(filename, 'rb') as f:
             simulation = pickle.load(f)
         logging.info(f"Simulation loaded from {filename}.")
@@ -0,0 +1,230 @@
+"""
+Parallel parameter sweeps over independent Simulation instances.
+
+A sweep is a list of parameter points (a full grid or a Latin-hypercube
+sample) crossed with replicate seeds, so every point sees the same set of
+random streams. Replicate seeds are derived from one base seed through a
+SeedSequence and every Simulation spawns its own generators from its
+seed, so replicates are independent and reproducible in any worker.
+Every (point, seed) task runs in a ProcessPoolExecutor worker that
+receives its whole configuration with the task, and the per-step Gini /
+average wealth / average competence trajectories are collected into one
+long-format table.
+
+The rows of each finished task are written to their own file in
+<output_dir>/tasks (to a temporary file first, then renamed into place)
+and only then is the task id recorded in <output_dir>/completed.txt, so
+an interrupted sweep resumes by skipping the completed tasks and never
+sees partially written rows. The results of all completed tasks are
+combined into <output_dir>/results.csv at the end of every sweep.
+"""
+import hashlib
+import itertools
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+from parameters import NUM_AGENTS, NUM_TIMESTEPS, FLAT_TAX_RATE, NETWORK_PROBABILITY
+from config import ModelConfig, MODEL_PARAMETERS
+from policy import POLICIES, get_policy
+logger = logging.getLogger(__name__)
+
+# Parameters handled by the Simulation instance itself; the MODEL_PARAMETERS go into its ModelConfig
+SIMULATION_PARAMETERS = ['policy', 'FLAT_TAX_RATE', 'NETWORK_PROBABILITY']
+SWEEP_PARAMETERS = SIMULATION_PARAMETERS + MODEL_PARAMETERS
+
+RESULTS_FILE = 'results.csv'
+COMPLETED_FILE = 'completed.txt'
+TASKS_DIR = 'tasks'
+
+def parameter_grid(grid):
+    """
+    Cartesian product of {name: [values, ...]} as a list of dicts.
+    """
+    _check_parameter_names(grid)
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+def latin_hypercube(bounds, num_samples, seed=None):
+    """
+    Latin-hypercube sample of {name: (low, high)} as a list of dicts: each
+    range is split into num_samples strata and every stratum is used once.
+    """
+    _check_parameter_names(bounds)
+    rng = np.random.default_rng(seed)
+    samples = [{} for _ in range(num_samples)]
+    for name, (low, high) in bounds.items():
+        strata = (rng.permutation(num_samples) + rng.uniform(size=num_samples)) / num_samples
+        for sample, u in zip(samples, strata):
+            sample[name] = float(low + u * (high - low))
+    return samples
+
+def _check_parameter_names(names):
+    unknown = [name for name in names if name not in SWEEP_PARAMETERS]
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters {unknown}; expected any of {SWEEP_PARAMETERS}")
+
+def check_policy_parameters(points):
+    """
+    Refuse a sweep over a model parameter that only some policies read
+    (e.g. THETA) when none of its points uses such a policy, since every
+    value would give the same trajectories; warn if only some points do.
+    """
+    for name in sorted(set().union(*(policy.config_parameters for policy in POLICIES.values()))):
+        policies = {point.get('policy', 'flat') for point in points if name in point}
+        unused = sorted(policy for policy in policies if name not in get_policy(policy).config_parameters)
+        if not unused:
+            continue
+        readers = sorted(policy for policy in POLICIES if name in POLICIES[policy].config_parameters)
+        if len(unused) == len(policies):
+            raise ValueError(f"{name} has no effect on the policies {unused}; it is only read by {readers}")
+        logger.warning(f"{name} has no effect on the policies {unused}; its values give identical runs there")
+
+def replicate_seeds(seed, num_replicates):
+    """
+    num_replicates well-mixed 64-bit seeds derived from one base seed, so
+    sweeps with different base seeds never share replicate streams.
+    """
+    return [int(s) for s in np.random.SeedSequence(seed).generate_state(num_replicates, dtype=np.uint64)]
+
+def task_id(params, seed, num_agents=NUM_AGENTS, num_steps=NUM_TIMESTEPS):
+    key = json.dumps({'params': params, 'seed': seed, 'num_agents': num_agents, 'num_steps': num_steps}, sort_keys=True)
+    return hashlib.sha1(key.encode()).hexdigest()[:12]
+
+def build_tasks(points, seeds, num_agents=NUM_AGENTS, num_steps=NUM_TIMESTEPS):
+    tasks = []
+    for params in points:
+        for seed in seeds:
+            tasks.append({
+                'task_id': task_id(params, seed, num_agents, num_steps),
+                'params': dict(params),
+                'seed': seed,
+                'num_agents': num_agents,
+                'num_steps': num_steps,
+            })
+    return tasks
+
+def run_task(task):
+    """
+    Worker entry point. Runs one (parameter point, seed) simulation and
+    returns its trajectories as a dict of columns.
+    """
+    from asersa import run_simulation
+    logging.getLogger().setLevel(logging.WARNING)
+    params = task['params']
+    config = ModelConfig(**{name: value for name, value in params.items() if name in MODEL_PARAMETERS})
+    simulation, elapsed = run_simulation(
+        num_agents=task['num_agents'],
+        num_steps=task['num_steps'],
+        policy=params.get('policy', 'flat'),
+        seed=task['seed'],
+        flat_tax_rate=params.get('FLAT_TAX_RATE', FLAT_TAX_RATE),
+        network_probability=params.get('NETWORK_PROBABILITY', NETWORK_PROBABILITY),
+        config=config,
+    )
+    num_rows = len(simulation.time_series)
+    columns = {
+        'task_id': [task['task_id']] * num_rows,
+        'seed': [task['seed']] * num_rows,
+    }
+    for name, value in params.items():
+        columns[name] = [value] * num_rows
+    columns['time_step'] = list(simulation.time_series)
+    columns['gini'] = [float(g) for g in simulation.gini_history]
+    columns['avg_wealth'] = [float(w) for w in simulation.wealth_history]
+    columns['avg_competence'] = [float(c) for c in simulation.avg_competence_history]
+    columns['elapsed'] = [elapsed] * num_rows
+    return columns
+
+def _task_path(output_dir, task_id):
+    return os.path.join(output_dir, TASKS_DIR, f'{task_id}.csv')
+
+def completed_task_ids(output_dir):
+    """
+    Ids of the tasks whose results are complete in output_dir.
+    """
+    path = os.path.join(output_dir, COMPLETED_FILE)
+    if not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        task_ids = {line.strip() for line in f if line.strip()}
+    return {task_id for task_id in task_ids if os.path.exists(_task_path(output_dir, task_id))}
+
+def load_results(output_dir):
+    """
+    Results of every completed task in output_dir as one DataFrame.
+    """
+    frames = [pd.read_csv(_task_path(output_dir, task_id), dtype={'task_id': str})
+              for task_id in sorted(completed_task_ids(output_dir))]
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+def _write_csv(frame, path):
+    temporary_path = path + '.tmp'
+    frame.to_csv(temporary_path, index=False)
+    with open(temporary_path, 'rb+') as f:
+        os.fsync(f.fileno())
+    os.replace(temporary_path, path)
+
+def _save_result(output_dir, columns, columns_order):
+    task_id = columns['task_id'][0]
+    _write_csv(pd.DataFrame(columns).reindex(columns=columns_order), _task_path(output_dir, task_id))
+    with open(os.path.join(output_dir, COMPLETED_FILE), 'a+') as f:
+        # A crash may have left a partial line behind; start on a fresh one
+        f.seek(0, os.SEEK_END)
+        if f.tell() > 0:
+            f.seek(f.tell() - 1)
+            if f.read(1) != '\n':
+                f.write('\n')
+        f.write(task_id + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+def _existing_columns(output_dir):
+    """
+    Columns of the results already in output_dir, or None.
+    """
+    completed = sorted(completed_task_ids(output_dir))
+    if completed:
+        path = _task_path(output_dir, completed[0])
+    else:
+        path = os.path.join(output_dir, RESULTS_FILE)
+        if not os.path.exists(path):
+            return None
+    return list(pd.read_csv(path, nrows=0).columns)
+
+def run_sweep(points, seeds, output_dir, num_agents=NUM_AGENTS, num_steps=NUM_TIMESTEPS, max_workers=None):
+    """
+    Run every (point, seed) task not yet completed in output_dir over a
+    process pool and return the combined results table.
+    """
+    check_policy_parameters(points)
+    os.makedirs(os.path.join(output_dir, TASKS_DIR), exist_ok=True)
+    tasks = build_tasks(points, seeds, num_agents, num_steps)
+    done = completed_task_ids(output_dir)
+    pending = [task for task in tasks if task['task_id'] not in done]
+    logger.info(f"Sweep: {len(tasks)} tasks, {len(tasks) - len(pending)} already completed.")
+
+    names = [name for name in SWEEP_PARAMETERS if any(name in point for point in points)]
+    columns_order = ['task_id', 'seed'] + names + ['time_step', 'gini', 'avg_wealth', 'avg_competence', 'elapsed']
+    existing = _existing_columns(output_dir)
+    if existing is not None and existing != columns_order:
+        raise ValueError(f"{output_dir} has results with columns {existing}, but this sweep writes {columns_order}; "
+                         f"use a new output directory")
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(run_task, task): task for task in pending}
+            for future in as_completed(futures):
+                _save_result(output_dir, future.result(), columns_order)
+                logger.info(f"Sweep task {futures[future]['task_id']} completed.")
+    results = load_results(output_dir)
+    if results.empty:
+        return results
+    _write_csv(results, os.path.join(output_dir, RESULTS_FILE))
+    # The directory may also hold tasks of earlier sweeps (e.g. with other --steps)
+    task_ids = {task['task_id'] for task in tasks}
+    return results[results['task_id'].isin(task_ids)].reset_index(drop=True)
@@ -0,0 +1,36 @@
+"""
+Every replicate of an Ensemble must follow exactly the trajectory of a
+standalone Simulation with the replicate's seed.
+"""
+import numpy as np
+import pytest
+from config import ModelConfig
+from ensemble import Ensemble
+from simulation import Simulation
+from population import AGENT_VARIABLES, LEARNING_VARIABLES
+
+NUM_REPLICATES = 3
+NUM_AGENTS = 200
+NUM_STEPS = 6
+
+@pytest.mark.parametrize('policy_name', ['flat', 'ubi', 'progressive'])
+def test_replicates_match_standalone_simulations(policy_name):
+    config = ModelConfig(K6=0.02)
+    ensemble = Ensemble(NUM_REPLICATES, num_agents=NUM_AGENTS, seed=7, policy=policy_name, config=config).run(NUM_STEPS)
+    for b, seed in enumerate(ensemble.seeds):
+        simulation = Simulation(num_agents=NUM_AGENTS, seed=seed, config=config.copy())
+        simulation.current_policy = policy_name
+        simulation.start()
+        for _ in range(NUM_STEPS):
+            simulation.update()
+        replicate = ensemble[b]
+        assert np.array_equal(replicate.population.tokens, simulation.population.tokens)
+        assert np.array_equal(replicate.population.weights, simulation.population.weights)
+        for name in AGENT_VARIABLES + LEARNING_VARIABLES:
+            assert np.array_equal(getattr(replicate.population, name), getattr(simulation.population, name)), name
+        assert replicate.gini_history == simulation.gini_history
+        assert replicate.wealth_history == simulation.wealth_history
+        assert replicate.avg_competence_history == simulation.avg_competence_history
+        for name in replicate.population.token_types + ['C', 'AL']:
+            assert np.array_equal(np.concatenate(list(replicate.history.blocks(name))),
+                                  np.concatenate(list(simulation.history.blocks(name)))), name
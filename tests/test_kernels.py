@@ -0,0 +1,34 @@
+"""
+The fused Numba step must agree with the NumPy backend to within
+floating-point rounding.
+"""
+import numpy as np
+import pytest
+import kernels
+from simulation import Simulation
+from population import AGENT_VARIABLES, LEARNING_VARIABLES
+
+NUM_AGENTS = 300
+NUM_STEPS = 10
+
+pytestmark = pytest.mark.skipif(not kernels.NUMBA_AVAILABLE, reason='Numba is not installed')
+
+def run(policy_name, backend):
+    simulation = Simulation(num_agents=NUM_AGENTS, seed=4, network_probability=10 / NUM_AGENTS)
+    simulation.current_policy = policy_name
+    simulation.step_backend = backend
+    simulation.start()
+    for _ in range(NUM_STEPS):
+        simulation.update()
+    return simulation
+
+@pytest.mark.parametrize('policy_name', ['flat', 'ubi', 'progressive', 'progressive_ubi'])
+def test_numba_backend_matches_numpy(policy_name):
+    reference, fused = run(policy_name, 'numpy'), run(policy_name, 'numba')
+    # The kernel only reads the balances, so they must stay exact
+    assert np.array_equal(reference.population.tokens, fused.population.tokens)
+    for name in AGENT_VARIABLES + LEARNING_VARIABLES:
+        np.testing.assert_allclose(getattr(fused.population, name), getattr(reference.population, name),
+                                   rtol=1e-8, atol=1e-12, err_msg=name)
+    np.testing.assert_allclose(fused.gini_history, reference.gini_history, rtol=1e-12)
+    np.testing.assert_allclose(fused.avg_competence_history, reference.avg_competence_history, rtol=1e-8)
@@ -0,0 +1,207 @@
+"""
+The fused tax policy pipelines and the vectorised redistribute_taxes must
+reproduce the original per-agent loops bit for bit, for any block size.
+"""
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from parameters import (MAX_TOKEN_CHANGE, MAX_TOKENS, THETA, TAU_MAX, OMEGA_W, OMEGA_AS, OMEGA_E, E, ASOPT,
+                        DELTA_W_CONSTANT, POLICY_BLOCK_SIZE, UBI_FLOOR)
+from config import ModelConfig
+from population import Population
+from policy import PolicyPipeline, PolicyContext, StatusTax, Floor, UBI, get_policy
+from functions import redistribute_taxes
+
+NUM_AGENTS = 500
+BLOCK_SIZES = [1, 37, POLICY_BLOCK_SIZE]
+POLICIES = ['flat', 'ubi', 'progressive']
+
+# Baseline per-agent loops, as in Agent.update_state, policy.py and functions.py before vectorisation
+
+def baseline_flat_tax(tokens, simulation):
+    return min(simulation.FLAT_TAX_RATE * tokens, MAX_TOKEN_CHANGE)
+
+def baseline_redistribute_ubi(agents, total_tax_collected):
+    for token_type, total_tax in total_tax_collected.items():
+        ubi_payment = total_tax / len(agents)
+        for agent in agents:
+            agent.tokens[token_type] = min(agent.tokens[token_type] + ubi_payment, MAX_TOKENS)
+
+def baseline_redistribute_progressive(agents, total_tax_collected):
+    num_agents = len(agents)
+    for token_type, total_tax in total_tax_collected.items():
+        total_tokens = sum(agent.tokens.get(token_type, 0) for agent in agents)
+        if total_tokens == 0:
+            continue
+        base_share = total_tax / num_agents
+        progressive_total = total_tax - base_share * num_agents
+        total_inverse_tokens = sum(1 / (agent.tokens.get(token_type, 0) + 1) for agent in agents)
+        for agent in agents:
+            tokens = agent.tokens.get(token_type, 0)
+            progressive_share = (1 / (tokens + 1)) / total_inverse_tokens * progressive_total
+            share = min(max(base_share + progressive_share, 0), MAX_TOKEN_CHANGE)
+            agent.tokens[token_type] = min(agent.tokens[token_type] + share, MAX_TOKENS)
+
+def baseline_apply_tax_policy(policy_name, agents, total_tax_collected, simulation):
+    if policy_name in ('flat', 'ubi'):
+        for agent in agents:
+            for token_type in agent.tokens.keys():
+                tax = baseline_flat_tax(agent.tokens[token_type], simulation)
+                agent.tokens[token_type] -= tax
+                total_tax_collected[token_type] += tax
+        if policy_name == 'ubi':
+            baseline_redistribute_ubi(agents, total_tax_collected)
+    elif policy_name == 'progressive':
+        for agent in agents:
+            for token_type, tokens in agent.tokens.items():
+                tax_rate = min(0.3, max(0.1, 0.1 + (tokens / 100) * 0.2))
+                tax = min(tax_rate * tokens, MAX_TOKEN_CHANGE)
+                agent.tokens[token_type] -= tax
+                total_tax_collected[token_type] += tax
+        baseline_redistribute_progressive(agents, total_tax_collected)
+
+def baseline_status_tax(agents, total_tax_collected, delta_tokens):
+    for agent in agents:
+        tau = TAU_MAX * (OMEGA_W * sum(agent.tokens.values()) + OMEGA_AS * agent.AS / ASOPT + OMEGA_E * E)
+        tau = min(tau, TAU_MAX)
+        tax_paid = {k: v * tau for k, v in agent.tokens.items()}
+        for k, v in tax_paid.items():
+            agent.tokens[k] += delta_tokens.get(k, 0) - v
+            total_tax_collected[k] += v
+
+def baseline_redistribute_taxes(agents, total_tax_collected):
+    W_avg = np.mean([sum(agent.tokens.values()) for agent in agents])
+    RD_indices = [(W_avg - sum(agent.tokens.values())) / W_avg if W_avg != 0 else 0 for agent in agents]
+    RD_indices_theta = [RD ** THETA if RD > 0 else 0 for RD in RD_indices]
+    total_RD = sum(RD_indices_theta)
+    if total_RD == 0:
+        return
+    for i, agent in enumerate(agents):
+        agent.tokens['type 1'] += (RD_indices_theta[i] / total_RD) * sum(total_tax_collected.values())
+
+def make_population(seed, scale=300.0):
+    """
+    Seeded population with about 5% zero balances (all of them for scale=0)
+    and the same population as a list of per-agent records.
+    """
+    rng = np.random.default_rng(seed)
+    population = Population(NUM_AGENTS)
+    population.tokens[:] = rng.uniform(0, scale, population.tokens.shape)
+    population.tokens[rng.random(NUM_AGENTS) < 0.05] = 0
+    population.AS[:] = rng.uniform(0, 200, NUM_AGENTS)
+    agents = [SimpleNamespace(tokens=dict(zip(population.token_types, map(float, population.tokens[i]))),
+                              AS=float(population.AS[i]))
+              for i in range(NUM_AGENTS)]
+    total_tax_collected = {token_type: float(rng.uniform(0, 1000)) for token_type in population.token_types}
+    return population, agents, total_tax_collected
+
+def simulation_stub():
+    return SimpleNamespace(FLAT_TAX_RATE=0.2, config=ModelConfig())
+
+def pipeline(policy_name, block_size):
+    policy = get_policy(policy_name)
+    return PolicyPipeline(policy.name, policy.stages, block_size)
+
+def assert_same(population, agents, totals, baseline_totals, exact=True):
+    expected = np.array([[agent.tokens[token_type] for token_type in population.token_types] for agent in agents])
+    if exact:
+        assert np.array_equal(population.tokens, expected)
+        assert totals == baseline_totals
+    else:
+        np.testing.assert_allclose(population.tokens, expected, rtol=1e-12, atol=1e-12)
+        assert totals == pytest.approx(baseline_totals, rel=1e-12)
+    # The cached total force must follow the policy's changes
+    assert population.get_total_force() == pytest.approx(population.tokens.sum(), rel=1e-12, abs=1e-9)
+
+@pytest.mark.parametrize('scale', [300.0, 0.0])
+@pytest.mark.parametrize('block_size', BLOCK_SIZES)
+@pytest.mark.parametrize('policy_name', POLICIES)
+@pytest.mark.parametrize('seed', range(5))
+def test_apply_tax_policy_matches_baseline(seed, policy_name, block_size, scale):
+    population, agents, totals = make_population(seed, scale)
+    baseline_totals = dict(totals)
+    population.get_total_force()
+    simulation = simulation_stub()
+    baseline_apply_tax_policy(policy_name, agents, baseline_totals, simulation)
+    pipeline(policy_name, block_size).run(population, totals, simulation)
+    assert_same(population, agents, totals, baseline_totals)
+
+@pytest.mark.parametrize('block_size', BLOCK_SIZES)
+@pytest.mark.parametrize('policy_name', POLICIES)
+@pytest.mark.parametrize('seed', range(5))
+def test_status_tax_and_policy_match_baseline(seed, policy_name, block_size):
+    population, agents, _ = make_population(seed, scale=1.0)
+    totals = {token_type: 0 for token_type in population.token_types}
+    baseline_totals = dict(totals)
+    population.get_total_force()
+    simulation = simulation_stub()
+    baseline_status_tax(agents, baseline_totals, DELTA_W_CONSTANT)
+    baseline_apply_tax_policy(policy_name, agents, baseline_totals, simulation)
+    pipeline(policy_name, block_size).with_stages(StatusTax(DELTA_W_CONSTANT)).run(population, totals, simulation)
+    # Over several blocks the policy tax is summed separately and added to the status tax total at the end
+    assert_same(population, agents, totals, baseline_totals, exact=block_size >= NUM_AGENTS)
+
+@pytest.mark.parametrize('scale', [300.0, 0.0])
+@pytest.mark.parametrize('seed', range(5))
+def test_redistribute_taxes_matches_baseline(seed, scale):
+    population, agents, totals = make_population(seed, scale)
+    population.get_total_force()
+    baseline_redistribute_taxes(agents, totals)
+    redistribute_taxes(population, totals)
+    assert_same(population, agents, totals, totals)
+
+@pytest.mark.parametrize('block_size', BLOCK_SIZES)
+def test_ubi_floor_tops_up_low_balances_first(block_size):
+    population, _, _ = make_population(0, scale=50.0)
+    totals = {token_type: 0 for token_type in population.token_types}
+    before = population.tokens.sum()
+    population.get_total_force()
+    pipeline('progressive_ubi', block_size).run(population, totals, simulation_stub())
+    # The progressive tax raises more than the shortfall, so every balance reaches the floor
+    assert (population.tokens >= UBI_FLOOR).all()
+    # Every collected token is paid back out
+    assert population.tokens.sum() == pytest.approx(before, rel=1e-12)
+    assert population.get_total_force() == pytest.approx(population.tokens.sum(), rel=1e-12)
+
+def test_ubi_floor_is_scaled_down_when_taxes_fall_short():
+    population = Population(4)
+    population.tokens[:] = [[0.0, 0.0], [4.0, 4.0], [20.0, 20.0], [20.0, 20.0]]
+    totals = {token_type: 7.0 for token_type in population.token_types}
+    context = PolicyContext(population, totals, simulation_stub())
+    rows = slice(0, 4)
+    floor = Floor(10.0)
+    floor.prepare(context, rows)
+    floor.redistribute(context, rows)
+    UBI().redistribute(context, rows)
+    # 7 of the 16-token shortfall is paid, pro rata, and nothing is left for the UBI
+    expected = [0.0 + 10 * 7 / 16, 4.0 + 6 * 7 / 16, 20.0, 20.0]
+    np.testing.assert_allclose(population.tokens[:, 0], expected, rtol=1e-15)
+    np.testing.assert_allclose(population.tokens[:, 1], expected, rtol=1e-15)
+
+@pytest.mark.parametrize('block_size', BLOCK_SIZES)
+@pytest.mark.parametrize('theta', [1, 2, 3.5])
+def test_relative_deprivation_matches_redistribute_taxes(block_size, theta):
+    population, _, _ = make_population(1)
+    reference = Population(NUM_AGENTS)
+    reference.tokens[:] = population.tokens
+    totals = {token_type: 0 for token_type in population.token_types}
+    reference_totals = dict(totals)
+    simulation = simulation_stub()
+    simulation.config.THETA = theta
+    pipeline('relative_deprivation', block_size).run(population, totals, simulation)
+    pipeline('flat', block_size).run(reference, reference_totals, simulation)
+    redistribute_taxes(reference, reference_totals, theta)
+    assert totals == reference_totals
+    np.testing.assert_allclose(population.tokens, reference.tokens, rtol=1e-12)
+    # The whole collected tax goes back to the agents below the mean wealth
+    assert population.tokens.sum() == pytest.approx(make_population(1)[0].tokens.sum(), rel=1e-12)
+
+def test_relative_deprivation_depends_on_theta():
+    results = []
+    for theta in [1, 3]:
+        population, _, _ = make_population(2)
+        simulation = simulation_stub()
+        simulation.config.THETA = theta
+        get_policy('relative_deprivation').run(population, {token_type: 0 for token_type in population.token_types}, simulation)
+        results.append(population.tokens)
+    assert not np.allclose(results[0], results[1])
@@ -0,0 +1,41 @@
+"""
+Sweep tasks are written atomically and resumed after a crash.
+"""
+import pandas as pd
+import pytest
+from sweep import parameter_grid, replicate_seeds, run_sweep, task_id, COMPLETED_FILE, RESULTS_FILE
+
+NUM_AGENTS = 50
+NUM_STEPS = 3
+
+def sweep(output_dir, grid):
+    return run_sweep(parameter_grid(grid), replicate_seeds(0, 2), str(output_dir), NUM_AGENTS, NUM_STEPS, max_workers=2)
+
+def test_task_id_depends_on_run_size():
+    params = {'policy': 'flat'}
+    assert task_id(params, 1, 100, 10) != task_id(params, 1, 100, 20)
+    assert task_id(params, 1, 100, 10) != task_id(params, 1, 200, 10)
+
+def test_resume_after_crash_reruns_only_unrecorded_tasks(tmp_path):
+    grid = {'policy': ['flat', 'ubi']}
+    first = sweep(tmp_path, grid)
+    assert first['task_id'].nunique() == 4
+    completed_path = tmp_path / COMPLETED_FILE
+    task_ids = completed_path.read_text().split()
+    # A crash while recording the third task leaves a partial line and an unrecorded task file
+    completed_path.write_text('\n'.join(task_ids[:2]) + '\n' + task_ids[2][:5])
+    (tmp_path / 'tasks' / f'{task_ids[3]}.csv.tmp').write_text('task_id,seed\nbroken')
+    resumed = sweep(tmp_path, grid)
+    assert sorted(resumed['task_id'].unique()) == sorted(task_ids)
+    pd.testing.assert_frame_equal(resumed.drop(columns='elapsed').sort_values(['task_id', 'time_step']).reset_index(drop=True),
+                                  first.drop(columns='elapsed').sort_values(['task_id', 'time_step']).reset_index(drop=True))
+    assert len(pd.read_csv(tmp_path / RESULTS_FILE)) == 4 * NUM_STEPS
+
+def test_sweep_with_other_columns_is_refused(tmp_path):
+    sweep(tmp_path, {'policy': ['flat']})
+    with pytest.raises(ValueError):
+        sweep(tmp_path, {'policy': ['flat'], 'K6': [0.1]})
+
+def test_theta_without_a_policy_that_reads_it_is_refused(tmp_path):
+    with pytest.raises(ValueError):
+        sweep(tmp_path, {'policy': ['flat', 'progressive'], 'THETA': [1, 3]})
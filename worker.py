@@ -0,0 +1,185 @@
+"""
+Background simulation worker for the GUI.
+
+SimulationWorker steps a Simulation in its own QThread and publishes
+immutable SimulationSnapshots of the state the GUI displays. The GUI
+never touches the simulation while it renders: it polls
+latest_snapshot() at its own frame rate and draws whatever step is
+newest, so slow redraws skip steps instead of slowing the simulation
+down. A new snapshot is only taken once the previous one has been
+picked up, so nothing is copied for frames that would be skipped, and
+it only carries the aggregate history the GUI has not received yet.
+
+Anything else that reads or modifies the simulation from the GUI thread
+(controls, saving, agent history windows) must hold worker.lock.
+"""
+import collections
+import logging
+import threading
+import numpy as np
+from PyQt5.QtCore import QThread, pyqtSignal
+from parameters import GUI_STEP_INTERVAL
+logger = logging.getLogger(__name__)
+
+# Per-agent columns copied into every snapshot
+SNAPSHOT_COLUMNS = ['AI', 'AS', 'C']
+# Aggregate series, as Simulation attribute names
+SNAPSHOT_SERIES = {
+    'time_step': 'time_series',
+    'avg_wealth': 'wealth_history',
+    'gini': 'gini_history',
+    'avg_competence': 'avg_competence_history',
+}
+
+SimulationSnapshot = collections.namedtuple('SimulationSnapshot', [
+    'time_step',    # Time step the snapshot was taken after
+    'policy',       # Current tax policy
+    'agent_ids',    # (N,) agent ids
+    'tokens',       # {token type: (N,) balances}
+    'columns',      # {name: (N,)} for every SNAPSHOT_COLUMNS name
+    'stats',        # {name: latest value} of every SNAPSHOT_SERIES name
+    'series_start', # Index of the first aggregate step in series
+    'series',       # {name: values} of the aggregate history from series_start on
+])
+
+def _frozen(array):
+    array = np.array(array, dtype=np.float64)
+    array.flags.writeable = False
+    return array
+
+def take_snapshot(simulation, series_start=0):
+    """
+    SimulationSnapshot of the simulation's current state, with the
+    aggregate history from series_start on; all arrays are read-only
+    copies.
+    """
+    population = simulation.population
+    agent_ids = np.array([agent.agent_id for agent in simulation.agents])
+    agent_ids.flags.writeable = False
+    series = {name: getattr(simulation, attribute) for name, attribute in SNAPSHOT_SERIES.items()}
+    return SimulationSnapshot(
+        time_step=simulation.time_step,
+        policy=simulation.current_policy,
+        agent_ids=agent_ids,
+        tokens={token_type: _frozen(population.token_column(token_type)) for token_type in population.token_types},
+        columns={name: _frozen(getattr(population, name)) for name in SNAPSHOT_COLUMNS},
+        stats={name: values[-1] if values else 0 for name, values in series.items()},
+        series_start=series_start,
+        series={name: _frozen(values[series_start:]) for name, values in series.items()},
+    )
+
+class SimulationWorker(QThread):
+    """
+    Runs simulation.update() in a loop while resumed, sleeping
+    step_interval ms between steps. failed is emitted (and the worker
+    pauses) if a step raises.
+    """
+    failed = pyqtSignal(str)
+
+    def __init__(self, simulation, step_interval=GUI_STEP_INTERVAL, parent=None):
+        super().__init__(parent)
+        self.simulation = simulation
+        self.step_interval = step_interval
+        self.lock = threading.RLock()
+        self._state = threading.Condition()
+        self._running = False
+        self._quit = False
+        self._snapshot_lock = threading.Lock()
+        self._snapshot = None
+        self._consumed = True
+        # Aggregate steps already handed to the GUI; later snapshots only carry the rest
+        self._series_sent = 0
+
+    def run(self):
+        while True:
+            with self._state:
+                while not self._running and not self._quit:
+                    self._state.wait()
+                if self._quit:
+                    return
+            try:
+                with self.lock:
+                    self.simulation.update()
+                    if self._consumed:
+                        self._publish()
+            except Exception as e:
+                logger.exception("Simulation step failed")
+                self.pause()
+                self.failed.emit(str(e))
+            if self.step_interval:
+                self.msleep(self.step_interval)
+
+    def _publish(self):
+        with self._snapshot_lock:
+            series_start = self._series_sent
+        if series_start > len(self.simulation.time_series):
+            # The simulation was reset
+            series_start = 0
+        snapshot = take_snapshot(self.simulation, series_start)
+        with self._snapshot_lock:
+            self._snapshot = snapshot
+            self._consumed = False
+
+    def publish(self):
+        """
+        Take a snapshot now, e.g. after the simulation was changed while
+        paused.
+        """
+        with self.lock:
+            self._publish()
+
+    def latest_snapshot(self):
+        """
+        The newest snapshot, or None if none was published since the last
+        call.
+        """
+        with self._snapshot_lock:
+            if self._consumed:
+                return None
+            self._consumed = True
+            snapshot = self._snapshot
+            self._series_sent = snapshot.series_start + len(snapshot.series['time_step'])
+            return snapshot
+
+    def resume(self):
+        with self.lock:
+            self.simulation.start()
+        with self._state:
+            self._running = True
+            self._state.notify()
+
+    def pause(self):
+        with self._state:
+            self._running = False
+        with self.lock:
+            self.simulation.pause()
+            self._publish()
+
+    @property
+    def is_running(self):
+        return self._running
+
+    def step(self):
+        """
+        Advance the paused simulation by one step.
+        """
+        with self.lock:
+            self.simulation.step()
+            self._publish()
+
+    def set_simulation(self, simulation):
+        with self.lock:
+            self.simulation = simulation
+            with self._snapshot_lock:
+                self._series_sent = 0
+            self._publish()
+
+    def shutdown(self):
+        """
+        Stop the thread and wait for it to exit.
+        """
+        with self._state:
+            self._quit = True
+            self._running = False
+            self._state.notify()
+        self.wait()